@@ -1,73 +1,164 @@
-from flask import Flask, render_template, request, session, redirect, url_for, flash, jsonify
-from flask_session import Session
-import pyodbc
+from flask import Flask, render_template, request, session, redirect, url_for, flash, jsonify, make_response, g, abort, stream_with_context
 import json
 import os
+import re
+import base64
+import hashlib
+import hmac
+import ipaddress
 import logging
-import pandas as pd
-from datetime import datetime, date
-from functools import wraps
+import threading
+import time
+from itertools import islice
+from datetime import datetime, date, timedelta
+from functools import wraps, partial
+from database.db_connection import pool, get_config, lotes
+from database.disjuntor import CircuitoAberto
+from database.agregados import AgregadosVendas
+from database.cache import TTLCache, SQLiteCache, VooUnico
+from database.objetivos import ObjetivosCache
+from database.referencia import DadosReferencia
+from database.busca import IndiceClientes
+from database.historico import HistoricoMensal
+from database.exportacao import FORMATOS, LOTE
+from database.sessoes import interface_sessao
+from database.usuarios import DiretorioUsuarios
+from database.paralelo import executar_em_paralelo, registrar_degradacao, marcar_degradado
+from database.aquecimento import Aquecimento, ler_horarios
+from database.arrendamento import Arrendamento
+from database.vetorial import indexar, juntar, coluna, percentual, dias_em_atraso
+from database.metricas import registro, medir_consulta, rota_atual, rota_segundos, rota_respostas
+from database.parametros import filtro_in
+from database.periodos import periodo_mes, periodo_ultimos_meses, periodo_datas, filtro_emissao
 
 # Configuração de Logs
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+def chave_secreta():
+    """SECRET_KEY do ambiente ou do arquivo apontado por SECRET_KEY_FILE (fora do repositório); sem ela o app não sobe."""
+    chave = os.getenv('SECRET_KEY', '').strip()
+    if not chave and os.getenv('SECRET_KEY_FILE'):
+        with open(os.getenv('SECRET_KEY_FILE'), encoding='utf-8') as f: chave = f.read().strip()
+    if not chave: raise RuntimeError("Defina SECRET_KEY ou SECRET_KEY_FILE: a chave assina as sessões e não pode ficar no código")
+    return chave
+
 app = Flask(__name__)
-app.config['SECRET_KEY'] = 'varejao_bi_farma_2026_v44_7_blindada'
-app.config['SESSION_TYPE'] = 'filesystem'
-Session(app)
+app.config['SECRET_KEY'] = chave_secreta()
+app.config['SESSAO_BACKEND'] = os.getenv('SESSAO_BACKEND', 'cookie')  # cookie (assinado com SECRET_KEY) | memoria | sqlite | filesystem (legado)
+app.config['PERMANENT_SESSION_LIFETIME'] = timedelta(hours=int(os.getenv('SESSAO_HORAS', 31 * 24)))  # 31 dias, como no Flask-Session
+app.config['SESSION_COOKIE_SAMESITE'] = 'Lax'
+app.config['QUERY_TIMEOUT'] = int(os.getenv('QUERY_TIMEOUT', 30))  # limite por instrução SQL (segundos)
+app.config['AGREGADOS_LOCAIS'] = os.getenv('AGREGADOS_LOCAIS', '0') == '1'
+app.config['AGREGADOS_INTERVALO'] = int(os.getenv('AGREGADOS_INTERVALO', 300))
+app.config['AGREGADOS_TIMEOUT'] = int(os.getenv('AGREGADOS_TIMEOUT', 600))  # carga dos agregados: consultas longas de propósito
+app.config['RESPOSTA_OBSOLETA_TTL'] = int(os.getenv('RESPOSTA_OBSOLETA_TTL', 24 * 3600))  # última versão servida com o ERP fora
+app.config['CACHE_RESPOSTAS'] = os.getenv('CACHE_RESPOSTAS', 'memoria')  # memoria | sqlite | desligado
+app.config['CACHE_RESPOSTAS_TTL'] = int(os.getenv('CACHE_RESPOSTAS_TTL', 300))
+app.config['CACHE_SONDA_INTERVALO'] = int(os.getenv('CACHE_SONDA_INTERVALO', 30))
+app.config['METRICS_TOKEN'] = os.getenv('METRICS_TOKEN', '')
+app.config['METRICS_PERMITIDOS'] = os.getenv('METRICS_PERMITIDOS', '')  # IPs/redes (CIDR) separados por vírgula, usados só sem token
+app.config['HISTORICO_MESES'] = int(os.getenv('HISTORICO_MESES', 36))
+app.config['HISTORICO_CACHE'] = os.getenv('HISTORICO_CACHE', 'sqlite')  # sqlite (sobrevive a reinícios) | memoria
+app.config['AQUECIMENTO'] = os.getenv('AQUECIMENTO', '1') == '1'
+app.config['AQUECIMENTO_HORARIOS'] = os.getenv('AQUECIMENTO_HORARIOS', '07:50')  # HH:MM separados por vírgula (pouco antes da abertura)
+app.config['AQUECIMENTO_INTERVALO'] = int(os.getenv('AQUECIMENTO_INTERVALO', 0))  # segundos; 0 = só na subida e nos horários
+if app.config['SESSAO_BACKEND'] == 'filesystem':
+    from flask_session import Session  # comportamento antigo: um arquivo por sessão em flask_session/
+    app.config['SESSION_TYPE'] = 'filesystem'
+    Session(app)
+else:
+    app.session_interface = interface_sessao(app.config['SESSAO_BACKEND'], pasta_legado=os.path.join(app.root_path, 'flask_session'),
+                                             sqlite_path=os.getenv('SESSAO_PATH', os.path.join(app.root_path, 'database', 'sessoes.sqlite3')))
 
 CONFIG_PATH = os.path.join(app.root_path, 'database', 'config.json')
 USERS_PATH = os.path.join(app.root_path, 'database', 'users.json')
 EXCEL_PATH = r'C:\Projeto_Varejao\bi_flask_app\database\Vlr_ObjetivoClie.xlsx'
+objetivos = ObjetivosCache(EXCEL_PATH)
 
 # ============================================
 # GESTÃO DE USUÁRIOS
 # ============================================
 
-def load_users():
-    if not os.path.exists(USERS_PATH):
-        os.makedirs(os.path.dirname(USERS_PATH), exist_ok=True)
-        initial = {"admin": {"nome": "Administrador", "senha": "admin123456"}}
-        with open(USERS_PATH, 'w', encoding='utf-8') as f:
-            json.dump(initial, f, indent=4)
-        return initial
-    with open(USERS_PATH, 'r', encoding='utf-8') as f:
-        return json.load(f)
-
-def save_users(users):
-    with open(USERS_PATH, 'w', encoding='utf-8') as f:
-        json.dump(users, f, indent=4)
+# Em memória, indexado pelo login; relido só quando o users.json muda e gravado
+# com trava entre processos + troca atômica (ver database/usuarios.py).
+usuarios = DiretorioUsuarios(USERS_PATH)
 
 # ============================================
 # NÚCLEO TÉCNICO SQL
 # ============================================
 
-def execute_query(query):
+# Toda consulta é medida (tempo, linhas, erros, espera pelo pool) e rotulada pela
+# rota corrente e por `nome`; sem nome, usa a primeira tabela do FROM.
+
+def _nome_consulta(query):
+    m = re.search(r'\bFROM\s+([A-Za-z_]\w*)', query)
+    return f"sql_{m.group(1).lower()}" if m else 'sql'
+
+def run_query(query, params=None, timeout=None, nome=None):
+    """Executa a consulta no pool e devolve todas as linhas; erros sobem para o chamador."""
+    return list(iter_query(query, params, timeout=timeout, nome=nome))
+
+def execute_query(query, params=None, timeout=None, nome=None):
     try:
         if not os.path.exists(CONFIG_PATH): return []
-        with open(CONFIG_PATH, 'r', encoding='utf-8') as f:
-            cfg = json.load(f)
-        conn_str = (f"Driver={{ODBC Driver 17 for SQL Server}};Server={cfg['server']};"
-                    f"Database={cfg['database']};UID={cfg['username']};PWD={cfg['password']};")
-        conn = pyodbc.connect(conn_str, timeout=10)
-        cursor = conn.cursor()
-        cursor.execute(query)
-        res = cursor.fetchall()
-        conn.close()
-        return res
+        return run_query(query, params, timeout, nome)
+    except CircuitoAberto:  # ERP fora: o disjuntor já registrou no log
+        marcar_degradado(nome or _nome_consulta(query))
+        return []
     except Exception as e:
-        logger.error(f"❌ Erro SQL: {e}")
+        logger.error(f"❌ Erro SQL ({nome or _nome_consulta(query)}): {e}")
+        marcar_degradado(nome or _nome_consulta(query))
         return []
 
+def execute_scalar(query, params=None, timeout=None, nome=None):
+    res = execute_query(query, params, timeout, nome)
+    return res[0][0] if res else None
+
+def iter_query(query, params=None, lote=None, timeout=None, nome=None):
+    """Gera as linhas em lotes de `lote` (padrão DB_ARRAYSIZE) via fetchmany, sem materializar o resultado inteiro."""
+    with medir_consulta(nome or _nome_consulta(query), query) as m:
+        t0 = time.perf_counter()
+        with pool.connection() as conn:
+            m['espera'] = time.perf_counter() - t0
+            conn.timeout = timeout or app.config['QUERY_TIMEOUT']  # toda instrução tem limite: servidor lento não prende o worker
+            cursor = conn.cursor()
+            try:
+                if params: cursor.execute(query, params)
+                else: cursor.execute(query)
+                for linhas in lotes(cursor, lote):
+                    m['linhas'] += len(linhas)
+                    yield from linhas
+            finally:
+                cursor.close()  # descarta resultados pendentes antes de devolver a conexão ao pool
+
+ref = DadosReferencia(execute_query)
+indice_clientes = IndiceClientes()
+
+def busca_clientes():
+    """Índice de busca sincronizado com o cadastro em cache (só reindexa o que mudou quando o TTL do clien vence)."""
+    linhas = ref.clientes_ativos()
+    if linhas: indice_clientes.sincronizar(linhas)  # erro/banco vazio não apaga o índice que já existe
+    return indice_clientes
+
+agregados = None
+if app.config['AGREGADOS_LOCAIS']:
+    agregados = AgregadosVendas(os.path.join(app.root_path, 'database', 'agregados.sqlite3'), partial(run_query, timeout=app.config['AGREGADOS_TIMEOUT']),
+                                meses=max(36, app.config['HISTORICO_MESES']), retroativo_dias=int(os.getenv('AGG_RETROATIVO_DIAS', 3)), ressincronizar_h=int(os.getenv('AGG_RESSINC_HORAS', 24)))
+    agregados.iniciar(app.config['AGREGADOS_INTERVALO'])
+
+def usar_agregados(periodo=None):
+    """True quando os agregados locais estão ligados, já tiveram uma carga completa e (se dado) cobrem o início do período."""
+    return agregados is not None and agregados.disponivel() and (periodo is None or agregados.cobre(periodo))
+
+def sql_vendas_periodo(periodo, chave='Cod_Cliente'):
+    """Faturamento do período pré-agregado por `chave` (Cod_Cliente ou Cod_Vendedor), para uso como tabela derivada."""
+    f_emi, p_emi = filtro_emissao(periodo)
+    return (f"SELECT {chave}, SUM(Vlr_TotalNota) AS Vnd FROM NFSCB WITH (NOLOCK) "
+            f"WHERE Status = 'F' AND Cod_Estabe = 0 AND {f_emi} GROUP BY {chave}"), p_emi
+
 def get_objetivos_excel():
-    if os.path.exists(EXCEL_PATH):
-        try:
-            df = pd.read_excel(EXCEL_PATH)
-            df['Codigo'] = df['Codigo'].astype(int)
-            return df.set_index('Codigo')['Vlr_ObjetivoClie'].to_dict()
-        except: return {}
-    return {}
+    return objetivos.get()
 
 def login_required(f):
     @wraps(f)
@@ -76,6 +167,172 @@ def login_required(f):
         return f(*args, **kwargs)
     return decorated_function
 
+# ============================================
+# CACHE DE RESPOSTAS (ETAG / 304)
+# ============================================
+# Chave = rota + argumentos + dia de referência + marca d'água dos dados
+# (NFSCB/CTREC). Nota nova ou baixa de título muda a marca e as entradas antigas
+# deixam de ser usadas (e vencem pelo TTL). Com CACHE_RESPOSTAS=sqlite o cache
+# é compartilhado entre os workers da máquina.
+
+def _backend_respostas():
+    tipo, ttl = app.config['CACHE_RESPOSTAS'], app.config['CACHE_RESPOSTAS_TTL']
+    if tipo == 'sqlite': return SQLiteCache(os.getenv('CACHE_RESPOSTAS_PATH', os.path.join(app.root_path, 'database', 'respostas.sqlite3')), ttl=ttl)
+    if tipo == 'memoria': return TTLCache(ttl=ttl, max_entradas=2048)
+    return None
+
+respostas = _backend_respostas()
+
+def _backend_historico():
+    if app.config['HISTORICO_CACHE'] == 'memoria': return TTLCache(max_entradas=100_000, max_peso=10_000_000)
+    return SQLiteCache(os.getenv('HISTORICO_PATH', os.path.join(app.root_path, 'database', 'historico.sqlite3')), max_entradas=200_000)
+
+historico = HistoricoMensal(run_query, _backend_historico())
+_marca = {'valor': None, 'lida_em': float('-inf')}
+_marca_lock = threading.Lock()
+
+def erp_indisponivel():
+    """True com o disjuntor do pool aberto (consultas falhando na hora)."""
+    disjuntor = getattr(pool, 'disjuntor', None)
+    return disjuntor is not None and disjuntor.aberto()
+
+def marca_dados():
+    """Marca d'água de NFSCB/CTREC, sondada no ERP no máximo a cada CACHE_SONDA_INTERVALO segundos (None se indisponível)."""
+    if erp_indisponivel(): return None
+    if time.monotonic() - _marca['lida_em'] < app.config['CACHE_SONDA_INTERVALO']: return _marca['valor']
+    with _marca_lock:
+        if time.monotonic() - _marca['lida_em'] >= app.config['CACHE_SONDA_INTERVALO']:
+            res = execute_query("""SELECT (SELECT MAX(Num_Nota) FROM NFSCB WITH (NOLOCK)), (SELECT MAX(Dat_Emissao) FROM NFSCB WITH (NOLOCK)),
+                (SELECT COUNT(*) FROM CTREC WITH (NOLOCK) WHERE Vlr_Saldo > 0), (SELECT SUM(Vlr_Saldo) FROM CTREC WITH (NOLOCK) WHERE Vlr_Saldo > 0)""", nome='marca_dados')
+            marca = '|'.join(map(str, res[0])) if res else None
+            if marca and usar_agregados(): marca += '|' + agregados.frescor()['atualizado_em'].isoformat()
+            _marca.update(valor=marca, lida_em=time.monotonic())
+        return _marca['valor']
+
+_voos_respostas = VooUnico()
+
+def _resposta_obsoleta(chave_ultima):
+    """Última versão guardada da rota, marcada como desatualizada (Warning 110 + X-Dados-Obsoletos); None se não houver."""
+    item = respostas.get(chave_ultima)
+    if item is None: return None
+    resp = app.response_class(item[0], mimetype=item[1])
+    resp.headers['Warning'] = '110 - "Response is Stale"'
+    resp.headers['X-Dados-Obsoletos'] = '1'
+    resp.headers['Cache-Control'] = 'no-store'
+    return resp
+
+def _resposta_parcial(resp):
+    resp = make_response(resp)
+    resp.headers['X-Dados-Parciais'] = '1'
+    resp.headers['Cache-Control'] = 'no-store'
+    return resp
+
+def cache_resposta(f):
+    """Guarda respostas 200 da rota e responde com ETag forte (304 quando o navegador já tem a versão).
+
+    Resposta degradada (consulta com erro/timeout que virou valor padrão) não vai para o cache nem ganha
+    ETag: sai no lugar a última versão íntegra da rota, marcada como obsoleta, ou a própria resposta com
+    X-Dados-Parciais. O mesmo vale com o ERP fora (disjuntor aberto).
+    """
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        if respostas is None: return f(*args, **kwargs)
+        rota = (request.endpoint, tuple(sorted(kwargs.items())), tuple(sorted(request.args.items(multi=True))))
+        marca = marca_dados()
+        if marca is None:
+            if erp_indisponivel(): return _resposta_obsoleta(('ultima',) + rota) or _resposta_parcial(f(*args, **kwargs))
+            return f(*args, **kwargs)
+        def sem_cache():
+            with registrar_degradacao() as degradacao: resp = make_response(f(*args, **kwargs))
+            if resp.status_code == 200 and degradacao: return _resposta_obsoleta(('ultima',) + rota) or _resposta_parcial(resp)
+            return resp
+        chave = ('resposta',) + rota + (date.today().isoformat(), marca)
+        item = respostas.get(chave)
+        if item is None:
+            # Requisições idênticas simultâneas (ex.: todos abrindo o dashboard às 8h) esperam a primeira em vez de repetir as consultas
+            proprio = {}
+            def gerar():
+                with registrar_degradacao() as degradacao:
+                    resp = proprio['resp'] = make_response(f(*args, **kwargs))
+                if resp.status_code != 200: return None
+                if degradacao or erp_indisponivel():  # valor padrão no lugar de dado real: não pode ser servido a todos
+                    proprio['degradada'] = True
+                    return None
+                corpo = resp.get_data()
+                item = (corpo, resp.mimetype, hashlib.sha256(corpo).hexdigest()[:32])
+                respostas.set(chave, item)
+                respostas.set(('ultima',) + rota, item, ttl=app.config['RESPOSTA_OBSOLETA_TTL'])
+                return item
+            item = _voos_respostas.executar(chave, gerar)
+            if item is None and proprio.get('degradada'): return _resposta_obsoleta(('ultima',) + rota) or _resposta_parcial(proprio['resp'])
+            if item is None: return proprio.get('resp') or sem_cache()  # falha não é compartilhada: quem esperou tenta por conta própria
+        resp = app.response_class(item[0], mimetype=item[1])
+        resp.set_etag(item[2])
+        resp.headers['Cache-Control'] = 'private, no-cache'
+        return resp.make_conditional(request)
+    return decorated_function
+
+# ============================================
+# MÉTRICAS (/metrics)
+# ============================================
+
+@app.before_request
+def _inicio_requisicao():
+    g.t0 = time.perf_counter()
+    rota_atual.set(request.endpoint or 'sem_rota')
+
+@app.after_request
+def _fim_requisicao(resp):
+    rota = request.endpoint or 'sem_rota'
+    if 't0' in g: rota_segundos.observar(time.perf_counter() - g.t0, rota=rota)
+    rota_respostas.inc(rota=rota, status=resp.status_code)
+    return resp
+
+@registro.coletor
+def _metricas_pool_e_caches():
+    st = pool.status()
+    caches = [('referencia', ref.stats()), ('historico', historico.cache.stats())] + ([('respostas', respostas.stats())] if respostas is not None else [])
+    return [
+        ('bi_pool_conexoes', 'gauge', 'Conexões do pool por estado.',
+         [({'estado': e}, st[k]) for e, k in (('em_uso', 'em_uso'), ('ociosas', 'ociosas'), ('total', 'tamanho'), ('max', 'max'))]),
+        ('bi_erp_disjuntor_aberto', 'gauge', 'Disjuntor do ERP aberto (1) ou fechado (0).', [({}, int(erp_indisponivel()))]),
+        ('bi_erp_disjuntor_eventos_total', 'counter', 'Aberturas do disjuntor, consultas rejeitadas na hora e sondagens do ERP.',
+         [({'evento': k}, v) for k, v in getattr(getattr(pool, 'disjuntor', None), 'stats', {}).items()]),
+        ('bi_pool_eventos_total', 'counter', 'Conexões criadas, reusadas, descartadas e esperas por conexão livre.',
+         [({'evento': k}, st[k]) for k in ('criadas', 'reusadas', 'descartadas', 'esperas')]),
+        ('bi_cache_acessos_total', 'counter', 'Acertos e faltas por cache.',
+         [({'cache': c, 'resultado': r}, est[k]) for c, est in caches for r, k in (('hit', 'hits'), ('miss', 'misses'))]),
+        ('bi_cache_hit_ratio', 'gauge', 'Fração de acertos desde o início do processo.', [({'cache': c}, est['hit_ratio']) for c, est in caches]),
+        ('bi_cache_entradas', 'gauge', 'Entradas vivas por cache.', [({'cache': c}, est['entradas']) for c, est in caches]),
+        ('bi_cache_compartilhadas_total', 'counter', 'Faltas que esperaram um carregamento já em andamento da mesma chave.',
+         [({'cache': c}, est['compartilhadas']) for c, est in caches] + [({'cache': 'respostas_em_voo'}, _voos_respostas.compartilhadas)]),
+        ('bi_aquecimento_segundos', 'gauge', 'Duração da última execução de cada tarefa de pré-aquecimento.',
+         [({'tarefa': n}, t['segundos']) for n, t in aquecimento.status()['tarefas'].items()]),
+    ]
+
+def ip_permitido(ip, permitidos):
+    """True se `ip` cai em algum item da lista 'ip, rede/prefixo, ...'; lista vazia não permite ninguém."""
+    try: endereco = ipaddress.ip_address(ip or '')
+    except ValueError: return False
+    for item in (permitidos or '').split(','):
+        try:
+            if item.strip() and endereco in ipaddress.ip_network(item.strip(), strict=False): return True
+        except ValueError: logger.warning(f"⚠️ METRICS_PERMITIDOS inválido: {item.strip()!r}")
+    return False
+
+@app.route('/metrics')
+def metricas():
+    """Exposição no formato texto do Prometheus; exige METRICS_TOKEN (Bearer) se configurado, senão só os IPs de METRICS_PERMITIDOS.
+
+    Loopback não é confiável por padrão: atrás de um proxy reverso na mesma máquina
+    toda requisição externa chega como 127.0.0.1.
+    """
+    token = app.config['METRICS_TOKEN']
+    if token: autorizado = hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {token}')
+    else: autorizado = ip_permitido(request.remote_addr, app.config['METRICS_PERMITIDOS'])
+    if not autorizado: return 'forbidden\n', 403
+    return app.response_class(registro.exportar(), mimetype='text/plain; version=0.0.4')
+
 # ============================================
 # ROTAS DE ACESSO E GESTÃO
 # ============================================
@@ -89,58 +346,443 @@ def login():
     if request.method == 'POST':
         user_in = request.form.get('username', '').strip()
         pwd_in = request.form.get('password', '').strip()
-        users = load_users()
-        if user_in in users and users[user_in]['senha'] == pwd_in:
-            session['user'] = user_in
+        if usuarios.autenticar(user_in, pwd_in):
+            session.clear(); session['user'] = user_in; session.permanent = True
             return redirect(url_for('dashboard'))
         return render_template('login.html', erro="Acesso Negado!", config=get_db_cfg())
     return render_template('login.html', config=get_db_cfg())
 
 def get_db_cfg():
-    if os.path.exists(CONFIG_PATH):
-        try:
-            with open(CONFIG_PATH, 'r', encoding='utf-8') as f: return json.load(f)
-        except: pass
-    return {}
+    return get_config(CONFIG_PATH) or {}
 
 @app.route('/usuarios', methods=['GET', 'POST'])
 @login_required
 def gerenciar_usuarios():
-    users = load_users()
     if request.method == 'POST':
         nome = request.form.get('nome'); login_id = request.form.get('login').strip(); senha = request.form.get('senha')
-        if login_id and login_id not in users:
-            users[login_id] = {"nome": nome, "senha": senha}
-            save_users(users)
+        if login_id: usuarios.atualizar(lambda users: users.setdefault(login_id, {"nome": nome, "senha": senha}))
         return redirect(url_for('gerenciar_usuarios'))
-    user_list = [[k, v['nome'], k] for k, v in users.items()]
+    user_list = [[k, v['nome'], k] for k, v in usuarios.todos().items()]
     return render_template('usuarios.html', usuarios=user_list)
 
 @app.route('/usuarios/excluir/<login_id>')
 @login_required
 def excluir_usuario(login_id):
-    users = load_users()
-    if login_id != 'admin' and login_id in users:
-        del users[login_id]; save_users(users)
+    if login_id != 'admin' and login_id in usuarios.todos():
+        usuarios.atualizar(lambda users: users.pop(login_id, None))
     return redirect(url_for('gerenciar_usuarios'))
 
 @app.route('/usuarios/editar', methods=['POST'])
 @login_required
 def editar_usuario():
-    users = load_users(); login_id = request.form.get('edit_login')
-    if login_id in users:
-        users[login_id]['nome'] = request.form.get('edit_nome')
-        ns = request.form.get('edit_senha')
+    login_id = request.form.get('edit_login'); nome = request.form.get('edit_nome'); ns = request.form.get('edit_senha')
+    def editar(users):
+        if login_id not in users: return
+        users[login_id]['nome'] = nome
         if ns: users[login_id]['senha'] = ns
-        save_users(users)
+    if login_id in usuarios.todos(): usuarios.atualizar(editar)
     return redirect(url_for('gerenciar_usuarios'))
 
 @app.route('/logout')
 def logout():
     session.clear(); return redirect(url_for('login'))
 
+@app.route('/api/cache', methods=['GET', 'POST'])
+@login_required
+def cache_referencia():
+    if request.method == 'POST':
+        tabela = request.form.get('tabela') or None
+        if tabela in (None, 'respostas') and respostas is not None: respostas.invalidate()
+        if tabela in (None, 'historico'): historico.cache.invalidate()
+        if tabela not in ('respostas', 'historico'): ref.invalidar(tabela)
+    return jsonify({**ref.stats(), 'respostas': respostas.stats() if respostas is not None else None, 'historico': historico.cache.stats()})
+
 # ============================================
-# DASHBOARD v44.7 (VENDAS DO MÊS ATUALIZADO)
+# CARTEIRA DE CLIENTES (LISTAGEM PAGINADA)
+# ============================================
+
+MAX_CODIGOS_IN = 2000  # o SQL Server aceita até 2100 parâmetros por comando
+
+def sql_carteira(filtro, valor, periodo, local=False):
+    """FROM/WHERE da carteira filtrada (um registro por cliente) e seus parâmetros.
+
+    Expõe cl.*, vn.Vnd (vendas do período; ausente quando `local`) e ct.Venc_Aberto.
+    """
+    sql, params = "FROM clien cl", []
+    if not local:
+        sql_vn, p_vn = sql_vendas_periodo(periodo)
+        sql += f" LEFT JOIN ({sql_vn}) vn ON vn.Cod_Cliente = cl.Codigo"; params += p_vn
+    sql += (" LEFT JOIN (SELECT Cod_Cliente, MIN(Dat_Vencimento) AS Venc_Aberto FROM CTREC WHERE Vlr_Saldo > 0 AND Status IN ('A', 'P') GROUP BY Cod_Cliente) ct ON ct.Cod_Cliente = cl.Codigo"
+            " WHERE cl.Bloqueado = 0 AND EXISTS (SELECT 1 FROM enxes en WHERE en.Cod_Client = cl.Codigo AND en.Cod_Estabe = 0")
+    if filtro == 'vendedor' and valor: sql += " AND en.Cod_Vendedor = ?"; params.append(int(valor))
+    sql += ")"
+    if filtro == 'cliente' and valor:
+        # Códigos resolvidos no índice em memória; buscas muito genéricas caem no LIKE (o resultado já é quase a base toda)
+        indice = busca_clientes()
+        codigos = sorted(indice.codigos(valor))
+        if not len(indice) or len(codigos) > MAX_CODIGOS_IN: sql += " AND (cl.Codigo LIKE ? OR cl.Razao_Social LIKE ?)"; params += [f"%{valor}%"] * 2
+        elif codigos:
+            f_cod, p_cod = filtro_in('cl.Codigo', codigos)  # marcadores em tamanhos fixos: poucos planos no cache do SQL Server
+            sql += f" AND {f_cod}"; params += p_cod
+        else: sql += " AND 1 = 0"
+    return sql, params
+
+def colunas_carteira(local=False):
+    return f"cl.Codigo, cl.Razao_Social, ISNULL(cl.Limite_Credito, 0), ISNULL(cl.Total_Debito, 0), {'0' if local else 'ISNULL(vn.Vnd, 0)'}, ct.Venc_Aberto"
+
+def tabela_carteira(linhas, hoje, vendas_idx=None):
+    """Linhas de colunas_carteira() -> lista de dicts, com meta/atingimento/atraso calculados por coluna.
+
+    `vendas_idx`: vendas por cliente dos agregados locais já passadas por indexar() (uma vez por requisição/exportação).
+    """
+    if not linhas: return []
+    codigos = coluna(linhas)
+    venda = juntar(codigos, *vendas_idx) if vendas_idx is not None else coluna(linhas, 4, float)
+    meta = juntar(codigos, *objetivos.indice())
+    cols = {'codigo': codigos.tolist(), 'nome': [r[1] for r in linhas], 'limite': coluna(linhas, 2, float).tolist(),
+            'debito': coluna(linhas, 3, float).tolist(), 'venda': venda.tolist(), 'meta': meta.tolist(),
+            'atingimento': percentual(venda, meta).tolist(), 'atraso': dias_em_atraso([r[5] for r in linhas], hoje).tolist()}
+    return [dict(zip(cols, valores)) for valores in zip(*cols.values())]
+
+def pagina_carteira(filtro, valor, periodo, ordem='codigo', apos=None, limite=50, local=False, timeout=None):
+    """Uma página por keyset (Codigo ou Razao_Social+Codigo); devolve (linhas, ha_mais).
+
+    Razão social nula vale '' na ordenação e no cursor: NULL > ? / = ? nunca é
+    verdadeiro e a paginação pararia no primeiro cliente sem nome.
+    """
+    base, params = sql_carteira(filtro, valor, periodo, local)
+    if apos is not None:
+        if ordem == 'nome': base += " AND (ISNULL(cl.Razao_Social, '') > ? OR (ISNULL(cl.Razao_Social, '') = ? AND cl.Codigo > ?))"; params += [apos[0] or '', apos[0] or '', apos[1]]
+        else: base += " AND cl.Codigo > ?"; params.append(apos[1])
+    order_by = "ISNULL(cl.Razao_Social, ''), cl.Codigo" if ordem == 'nome' else "cl.Codigo"
+    query = f"SELECT TOP (?) {colunas_carteira(local)} {base} ORDER BY {order_by}"
+    try:
+        linhas = list(islice(iter_query(query, [limite + 1] + params, lote=limite + 1, timeout=timeout, nome='carteira_pagina'), limite + 1))
+    except Exception as e:
+        logger.error(f"❌ Erro SQL: {e}")
+        marcar_degradado('carteira_pagina')
+        linhas = []
+    return linhas[:limite], len(linhas) > limite
+
+def totais_carteira(filtro, valor, periodo, hoje, vendas_cli=None, timeout=None):
+    """Totais da carteira filtrada sem trazer as linhas: somas no SQL e metas do Excel juntadas por coluna de códigos."""
+    local = vendas_cli is not None
+    base, params = sql_carteira(filtro, valor, periodo, local)
+    tot = {'clientes': 0, 'limite': 0.0, 'debito': 0.0, 'realizado': 0.0, 'atraso': 0, 'meta': 0.0}
+    agg = execute_query(f"""SELECT COUNT(*), ISNULL(SUM(ISNULL(cl.Limite_Credito, 0)), 0), ISNULL(SUM(ISNULL(cl.Total_Debito, 0)), 0),
+        ISNULL(SUM({'0' if local else 'ISNULL(vn.Vnd, 0)'}), 0), ISNULL(SUM(CASE WHEN ct.Venc_Aberto < ? THEN 1 ELSE 0 END), 0) {base}""",
+        [datetime(hoje.year, hoje.month, hoje.day)] + params, timeout, nome='carteira_totais')
+    if agg:
+        r = agg[0]
+        tot.update({'clientes': int(r[0]), 'limite': float(r[1]), 'debito': float(r[2]), 'realizado': float(r[3]), 'atraso': int(r[4])})
+    try:
+        codigos = coluna(iter_query(f"SELECT cl.Codigo {base}", params, timeout=timeout, nome='carteira_codigos'))
+        tot['meta'] = float(juntar(codigos, *objetivos.indice()).sum())
+        if local: tot['realizado'] = float(juntar(codigos, *indexar(vendas_cli)).sum())
+    except Exception as e:
+        logger.error(f"❌ Erro SQL: {e}")
+        marcar_degradado('carteira_codigos')
+    return tot
+
+def _cursor_carteira(linha):
+    return base64.urlsafe_b64encode(json.dumps([linha[1] or '', linha[0]]).encode()).decode()
+
+@app.route('/api/clientes')
+@login_required
+@cache_resposta
+def api_clientes():
+    filtro = request.args.get('tipo', 'todos')
+    valor = request.args.get('valor', '').strip()
+    ordem = request.args.get('ordem', 'codigo')
+    if ordem not in ('codigo', 'nome'): ordem = 'codigo'
+    limite = min(max(request.args.get('limite', 50, type=int), 1), 500)
+    apos = None
+    if request.args.get('apos'):
+        try: apos = json.loads(base64.urlsafe_b64decode(request.args['apos'].encode()))
+        except ValueError: apos = None
+        if not (isinstance(apos, list) and len(apos) == 2): return jsonify({'erro': 'cursor inválido'}), 400
+
+    hoje = date.today()
+    periodo = periodo_mes(hoje.year, hoje.month)
+    local = usar_agregados()
+    vendas_cli = agregados.vendas_por_cliente(periodo) if local else None
+    linhas, mais = pagina_carteira(filtro, valor, periodo, ordem, apos, limite, local, app.config['QUERY_TIMEOUT'])
+    return jsonify({'itens': tabela_carteira(linhas, hoje, indexar(vendas_cli) if local else None),
+                    'proximo': _cursor_carteira(linhas[-1]) if mais else None, 'ordem': ordem, 'limite': limite})
+
+@app.route('/api/clientes/totais')
+@login_required
+@cache_resposta
+def api_clientes_totais():
+    hoje = date.today()
+    periodo = periodo_mes(hoje.year, hoje.month)
+    vendas_cli = agregados.vendas_por_cliente(periodo) if usar_agregados() else None
+    return jsonify(totais_carteira(request.args.get('tipo', 'todos'), request.args.get('valor', '').strip(), periodo, hoje,
+                                   vendas_cli, app.config['QUERY_TIMEOUT']))
+
+@app.route('/api/clientes/busca')
+@login_required
+def api_clientes_busca():
+    """Typeahead: clientes que casam com `q` (código ou razão social, sem acento/caixa), mais relevantes primeiro."""
+    limite = min(max(request.args.get('limite', 10, type=int), 1), 50)
+    achados = busca_clientes().buscar(request.args.get('q', ''), limite)
+    return jsonify([{'codigo': c, 'nome': n} for c, n in achados])
+
+# ============================================
+# WIDGETS (JSON) — cada bloco das páginas é carregado à parte
+# ============================================
+# As páginas saem só com o "esqueleto" (filtros, cadastro em cache) e o JS
+# busca cada widget em paralelo; a primeira pintura não espera a consulta mais lenta.
+
+CALENDARIO = {'uteis': 21, 'trabalhados': 13}
+
+def projecao(meta, realizado, sobre_projecao=False):
+    """Meta, realizado e projeção linear do mês pelo calendário de dias úteis.
+
+    O atingimento é realizado/meta, ou projeção/meta com `sobre_projecao` (card do vendedor).
+    """
+    proj = realizado / CALENDARIO['trabalhados'] * CALENDARIO['uteis']
+    base = proj if sobre_projecao else realizado
+    return {'meta': meta, 'realizado': realizado, 'valor_projecao': proj, 'atingimento_proj': (base / meta * 100 if meta > 0 else 0)}
+
+def _periodo_atual():
+    hoje = date.today()
+    return hoje, periodo_mes(hoje.year, hoje.month)
+
+# KPIs que valem para todos os usuários (empresa, ranking): calculados uma vez por
+# mês/marca d'água, pré-aquecidos pelo agendador (ver PRÉ-AQUECIMENTO).
+_kpis = TTLCache(ttl=app.config['CACHE_RESPOSTAS_TTL'], max_entradas=16)
+
+class _KpiDegradado(Exception):
+    """Cálculo com valor padrão no lugar de dado real; leva o valor para quem pediu (e para quem esperava o mesmo cálculo)."""
+    def __init__(self, valor, motivos): super().__init__(', '.join(sorted(motivos))); self.valor = valor
+
+def kpi_em_cache(chave, calcular):
+    """_kpis.get_or_load que não guarda resultado degradado: ele é devolvido, mas a próxima chamada calcula de novo."""
+    def carregar():
+        with registrar_degradacao() as degradacao: valor = calcular()
+        if degradacao: raise _KpiDegradado(valor, degradacao)
+        return valor
+    try: return _kpis.get_or_load(chave, carregar)
+    except _KpiDegradado as e:
+        marcar_degradado(str(e))
+        return e.valor
+
+def _kpis_empresa(hoje, periodo):
+    f_mes, p_mes = filtro_emissao(periodo)
+    t_q = app.config['QUERY_TIMEOUT']
+    if usar_agregados():
+        tarefas = {'r_cia': lambda: agregados.total(periodo), 'm_cia': lambda: agregados.meta(hoje.year, hoje.month) or 1}
+    else:
+        tarefas = {
+            'r_cia': lambda: float(execute_scalar(f"SELECT ISNULL(SUM(Vlr_TotalNota), 0) FROM NFSCB WITH (NOLOCK) WHERE Status = 'F' AND Cod_Estabe = 0 AND {f_mes}", p_mes, t_q, nome='empresa_realizado') or 0),
+            'm_cia': lambda: float(execute_scalar("SELECT ISNULL(SUM(Vlr_Cota), 0) FROM VEOBJ WHERE Ano_Ref = ? AND Mes_Ref = ?", [hoje.year, hoje.month], t_q, nome='empresa_meta') or 1),
+        }
+    kpi = executar_em_paralelo(tarefas, timeout=t_q, padroes={'m_cia': 1})
+    return projecao(kpi['m_cia'], kpi['r_cia'])
+
+def widget_empresa():
+    hoje, periodo = _periodo_atual()
+    return kpi_em_cache(('empresa', hoje.year, hoje.month, marca_dados()), lambda: _kpis_empresa(hoje, periodo))
+
+def widget_vendedor(cod_v):
+    hoje, periodo = _periodo_atual()
+    f_mes, p_mes = filtro_emissao(periodo)
+    t_q = app.config['QUERY_TIMEOUT']
+    tarefas = {'total_carteira': lambda: len(ref.carteira(cod_v))}
+    if usar_agregados():
+        tarefas.update({'m_sel': lambda: agregados.meta(hoje.year, hoje.month, cod_v) or 1, 'r_sel': lambda: agregados.total(periodo, cod_v),
+                        'atendidos': lambda: agregados.atendidos(periodo, cod_v)})
+    else:
+        sql_vv, p_vv = sql_vendas_periodo(periodo, 'Cod_Vendedor')
+        tarefas.update({
+            'm_sel': lambda: float(execute_scalar("SELECT ISNULL(SUM(Vlr_Cota), 0) FROM VEOBJ WHERE Cod_Vendedor = ? AND Ano_Ref = ? AND Mes_Ref = ?", [cod_v, hoje.year, hoje.month], t_q, nome='vendedor_meta') or 1),
+            'r_sel': lambda: float(execute_scalar(f"SELECT ISNULL(SUM(Vnd), 0) FROM ({sql_vv}) v WHERE v.Cod_Vendedor = ?", p_vv + [cod_v], t_q, nome='vendedor_realizado') or 0),
+            'atendidos': lambda: int(execute_scalar(f"SELECT COUNT(DISTINCT Cod_Cliente) FROM NFSCB WHERE Cod_Vendedor = ? AND Status = 'F' AND Cod_Estabe = 0 AND {f_mes}", [cod_v] + p_mes, t_q, nome='vendedor_atendidos') or 0),
+        })
+    kpi = executar_em_paralelo(tarefas, timeout=t_q, padroes={'m_sel': 1})
+    stats = {'total_carteira': kpi['total_carteira'], 'atendidos': kpi['atendidos']}
+    stats['positivacao'] = stats['atendidos'] / stats['total_carteira'] * 100 if stats['total_carteira'] > 0 else 0
+    return {'sel': projecao(kpi['m_sel'], kpi['r_sel'], sobre_projecao=True), 'stats': stats}
+
+ORDENS_RANKING = ('atingimento_proj', 'realizado', 'valor_projecao', 'meta', 'total_carteira', 'atendidos', 'positivacao', 'nome')
+
+def _linhas_ranking(hoje, periodo):
+    """Metas, vendas/atendidos e carteira de todos os vendedores ativos: três consultas agrupadas em paralelo."""
+    t_q = app.config['QUERY_TIMEOUT']
+    if usar_agregados():
+        tarefas = {'metas': lambda: agregados.metas_por_vendedor(hoje.year, hoje.month), 'vendas': lambda: agregados.vendas_por_vendedor(periodo)}
+    else:
+        f_mes, p_mes = filtro_emissao(periodo)
+        tarefas = {
+            'metas': lambda: dict(execute_query("SELECT Cod_Vendedor, ISNULL(SUM(Vlr_Cota), 0) FROM VEOBJ WHERE Ano_Ref = ? AND Mes_Ref = ? GROUP BY Cod_Vendedor",
+                                                [hoje.year, hoje.month], t_q, nome='ranking_metas')),
+            'vendas': lambda: {r[0]: (r[1], r[2]) for r in execute_query(f"""SELECT Cod_Vendedor, SUM(Vlr_TotalNota), COUNT(DISTINCT Cod_Cliente) FROM NFSCB WITH (NOLOCK)
+                WHERE Status = 'F' AND Cod_Estabe = 0 AND {f_mes} GROUP BY Cod_Vendedor""", p_mes, t_q, nome='ranking_vendas')},
+        }
+    tarefas['carteiras'] = lambda: dict(execute_query("SELECT Cod_Vendedor, COUNT(DISTINCT Cod_Client) FROM enxes WHERE Cod_Estabe = 0 GROUP BY Cod_Vendedor",
+                                                      timeout=t_q, nome='ranking_carteiras'))
+    kpi = executar_em_paralelo(tarefas, timeout=t_q, padroes={'metas': {}, 'vendas': {}, 'carteiras': {}})
+    linhas = []
+    for cod_v, nome in ref.vendedores():
+        realizado, atendidos = kpi['vendas'].get(cod_v, (0, 0))
+        carteira = int(kpi['carteiras'].get(cod_v, 0))
+        linha = {'codigo': cod_v, 'nome': nome, **projecao(float(kpi['metas'].get(cod_v, 0) or 0), float(realizado or 0), sobre_projecao=True),
+                 'total_carteira': carteira, 'atendidos': int(atendidos or 0)}
+        linha['positivacao'] = linha['atendidos'] / carteira * 100 if carteira > 0 else 0
+        linhas.append(linha)
+    return linhas
+
+def widget_ranking(ordem='atingimento_proj', crescente=False):
+    """Ranking de todos os vendedores no mês corrente; o cálculo fica em cache (por mês e marca d'água) e só a ordenação muda."""
+    hoje, periodo = _periodo_atual()
+    linhas = kpi_em_cache(('ranking', hoje.year, hoje.month, marca_dados()), lambda: _linhas_ranking(hoje, periodo))
+    return sorted(linhas, key=lambda l: (l[ordem], l['codigo']), reverse=not crescente)
+
+def widget_carteira(filtro, valor):
+    """Metas da carteira (Excel) e resumo de crédito/atraso, numa única agregação."""
+    hoje, periodo = _periodo_atual()
+    vendas_cli = agregados.vendas_por_cliente(periodo) if usar_agregados() else None
+    tot = totais_carteira(filtro, valor, periodo, hoje, vendas_cli, app.config['QUERY_TIMEOUT'])
+    return {'clie_proj': projecao(tot['meta'], tot['realizado']),
+            'geral_clie': {'limite': tot['limite'], 'debito': tot['debito'], 'atraso': tot['atraso']}}
+
+def widget_cliente_resumo(cliente_id):
+    hoje, periodo = _periodo_atual()
+    titulos = execute_query("SELECT Num_Documento, Par_Documento, Vlr_Documento, Vlr_Saldo, Dat_Emissao, Dat_Vencimento, DATEDIFF(DAY, Dat_Vencimento, GETDATE()) FROM CTREC WHERE Cod_Cliente = ? AND Vlr_Saldo > 0", [cliente_id], nome='cliente_titulos')
+    if usar_agregados():
+        v_at = agregados.total(periodo, cod_cliente=cliente_id)
+    else:
+        sql_vn, p_vn = sql_vendas_periodo(periodo)
+        v_at = float(execute_scalar(f"SELECT ISNULL(SUM(Vnd), 0) FROM ({sql_vn}) v WHERE v.Cod_Cliente = ?", p_vn + [cliente_id], nome='cliente_venda_mes') or 0)
+    objetivo = float(get_objetivos_excel().get(cliente_id, 0))
+    return {'vendas_atual': v_at, 'objetivo': objetivo, 'atingimento': (v_at / objetivo * 100 if objetivo > 0 else 0),
+            'dias_atraso': max([int(t[6]) for t in titulos if int(t[6]) > 0] or [0]), 'titulos_abertos': len(titulos)}
+
+def widget_cliente_historico(cliente_id):
+    """Vendas mensais dos últimos HISTORICO_MESES meses; meses fechados vêm do cache de histórico."""
+    hoje, meses = date.today(), app.config['HISTORICO_MESES']
+    if usar_agregados(periodo_ultimos_meses(meses, hoje)):
+        res_hist = agregados.historico_mensal(cliente_id, periodo_ultimos_meses(meses, hoje))
+    else:
+        try: res_hist = historico.mensal(cliente_id, meses, hoje)
+        except Exception as e:
+            logger.error(f"❌ Erro SQL (cliente_historico): {e}")
+            marcar_degradado('cliente_historico')
+            res_hist = []
+    return [{'ano': int(h[0]), 'mes': int(h[1]), 'total': float(h[2])} for h in res_hist]
+
+# Níveis do rollup regional = GROUPING_ID(cidade, bairro, operador)
+NIVEL_REGIAO, NIVEL_OPERADOR, NIVEL_TOTAL = 1, 6, 7
+
+def widget_regional(vendedor_id, periodo, top_ml=10):
+    """Tabela por cidade/bairro, top 10 bairros ML e totais do vendedor no período.
+
+    Uma única consulta (GROUPING SETS) devolve as linhas por bairro (com o ranking ML),
+    por operador e o total com clientes distintos; aqui só se remonta o JSON."""
+    f_per, p_per = filtro_emissao(periodo, 'nf.Dat_Emissao')
+    query = f"""SELECT GROUPING_ID(b.cidade, b.bairro, b.operador), b.cidade, b.bairro, b.operador,
+        SUM(CASE WHEN b.origem = 'ML' THEN b.vlr ELSE 0 END), SUM(CASE WHEN b.origem = 'ML' THEN 1 ELSE 0 END),
+        SUM(CASE WHEN b.origem = 'TL' THEN b.vlr ELSE 0 END), SUM(CASE WHEN b.origem = 'TL' THEN 1 ELSE 0 END),
+        SUM(b.vlr), COUNT(b.nota), COUNT(DISTINCT b.cliente),
+        ROW_NUMBER() OVER (PARTITION BY GROUPING_ID(b.cidade, b.bairro, b.operador) ORDER BY SUM(CASE WHEN b.origem = 'ML' THEN b.vlr ELSE 0 END) DESC)
+    FROM (SELECT LTRIM(RTRIM(ISNULL(nf.Cidade, 'NAO INF.'))) AS cidade, LTRIM(RTRIM(ISNULL(nf.Bairro, 'NAO INF.'))) AS bairro,
+                 ISNULL(ve.Nome_Guerra, 'NAO IDENT.') AS operador, nf.Cod_OrigemNfs AS origem, nf.Vlr_TotalNota AS vlr,
+                 nf.Num_Nota AS nota, nf.Cod_Cliente AS cliente
+          FROM nfscb nf WITH (NOLOCK) LEFT JOIN VENDE ve ON ve.Codigo = nf.Cod_VendTlmkt
+          WHERE nf.Cod_Estabe = 0 AND nf.Status = 'F' AND nf.Cod_Vendedor = ? AND {f_per}) b
+    GROUP BY GROUPING SETS ((b.cidade, b.bairro), (b.operador), ())
+    ORDER BY 1, 2, 3, 4"""
+    res = agregados.regional(periodo, vendedor_id) if usar_agregados(periodo) else execute_query(query, [vendedor_id] + p_per, nome='regional')
+    regioes, chart_ml, operadores = {}, [], []
+    stats = {'movel_qtd': 0, 'movel_vlr': 0.0, 'eletro_qtd': 0, 'eletro_vlr': 0.0, 'total_qtd': 0, 'total_vlr': 0.0, 'clientes_atendidos': 0}
+    for nivel, cid, bai, ope, ml_vlr, ml_qtd, tl_vlr, tl_qtd, vlr, qtd, clientes, ordem_ml in res:
+        if nivel == NIVEL_REGIAO:
+            regioes.setdefault(cid, []).append({'bairro': bai, 'ml': float(ml_vlr or 0), 'ml_qtd': int(ml_qtd or 0), 'total': float(vlr or 0)})
+            if ml_qtd and ordem_ml <= top_ml: chart_ml.append((ordem_ml, {'label': f"{cid}-{bai}", 'valor': float(ml_vlr)}))
+        elif nivel == NIVEL_OPERADOR:
+            operadores.append({'nome': ope, 'qtd': int(qtd or 0)})
+        elif nivel == NIVEL_TOTAL:
+            stats.update(movel_qtd=int(ml_qtd or 0), movel_vlr=float(ml_vlr or 0), eletro_qtd=int(tl_qtd or 0), eletro_vlr=float(tl_vlr or 0),
+                         total_qtd=int(qtd or 0), total_vlr=float(vlr or 0), clientes_atendidos=int(clientes or 0))
+    # Listas (e não dicts) para o JSON manter a ordem de cidades/bairros/operadores
+    stats['operadores'] = operadores
+    return {'regioes': [{'cidade': c, 'bairros': bs} for c, bs in regioes.items()],
+            'chart_ml': [item for _, item in sorted(chart_ml, key=lambda x: x[0])], 'stats': stats}
+
+@app.route('/api/widgets/empresa')
+@login_required
+@cache_resposta
+def api_widget_empresa():
+    return jsonify(widget_empresa())
+
+@app.route('/api/widgets/vendedor')
+@login_required
+@cache_resposta
+def api_widget_vendedor():
+    cod_v = request.args.get('valor', type=int)
+    if cod_v is None: return jsonify({'erro': 'vendedor inválido'}), 400
+    return jsonify(widget_vendedor(cod_v))
+
+@app.route('/api/widgets/ranking')
+@login_required
+@cache_resposta
+def api_widget_ranking():
+    ordem = request.args.get('ordem', 'atingimento_proj')
+    if ordem not in ORDENS_RANKING: ordem = 'atingimento_proj'
+    crescente = request.args.get('dir', 'asc' if ordem == 'nome' else 'desc') == 'asc'
+    return jsonify({'ordem': ordem, 'dir': 'asc' if crescente else 'desc', 'vendedores': widget_ranking(ordem, crescente)})
+
+@app.route('/api/widgets/carteira')
+@login_required
+@cache_resposta
+def api_widget_carteira():
+    return jsonify(widget_carteira(request.args.get('tipo', 'todos'), request.args.get('valor', '').strip()))
+
+@app.route('/api/widgets/cliente/<int:cliente_id>/resumo')
+@login_required
+@cache_resposta
+def api_widget_cliente_resumo(cliente_id):
+    return jsonify(widget_cliente_resumo(cliente_id))
+
+@app.route('/api/widgets/cliente/<int:cliente_id>/historico')
+@login_required
+@cache_resposta
+def api_widget_cliente_historico(cliente_id):
+    return jsonify(widget_cliente_historico(cliente_id))
+
+@app.route('/api/historico/prefetch', methods=['POST'])
+@login_required
+def api_historico_prefetch():
+    """Carrega os meses fechados de toda a carteira do vendedor, para as análises de cliente seguintes saírem do cache.
+
+    Meses fechados só mudam na virada do mês: uma vez por vendedor e dia basta (marca no próprio cache do histórico).
+    """
+    cod_v = request.values.get('vendedor', type=int)
+    if cod_v is None: return jsonify({'erro': 'vendedor inválido'}), 400
+    hoje = date.today()
+    feito = ('historico_prefetch', cod_v, hoje.isoformat())
+    if usar_agregados() or historico.cache.get(feito): return jsonify({'consultados': 0})
+    carteira = ref.carteira(cod_v)
+    try: consultados = historico.prefetch(carteira, app.config['HISTORICO_MESES'], hoje)
+    except Exception as e:
+        logger.error(f"❌ Erro SQL (historico_prefetch): {e}")
+        return jsonify({'erro': 'falha ao consultar o histórico'}), 503
+    historico.cache.set(feito, True, ttl=86400)
+    return jsonify({'clientes': len(carteira), 'consultados': consultados})
+
+@app.route('/api/widgets/regional')
+@login_required
+@cache_resposta
+def api_widget_regional():
+    vendedor_id = request.args.get('vendedor', type=int)
+    try: periodo = periodo_datas(request.args.get('inicio', ''), request.args.get('fim', ''))
+    except ValueError: vendedor_id = None
+    if vendedor_id is None: return jsonify({'erro': 'vendedor ou período inválido'}), 400
+    return jsonify(widget_regional(vendedor_id, periodo))
+
+# ============================================
+# DASHBOARD v45.1 (ESQUELETO + WIDGETS)
 # ============================================
 
 @app.route('/dashboard')
@@ -148,55 +790,9 @@ def logout():
 def dashboard():
     filtro = request.args.get('tipo', 'todos')
     valor = request.args.get('valor', '').strip()
-    
-    # Datas dinâmicas para o faturamento
-    hoje = date.today()
-    mes, ano = hoje.month, hoje.year
-    cal = {'uteis': 21, 'trabalhados': 13}
-    obj_ex = get_objetivos_excel()
-    v_list = execute_query("SELECT Codigo, Nome_guerra FROM vende WHERE Bloqueado = 0 ORDER BY Nome_guerra")
-
-    # 1. Realizado Geral Empresa (Mês Atual)
-    r_cia = float(execute_query(f"SELECT ISNULL(SUM(Vlr_TotalNota), 0) FROM NFSCB WITH (NOLOCK) WHERE Status = 'F' AND Cod_Estabe = 0 AND MONTH(Dat_Emissao) = {mes} AND YEAR(Dat_Emissao) = {ano}")[0][0] or 0)
-    m_cia = float(execute_query(f"SELECT ISNULL(SUM(Vlr_Cota), 0) FROM VEOBJ WHERE Ano_Ref = {ano} AND Mes_Ref = {mes}")[0][0] or 1)
-    
-    # 2. Realizado por Vendedor
-    m_sel, r_sel, p_sel, a_sel = 0, 0, 0, 0
-    v_stats = {'total_carteira': 0, 'atendidos': 0}
-    if filtro == 'vendedor' and valor:
-        m_sel = float(execute_query(f"SELECT ISNULL(SUM(Vlr_Cota), 0) FROM VEOBJ WHERE Cod_Vendedor = {int(valor)} AND Ano_Ref = {ano} AND Mes_Ref = {mes}")[0][0] or 1)
-        r_sel = float(execute_query(f"SELECT ISNULL(SUM(Vlr_TotalNota), 0) FROM NFSCB WHERE Cod_Vendedor = {int(valor)} AND Status = 'F' AND Cod_Estabe = 0 AND MONTH(Dat_Emissao) = {mes} AND YEAR(Dat_Emissao) = {ano}")[0][0] or 0)
-        p_sel = (r_sel / cal['trabalhados'] * cal['uteis'])
-        a_sel = (p_sel / m_sel * 100)
-        v_stats['total_carteira'] = int(execute_query(f"SELECT COUNT(DISTINCT Cod_Client) FROM enxes WHERE Cod_Vendedor = {int(valor)} AND Cod_Estabe = 0")[0][0] or 0)
-        v_stats['atendidos'] = int(execute_query(f"SELECT COUNT(DISTINCT Cod_Cliente) FROM NFSCB WHERE Cod_Vendedor = {int(valor)} AND Status = 'F' AND Cod_Estabe = 0 AND MONTH(Dat_Emissao) = {mes} AND YEAR(Dat_Emissao) = {ano}")[0][0] or 0)
-
-    # 3. Listagem de Clientes e Faturamento Individual
-    clientes_finais, t_m_c, t_v_c, t_lim, t_deb, q_atr = [], 0, 0, 0, 0, 0
-    query_clie = f"""SELECT cl.Codigo, cl.Razao_Social, ISNULL(cl.Limite_Credito, 0), ISNULL(cl.Total_Debito, 0), 
-    (SELECT ISNULL(SUM(Vlr_TotalNota), 0) FROM NFSCB WHERE Cod_Cliente = cl.Codigo AND Status = 'F' AND Cod_Estabe = 0 AND MONTH(Dat_Emissao) = {mes} AND YEAR(Dat_Emissao) = {ano}) as Vnd
-    FROM clien cl INNER JOIN enxes en ON cl.Codigo = en.Cod_Client AND en.Cod_Estabe = 0 WHERE cl.Bloqueado = 0"""
-    
-    if filtro == 'vendedor' and valor: query_clie += f" AND en.Cod_Vendedor = {int(valor)}"
-    elif filtro == 'cliente' and valor: query_clie += f" AND (cl.Codigo LIKE '%{valor}%' OR cl.Razao_Social LIKE '%{valor}%')"
-
-    res_db = execute_query(query_clie)
-    for r in res_db:
-        m_c = obj_ex.get(r[0], 0); vnd = float(r[4] or 0)
-        t_m_c += m_c; t_v_c += vnd; t_lim += float(r[2]); t_deb += float(r[3])
-        res_at = execute_query(f"SELECT MIN(Dat_Vencimento) FROM CTREC WHERE Cod_Cliente = {r[0]} AND Vlr_Saldo > 0 AND Status IN ('A', 'P')")
-        atr_d = 0
-        if res_at and res_at[0][0]:
-            venc = res_at[0][0].date() if isinstance(res_at[0][0], datetime) else res_at[0][0]
-            if venc < hoje: atr_d = (hoje - venc).days; q_atr += 1
-        if valor or len(res_db) < 150:
-            clientes_finais.append([r[0], r[1], 'Não', float(r[2]), float(r[3]), 0, atr_d, '', '', 0, vnd, m_c, (vnd/m_c*100 if m_c>0 else 0)])
-
-    return render_template('dashboard.html', clientes=clientes_finais, vendedores=v_list, filtro_ativo=filtro, valor_filtro=valor,
-                         proj={'meta': m_cia, 'realizado': r_cia, 'valor_projecao': (r_cia/cal['trabalhados']*cal['uteis']), 'atingimento_proj': (r_cia/m_cia*100)},
-                         sel={'meta': m_sel, 'realizado': r_sel, 'valor_projecao': p_sel, 'atingimento_proj': a_sel},
-                         clie_proj={'meta': t_m_c, 'realizado': t_v_c, 'valor_projecao': (t_v_c/cal['trabalhados']*cal['uteis']), 'atingimento_proj': (t_v_c/t_m_c*100 if t_m_c>0 else 0)},
-                         geral_clie={'limite': t_lim, 'debito': t_deb, 'atraso': q_atr}, vendedor_stats=v_stats)
+    if filtro == 'vendedor' and not valor.isdigit(): filtro, valor = 'todos', ''
+    return render_template('dashboard.html', vendedores=ref.vendedores(), filtro_ativo=filtro, valor_filtro=valor,
+                           frescor=agregados.frescor() if usar_agregados() else None)
 
 # ============================================
 # ANÁLISE CLIENTE (CONSISTÊNCIA DE DADOS)
@@ -205,17 +801,10 @@ def dashboard():
 @app.route('/analise/<int:cliente_id>')
 @login_required
 def analise_cliente(cliente_id):
-    mes, ano = datetime.now().month, datetime.now().year
-    res = execute_query(f"SELECT Codigo, Razao_Social, ISNULL(Limite_Credito, 0), ISNULL(Total_Debito, 0) FROM clien WHERE Codigo = {cliente_id}")
-    if not res: return redirect(url_for('dashboard'))
-    titulos = execute_query(f"SELECT Num_Documento, Par_Documento, Vlr_Documento, Vlr_Saldo, Dat_Emissao, Dat_Vencimento, DATEDIFF(DAY, Dat_Vencimento, GETDATE()) FROM CTREC WHERE Cod_Cliente = {cliente_id} AND Vlr_Saldo > 0")
-    d_atr_max = max([int(t[6]) for t in titulos if int(t[6]) > 0] or [0])
-    v_at = float(execute_query(f"SELECT ISNULL(SUM(Vlr_TotalNota), 0) FROM NFSCB WHERE Cod_Cliente = {cliente_id} AND Status = 'F' AND Cod_Estabe = 0 AND MONTH(Dat_Emissao) = {mes} AND YEAR(Dat_Emissao) = {ano}")[0][0] or 0)
-    sql_hist = f"SELECT YEAR(Dat_Emissao), MONTH(Dat_Emissao), SUM(Vlr_TotalNota) FROM NFSCB WITH (NOLOCK) WHERE Cod_Cliente = {cliente_id} AND Status = 'F' AND Cod_Estabe = 0 AND YEAR(Dat_Emissao) IN (2024, 2025, 2026) GROUP BY YEAR(Dat_Emissao), MONTH(Dat_Emissao) ORDER BY 1, 2"
-    res_hist = execute_query(sql_hist)
-    comparativo_data = [{'ano': int(h[0]), 'mes': int(h[1]), 'total': float(h[2])} for h in res_hist]
-    v_list = execute_query("SELECT Codigo, Nome_guerra FROM vende WHERE Bloqueado = 0 ORDER BY Nome_guerra")
-    return render_template('analise_cliente.html', cliente=res[0], limite_credito=float(res[0][2]), saldo=float(res[0][2]-res[0][3]), dias_atraso=d_atr_max, comparativo=comparativo_data, objetivo=get_objetivos_excel().get(cliente_id, 0), vendas_atual=v_at, titulos=titulos, vendedores=v_list)
+    cli = ref.cliente(cliente_id)
+    if not cli: return redirect(url_for('dashboard'))
+    return render_template('analise_cliente.html', cliente=cli, limite_credito=float(cli[2]), saldo=float(cli[2]-cli[3]), vendedores=ref.vendedores(),
+                           frescor=agregados.frescor() if usar_agregados() else None)
 
 # ============================================
 # MAPA REGIONAL (ISO DATE FIX)
@@ -226,31 +815,148 @@ def analise_cliente(cliente_id):
 def mapa_vendas():
     inicio_raw = request.args.get('inicio', '2026-01-01'); fim_raw = request.args.get('fim', '2026-01-31')
     vendedor_id = request.args.get('vendedor', '')
-    v_list = execute_query("SELECT Codigo, Nome_guerra FROM vende WHERE Bloqueado = 0 ORDER BY Nome_guerra")
-    regioes, chart_ml, stats = {}, [], {'movel_qtd': 0, 'movel_vlr': 0.0, 'eletro_qtd': 0, 'eletro_vlr': 0.0, 'total_qtd': 0, 'total_vlr': 0.0, 'clientes_atendidos': 0, 'operadores': {}}
-
     if vendedor_id:
-        d_ini, d_fim = inicio_raw.replace("-", ""), fim_raw.replace("-", "")
-        query = f"""SELECT ISNULL(nf.Cidade, 'NAO INF.'), ISNULL(nf.Bairro, 'NAO INF.'), nf.Cod_OrigemNfs, SUM(nf.Vlr_TotalNota), COUNT(nf.Num_Nota), ISNULL(ve.Nome_Guerra, 'NAO IDENT.') 
-        FROM nfscb nf WITH (NOLOCK) LEFT JOIN VENDE ve ON ve.Codigo = nf.Cod_VendTlmkt
-        WHERE nf.Cod_Estabe = 0 AND nf.Status = 'F' AND nf.Cod_Vendedor = {int(vendedor_id)} AND nf.Dat_Emissao BETWEEN '{d_ini}' AND '{d_fim} 23:59:59'
-        GROUP BY nf.Cidade, nf.Bairro, nf.Cod_OrigemNfs, ve.Nome_Guerra"""
-        res = execute_query(query)
-        for r in res:
-            cid, bai, ori, vlr, qtd, ope = r[0].strip(), r[1].strip(), r[2], float(r[3]), int(r[4]), r[5]
-            if ori == 'ML': stats['movel_qtd'] += qtd; stats['movel_vlr'] += vlr; chart_ml.append({'label': f"{cid}-{bai}", 'valor': vlr})
-            elif ori == 'TL': stats['eletro_qtd'] += qtd; stats['eletro_vlr'] += vlr
-            stats['total_qtd'] += qtd; stats['total_vlr'] += vlr
-            stats['operadores'][ope] = stats['operadores'].get(ope, 0) + qtd
-            if cid not in regioes: regioes[cid] = {}
-            if bai not in regioes[cid]: regioes[cid][bai] = {'ML': [0,0], 'total': 0.0}
-            if ori == 'ML': regioes[cid][bai]['ML'][0] += vlr; regioes[cid][bai]['ML'][1] += qtd
-            regioes[cid][bai]['total'] += vlr
-        chart_ml = sorted(chart_ml, key=lambda x: x['valor'], reverse=True)[:10]
-        res_clie = execute_query(f"SELECT COUNT(DISTINCT Cod_Cliente) FROM nfscb WHERE Status='F' AND Cod_Estabe=0 AND Cod_Vendedor={int(vendedor_id)} AND Dat_Emissao BETWEEN '{d_ini}' AND '{d_fim} 23:59:59'")
-        if res_clie: stats['clientes_atendidos'] = int(res_clie[0][0])
-
-    return render_template('mapa.html', regioes=regioes, vendedores=v_list, chart_ml=chart_ml, data_inicio=inicio_raw, data_fim=fim_raw, vendedor_selecionado=vendedor_id, stats=stats)
+        try: periodo_datas(inicio_raw, fim_raw)
+        except ValueError: return redirect(url_for('mapa_vendas'))
+    return render_template('mapa.html', vendedores=ref.vendedores(), data_inicio=inicio_raw, data_fim=fim_raw, vendedor_selecionado=vendedor_id,
+                           frescor=agregados.frescor() if usar_agregados() else None)
+
+# ============================================
+# EXPORTAÇÕES (CSV / XLSX EM STREAMING)
+# ============================================
+# As linhas saem do banco por fetchmany (iter_query) direto para a resposta:
+# memória constante e primeiros bytes antes de a consulta terminar. Um erro no
+# meio do caminho vira uma última linha de aviso (o cabeçalho HTTP já foi).
+# Cada exportação segura uma conexão do pool até o download terminar; por isso
+# há no máximo EXPORTACOES_SIMULTANEAS por processo (bem abaixo de DB_POOL_SIZE),
+# e as demais recebem 503 na hora em vez de esgotar o pool dos dashboards.
+
+_vagas_exportacao = threading.BoundedSemaphore(int(os.getenv('EXPORTACOES_SIMULTANEAS', max(1, int(os.getenv('DB_POOL_SIZE', 10)) // 4))))
+
+def _linhas_com_aviso(linhas, nome):
+    try:
+        yield from linhas
+    except Exception as e:
+        logger.error(f"❌ Erro SQL ({nome}): {e}")
+        yield ['⚠️ Exportação interrompida por erro no banco de dados; o arquivo está incompleto.']
+
+def resposta_exportacao(nome, formato, colunas, linhas):
+    if not _vagas_exportacao.acquire(timeout=2):
+        resp = jsonify({'erro': 'muitas exportações em andamento; tente novamente em instantes'})
+        resp.status_code, resp.headers['Retry-After'] = 503, '30'
+        return resp
+    gerar, mimetype = FORMATOS[formato]
+    vaga = {'livre': False}
+    def liberar():
+        if not vaga['livre']: vaga['livre'] = True; _vagas_exportacao.release()
+    def pedacos():
+        try: yield from gerar(colunas, _linhas_com_aviso(linhas, f'exportar_{nome}'))
+        finally: liberar()
+    resp = app.response_class(stream_with_context(pedacos()), mimetype=mimetype)
+    resp.call_on_close(liberar)  # download abortado antes do primeiro pedaço
+    resp.headers['Content-Disposition'] = f'attachment; filename="{nome}_{date.today():%Y%m%d}.{formato}"'
+    resp.headers['X-Accel-Buffering'] = 'no'  # proxies não devem segurar o stream
+    return resp
+
+def linhas_exportacao_carteira(filtro, valor):
+    hoje, periodo = _periodo_atual()
+    local = usar_agregados()
+    vendas_idx = indexar(agregados.vendas_por_cliente(periodo)) if local else None  # ordenado uma vez, não a cada lote
+    base, params = sql_carteira(filtro, valor, periodo, local)
+    linhas = iter_query(f"SELECT {colunas_carteira(local)} {base} ORDER BY cl.Codigo", params, lote=LOTE, nome='exportar_carteira')
+    while lote := list(islice(linhas, LOTE)):
+        for c in tabela_carteira(lote, hoje, vendas_idx):
+            yield [c['codigo'], c['nome'], c['limite'], c['debito'], c['venda'], c['meta'], c['atingimento'], c['atraso']]
+
+@app.route('/exportar/carteira.<formato>')
+@login_required
+def exportar_carteira(formato):
+    if formato not in FORMATOS: abort(404)
+    filtro, valor = request.args.get('tipo', 'todos'), request.args.get('valor', '').strip()
+    if filtro == 'vendedor' and not valor.isdigit(): filtro, valor = 'todos', ''
+    return resposta_exportacao('carteira', formato, ['Código', 'Cliente', 'Limite', 'Débito', 'Venda Mês', 'Meta', 'Atingimento %', 'Dias Atraso'],
+                               linhas_exportacao_carteira(filtro, valor))
+
+@app.route('/exportar/titulos.<formato>')
+@login_required
+def exportar_titulos(formato):
+    """Títulos em aberto (CTREC) de um cliente (?cliente=) ou da carteira de um vendedor (?vendedor=)."""
+    if formato not in FORMATOS: abort(404)
+    cliente, vendedor = request.args.get('cliente', type=int), request.args.get('vendedor', type=int)
+    if cliente is not None: filtro, param = "t.Cod_Cliente = ?", cliente
+    elif vendedor is not None: filtro, param = "EXISTS (SELECT 1 FROM enxes en WHERE en.Cod_Client = t.Cod_Cliente AND en.Cod_Estabe = 0 AND en.Cod_Vendedor = ?)", vendedor
+    else: return jsonify({'erro': 'informe cliente ou vendedor'}), 400
+    query = f"""SELECT t.Cod_Cliente, cl.Razao_Social, t.Num_Documento, t.Par_Documento, t.Vlr_Documento, t.Vlr_Saldo, t.Dat_Emissao, t.Dat_Vencimento,
+        DATEDIFF(DAY, t.Dat_Vencimento, GETDATE()) FROM CTREC t WITH (NOLOCK) JOIN clien cl ON cl.Codigo = t.Cod_Cliente
+        WHERE t.Vlr_Saldo > 0 AND {filtro} ORDER BY t.Cod_Cliente, t.Dat_Vencimento, t.Num_Documento, t.Par_Documento"""
+    return resposta_exportacao(f"titulos_{cliente if cliente is not None else f'vendedor_{vendedor}'}", formato,
+                               ['Código', 'Cliente', 'Documento', 'Parcela', 'Valor', 'Saldo', 'Emissão', 'Vencimento', 'Dias Atraso'],
+                               iter_query(query, [param], lote=LOTE, nome='exportar_titulos'))
+
+@app.route('/exportar/regional.<formato>')
+@login_required
+def exportar_regional(formato):
+    """Quebra do /mapa: cidade, bairro, origem e operador, com notas, faturamento e clientes distintos."""
+    if formato not in FORMATOS: abort(404)
+    vendedor_id = request.args.get('vendedor', type=int)
+    try: periodo = periodo_datas(request.args.get('inicio', ''), request.args.get('fim', ''))
+    except ValueError: vendedor_id = None
+    if vendedor_id is None: return jsonify({'erro': 'vendedor ou período inválido'}), 400
+    f_per, p_per = filtro_emissao(periodo, 'nf.Dat_Emissao')
+    query = f"""SELECT b.cidade, b.bairro, b.origem, b.operador, COUNT(b.nota), SUM(b.vlr), COUNT(DISTINCT b.cliente)
+    FROM (SELECT LTRIM(RTRIM(ISNULL(nf.Cidade, 'NAO INF.'))) AS cidade, LTRIM(RTRIM(ISNULL(nf.Bairro, 'NAO INF.'))) AS bairro,
+                 ISNULL(nf.Cod_OrigemNfs, '') AS origem, ISNULL(ve.Nome_Guerra, 'NAO IDENT.') AS operador, nf.Vlr_TotalNota AS vlr,
+                 nf.Num_Nota AS nota, nf.Cod_Cliente AS cliente
+          FROM nfscb nf WITH (NOLOCK) LEFT JOIN VENDE ve ON ve.Codigo = nf.Cod_VendTlmkt
+          WHERE nf.Cod_Estabe = 0 AND nf.Status = 'F' AND nf.Cod_Vendedor = ? AND {f_per}) b
+    GROUP BY b.cidade, b.bairro, b.origem, b.operador ORDER BY b.cidade, b.bairro, b.origem, b.operador"""
+    return resposta_exportacao(f"regional_{vendedor_id}", formato, ['Cidade', 'Bairro', 'Origem', 'Operador', 'Notas', 'Faturamento', 'Clientes'],
+                               iter_query(query, [vendedor_id] + p_per, lote=LOTE, nome='exportar_regional'))
+
+# ============================================
+# RANKING DE VENDEDORES (ESQUELETO + WIDGET)
+# ============================================
+
+@app.route('/ranking')
+@login_required
+def ranking_vendedores():
+    ordem = request.args.get('ordem', 'atingimento_proj')
+    if ordem not in ORDENS_RANKING: ordem = 'atingimento_proj'
+    dir_ = request.args.get('dir', 'asc' if ordem == 'nome' else 'desc')
+    return render_template('ranking.html', ordem=ordem, dir='asc' if dir_ == 'asc' else 'desc', mes_ref=date.today().strftime('%m/%Y'),
+                           frescor=agregados.frescor() if usar_agregados() else None)
+
+# ============================================
+# PRÉ-AQUECIMENTO DOS CACHES (AGENDADOR)
+# ============================================
+# Na subida e nos horários de AQUECIMENTO_HORARIOS: cadastro de vendedores,
+# carteiras (uma consulta para todas), índice de busca, objetivos do Excel,
+# KPIs da empresa e ranking. Progresso e tempos em /api/aquecimento.
+# Carteiras, índice de busca e KPIs só rodam no worker que pegar o
+# arrendamento (database/aquecimento.sqlite3); os outros só aquecem o que é local.
+
+def _aquecer_kpis():
+    widget_empresa()
+    return len(widget_ranking())
+
+aquecimento = Aquecimento([
+    ('vendedores', lambda: len(ref.vendedores())),
+    ('carteiras', lambda: ref.carregar_carteiras()),
+    ('busca_clientes', lambda: len(busca_clientes())),
+    ('objetivos', lambda: len(objetivos.get())),
+    ('kpis', _aquecer_kpis),
+], ler_horarios(app.config['AQUECIMENTO_HORARIOS']), app.config['AQUECIMENTO_INTERVALO'],
+   Arrendamento(os.getenv('AQUECIMENTO_PATH', os.path.join(app.root_path, 'database', 'aquecimento.sqlite3')), 'aquecimento',
+                max(600, app.config['AQUECIMENTO_INTERVALO'] * 3)) if app.config['AQUECIMENTO'] else None,
+   so_lider=('carteiras', 'busca_clientes', 'kpis'))
+if app.config['AQUECIMENTO']: aquecimento.iniciar()
+
+@app.route('/api/aquecimento', methods=['GET', 'POST'])
+@login_required
+def api_aquecimento():
+    """Estado do pré-aquecimento (tempo de cada tarefa); POST dispara uma execução agora."""
+    if request.method == 'POST': return jsonify({'disparado': aquecimento.disparar(), **aquecimento.status()}), 202
+    return jsonify(aquecimento.status())
 
 if __name__ == '__main__':
-    app.run(host='0.0.0.0', port=5000, debug=True)
\ No newline at end of file
+    app.run(host='0.0.0.0', port=5000, debug=True)
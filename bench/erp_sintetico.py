@@ -0,0 +1,226 @@
+import os
+import re
+import random
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta
+from functools import lru_cache
+
+# ============================================
+# ERP SINTÉTICO (SQLITE NO LUGAR DO SQL SERVER)
+# ============================================
+# Gera vende/clien/enxes/NFSCB/VEOBJ/CTREC em escala configurável e expõe um
+# pool com a mesma interface do ConnectionPool (connection(), status()). O
+# T-SQL do app é traduzido para SQLite na hora de executar, e datas voltam como
+# datetime, como no pyodbc.
+
+_ESQUEMA = """
+CREATE TABLE vende (Codigo INTEGER PRIMARY KEY, Nome_guerra TEXT, Bloqueado INTEGER);
+CREATE TABLE clien (Codigo INTEGER PRIMARY KEY, Razao_Social TEXT, Limite_Credito REAL, Total_Debito REAL, Bloqueado INTEGER);
+CREATE TABLE enxes (Cod_Client INTEGER, Cod_Vendedor INTEGER, Cod_Estabe INTEGER);
+CREATE TABLE NFSCB (Num_Nota INTEGER PRIMARY KEY, Cod_Estabe INTEGER, Status TEXT, Dat_Emissao TEXT, Cod_Cliente INTEGER,
+    Cod_Vendedor INTEGER, Vlr_TotalNota REAL, Cidade TEXT, Bairro TEXT, Cod_OrigemNfs TEXT, Cod_VendTlmkt INTEGER);
+CREATE TABLE VEOBJ (Ano_Ref INTEGER, Mes_Ref INTEGER, Cod_Vendedor INTEGER, Vlr_Cota REAL);
+CREATE TABLE CTREC (Num_Documento INTEGER, Par_Documento INTEGER, Cod_Cliente INTEGER, Vlr_Documento REAL, Vlr_Saldo REAL,
+    Dat_Emissao TEXT, Dat_Vencimento TEXT, Status TEXT);
+"""
+
+# Índices equivalentes aos que o ERP tem nas colunas filtradas pelo app
+_INDICES = """
+CREATE INDEX ix_nfscb_emissao ON NFSCB (Dat_Emissao);
+CREATE INDEX ix_nfscb_cliente ON NFSCB (Cod_Cliente, Dat_Emissao);
+CREATE INDEX ix_nfscb_vendedor ON NFSCB (Cod_Vendedor, Dat_Emissao);
+CREATE INDEX ix_enxes_vendedor ON enxes (Cod_Vendedor, Cod_Estabe);
+CREATE INDEX ix_enxes_cliente ON enxes (Cod_Client);
+CREATE INDEX ix_ctrec_cliente ON CTREC (Cod_Cliente);
+CREATE INDEX ix_veobj ON VEOBJ (Ano_Ref, Mes_Ref, Cod_Vendedor);
+"""
+
+_CIDADES = {'FORTALEZA': ['ALDEOTA', 'MEIRELES', 'CENTRO', 'MESSEJANA', 'PARANGABA', 'BENFICA', 'MONTESE', 'PAPICU'],
+            'CAUCAIA': ['CENTRO', 'JUREMA', 'ICARAI'], 'MARACANAU': ['CENTRO', 'PAJUCARA', 'JEREISSATI'],
+            'SOBRAL': ['CENTRO', 'DOM EXPEDITO'], 'JUAZEIRO DO NORTE': ['CENTRO', 'TRIANGULO', 'LAGOA SECA']}
+_NOMES = ['FARMACIA', 'DROGARIA', 'DROGA', 'FARMA', 'BOTICA']
+_SOBRENOMES = ['SAO JOAO', 'POPULAR', 'BOA SAUDE', 'CENTRAL', 'DO POVO', 'VIDA', 'SANTA LUZIA', 'PAGUE MENOS', 'NOSSA SENHORA', 'BEM ESTAR']
+
+def escala(notas):
+    """Tamanhos derivados do nº de notas (1k a 1M)."""
+    clientes = max(50, notas // 25)
+    return {'notas': notas, 'clientes': clientes, 'vendedores': max(5, clientes // 150), 'titulos': max(100, notas // 3), 'meses': 36}
+
+def _fmt(d):
+    return d.strftime('%Y-%m-%d %H:%M:%S')
+
+def gerar(path, notas=10_000, semente=42, hoje=None):
+    """Cria (ou recria) o banco sintético em `path`; devolve o dict de escala."""
+    esc = escala(notas)
+    rnd = random.Random(semente)
+    hoje = hoje or date.today()
+    inicio = date(hoje.year - 3, hoje.month, 1)
+    dias = (hoje - inicio).days + 1
+    if os.path.exists(path): os.remove(path)
+    conn = sqlite3.connect(path)
+    try:
+        conn.executescript("PRAGMA journal_mode=OFF; PRAGMA synchronous=OFF;" + _ESQUEMA)
+        V, C = esc['vendedores'], esc['clientes']
+        conn.executemany("INSERT INTO vende VALUES (?, ?, ?)", ((v, f"VEND{v:04d}", int(rnd.random() < 0.1)) for v in range(1, V + 1)))
+        conn.executemany("INSERT INTO clien VALUES (?, ?, ?, ?, ?)", (
+            (c, f"{rnd.choice(_NOMES)} {rnd.choice(_SOBRENOMES)} {c}", round(rnd.uniform(1_000, 50_000), 2),
+             round(rnd.uniform(0, 20_000), 2), int(rnd.random() < 0.05)) for c in range(1, C + 1)))
+        vendedor_de = {c: rnd.randint(1, V) for c in range(1, C + 1)}
+        enxes = [(c, v, 0) for c, v in vendedor_de.items()]
+        enxes += [(c, rnd.randint(1, V), 0) for c in rnd.sample(range(1, C + 1), C // 10)]  # parte da carteira é compartilhada
+        conn.executemany("INSERT INTO enxes VALUES (?, ?, ?)", enxes)
+
+        cidades = [(cid, bai) for cid, bairros in _CIDADES.items() for bai in bairros]
+        local_de = {c: rnd.choice(cidades) for c in range(1, C + 1)}
+        def linhas_nf():
+            for n in range(1, notas + 1):
+                c = rnd.randint(1, C)
+                cid, bai = local_de[c]
+                emissao = inicio + timedelta(days=rnd.randrange(dias))
+                yield (n, 0 if rnd.random() < 0.9 else 1, 'F' if rnd.random() < 0.95 else 'C', _fmt(datetime(emissao.year, emissao.month, emissao.day)),
+                       c, vendedor_de[c], round(rnd.lognormvariate(6, 1), 2), cid if rnd.random() < 0.98 else None, bai,
+                       rnd.choice(('ML', 'ML', 'TL', 'BA')), rnd.randint(1, V) if rnd.random() < 0.7 else None)
+        conn.executemany("INSERT INTO NFSCB VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", linhas_nf())
+
+        cota = 3 * notas * 400 / esc['meses'] / V  # ~ticket médio x notas/mês por vendedor
+        conn.executemany("INSERT INTO VEOBJ VALUES (?, ?, ?, ?)", (
+            (a, m, v, round(cota * rnd.uniform(0.7, 1.3), 2))
+            for a, m in sorted({(d.year, d.month) for d in (inicio + timedelta(days=k) for k in range(0, dias + 31, 28))})
+            for v in range(1, V + 1)))
+
+        def linhas_ctrec():
+            for t in range(1, esc['titulos'] + 1):
+                emissao = inicio + timedelta(days=rnd.randrange(dias))
+                venc = emissao + timedelta(days=rnd.choice((28, 35, 42, 56)))
+                valor = round(rnd.lognormvariate(6, 1), 2)
+                aberto = venc >= hoje - timedelta(days=120) and rnd.random() < 0.6
+                yield (t, rnd.randint(1, 3), rnd.randint(1, C), valor, valor if aberto else 0.0, _fmt(datetime(emissao.year, emissao.month, emissao.day)),
+                       _fmt(datetime(venc.year, venc.month, venc.day)), rnd.choice(('A', 'P')) if aberto else 'L')
+        conn.executemany("INSERT INTO CTREC VALUES (?, ?, ?, ?, ?, ?, ?, ?)", linhas_ctrec())
+        conn.executescript(_INDICES + "ANALYZE;")
+        conn.commit()
+    finally:
+        conn.close()
+    return esc
+
+# ---------- tradução T-SQL -> SQLite ----------
+
+_TRADUCOES = [
+    (re.compile(r'\s+WITH\s*\(NOLOCK\)', re.I), ''),
+    (re.compile(r'\bISNULL\(', re.I), 'IFNULL('),
+    (re.compile(r'DATEDIFF\(DAY,\s*([\w.]+),\s*GETDATE\(\)\)', re.I), r"CAST(julianday('now', 'localtime') - julianday(\1) AS INTEGER)"),
+    (re.compile(r'\bYEAR\(([\w.]+)\)', re.I), r"CAST(strftime('%Y', \1) AS INTEGER)"),
+    (re.compile(r'\bMONTH\(([\w.]+)\)', re.I), r"CAST(strftime('%m', \1) AS INTEGER)"),
+    (re.compile(r'\bCAST\(([\w.]+) AS DATE\)', re.I), r'date(\1)'),
+    (re.compile(r'\bGETDATE\(\)', re.I), "datetime('now', 'localtime')"),
+]
+_TOP = re.compile(r'^\s*SELECT\s+TOP\s*\(\?\)', re.I)
+_GROUPING_SETS = re.compile(r'\bGROUP BY\s+GROUPING SETS\s*\(', re.I)
+_GROUPING_ID = re.compile(r'\bGROUPING_ID\(([^)]*)\)', re.I)
+_DATA = re.compile(r'^\d{4}-\d{2}-\d{2}( \d{2}:\d{2}:\d{2})?$')
+
+def _fecha(sql, i):
+    """Índice do parêntese que fecha o aberto em sql[i - 1]."""
+    nivel = 1
+    while nivel:
+        nivel += {'(': 1, ')': -1}.get(sql[i], 0); i += 1
+    return i - 1
+
+def _from_externo(sql):
+    nivel = 0
+    for m in re.finditer(r'[()]|\bFROM\b', sql, re.I):
+        if m.group() == '(': nivel += 1
+        elif m.group() == ')': nivel -= 1
+        elif not nivel: return m.start()
+    raise ValueError('consulta sem FROM')
+
+def _expandir_grouping_sets(sql):
+    """SQLite não tem GROUPING SETS: vira um UNION ALL com um GROUP BY por conjunto (parâmetros repetidos por ramo)."""
+    m = _GROUPING_SETS.search(sql)
+    fim = _fecha(sql, m.end())
+    conjuntos = [[c.strip() for c in g.split(',') if c.strip()] for g in re.findall(r'\(([^()]*)\)', sql[m.end():fim])]
+    cabeca, resto = sql[:m.start()], sql[fim + 1:]
+    i = _from_externo(cabeca)
+    selecao, origem = cabeca[:i], cabeca[i:]
+    todas = {c for g in conjuntos for c in g}
+    ramos = []
+    for grupo in conjuntos:
+        sel = _GROUPING_ID.sub(lambda g: str(sum(1 << k for k, c in enumerate(reversed([a.strip() for a in g.group(1).split(',')])) if c not in grupo)), selecao)
+        for c in todas - set(grupo): sel = re.sub(re.escape(c) + r'\b', 'NULL', sel)
+        ramos.append(sel + origem + (f"GROUP BY {', '.join(grupo)} " if grupo else ''))
+    return ' UNION ALL '.join(ramos) + resto
+
+@lru_cache(maxsize=512)
+def traduzir(sql):
+    """Devolve (sql_sqlite, top): com `top`, o 1º parâmetro (TOP (?)) vira o LIMIT ? do final."""
+    for padrao, troca in _TRADUCOES: sql = padrao.sub(troca, sql)
+    if _GROUPING_SETS.search(sql): sql = _expandir_grouping_sets(sql)
+    if _TOP.match(sql): return _TOP.sub('SELECT', sql) + ' LIMIT ?', True
+    return sql, False
+
+def _param(p):
+    if isinstance(p, datetime): return _fmt(p)
+    if isinstance(p, date): return p.isoformat()
+    return p
+
+def _valor(v):
+    return datetime.fromisoformat(v) if isinstance(v, str) and _DATA.match(v) else v
+
+class _CursorTSQL:
+    def __init__(self, cursor, pool):
+        self._cur, self._pool = cursor, pool
+        self._datas = None  # índices das colunas de data, detectados no primeiro lote
+
+    def execute(self, sql, params=None):
+        sql, top = traduzir(sql)
+        params = [_param(p) for p in (params or [])]
+        if top: params = params[1:] + params[:1]
+        if params and sql.count('?') > len(params): params *= sql.count('?') // len(params)  # ramos de GROUPING SETS
+        self._pool.consultas += 1
+        self._cur.execute(sql, params)
+        self._datas = None
+        return self
+
+    def _converter(self, linhas):
+        if not linhas: return linhas
+        if self._datas is None:
+            self._datas = [i for i, v in enumerate(linhas[0]) if isinstance(v, str) and _DATA.match(v)]
+        if not self._datas: return linhas
+        res = []
+        for linha in linhas:
+            linha = list(linha)
+            for i in self._datas: linha[i] = _valor(linha[i])
+            res.append(tuple(linha))
+        return res
+
+    def fetchall(self): return self._converter(self._cur.fetchall())
+    def fetchmany(self, n): return self._converter(self._cur.fetchmany(n))
+    def close(self): self._cur.close()
+
+class _ConexaoTSQL:
+    timeout = 0
+    def __init__(self, conn, pool): self._conn, self._pool = conn, pool
+    def cursor(self): return _CursorTSQL(self._conn.cursor(), self._pool)
+
+class PoolSQLite:
+    """Substituto do ConnectionPool: uma conexão SQLite somente leitura por thread."""
+
+    def __init__(self, path):
+        self.path = path
+        self.consultas = 0
+        self._local = threading.local()
+
+    def _conexao(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._local.conn = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True, check_same_thread=False)
+        return conn
+
+    @contextmanager
+    def connection(self):
+        yield _ConexaoTSQL(self._conexao(), self)
+
+    def status(self):
+        return {'tamanho': 0, 'em_uso': 0, 'ociosas': 0, 'max': 0, 'criadas': 0, 'reusadas': 0, 'descartadas': 0, 'esperas': 0}
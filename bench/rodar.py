@@ -0,0 +1,176 @@
+"""Benchmark das páginas do BI sobre o ERP sintético.
+
+Uso (na raiz do projeto):
+    python -m bench.rodar --notas 1000 10000 100000 --iteracoes 20 --saida bench/resultados/atual.json
+    python -m bench.rodar --notas 10000 --comparar bench/resultados/base.json
+
+Cada cenário é uma página com os widgets que ela carrega. Para cada
+escala, o relatório traz os percentis de latência (ms), as consultas por
+carga e o pico de memória Python (tracemalloc, numa passada à parte).
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import date, datetime, timedelta
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+os.environ.setdefault('AQUECIMENTO', '0')  # os cenários medem as páginas a frio
+os.environ.setdefault('SECRET_KEY', os.urandom(16).hex())  # sessões só do próprio benchmark
+
+from bench.erp_sintetico import gerar, escala, PoolSQLite
+
+def _percentis(amostras):
+    ordenadas = sorted(amostras)
+    def p(q): return ordenadas[min(len(ordenadas) - 1, int(round(q / 100 * (len(ordenadas) - 1))))]
+    return {'min': ordenadas[0], 'p50': p(50), 'p90': p(90), 'p95': p(95), 'p99': p(99), 'max': ordenadas[-1],
+            'media': statistics.fmean(ordenadas)}
+
+def _cenarios(pool):
+    """Páginas e os widgets que cada uma busca, com vendedor/cliente de maior volume na base."""
+    with pool.connection() as conn:
+        cur = conn.cursor()
+        vendedor = cur.execute("SELECT Cod_Vendedor FROM enxes GROUP BY Cod_Vendedor ORDER BY COUNT(*) DESC LIMIT 1").fetchall()[0][0]
+        cliente = cur.execute("SELECT Cod_Cliente FROM NFSCB GROUP BY Cod_Cliente ORDER BY COUNT(*) DESC LIMIT 1").fetchall()[0][0]
+        busca = cur.execute("SELECT Razao_Social FROM clien WHERE Codigo = ?", [cliente]).fetchall()[0][0].split()[1]
+    fim = date.today(); inicio = fim - timedelta(days=90)
+    periodo = f"inicio={inicio.isoformat()}&fim={fim.isoformat()}"
+    return {
+        'dashboard': ['/dashboard', '/api/widgets/empresa', '/api/widgets/carteira?tipo=todos&valor=', '/api/clientes?tipo=todos&valor='],
+        'dashboard_vendedor': [f'/dashboard?tipo=vendedor&valor={vendedor}', f'/api/widgets/vendedor?valor={vendedor}',
+                               f'/api/widgets/carteira?tipo=vendedor&valor={vendedor}', f'/api/clientes?tipo=vendedor&valor={vendedor}'],
+        'dashboard_busca': [f'/dashboard?tipo=cliente&valor={busca}', '/api/widgets/empresa',
+                            f'/api/widgets/carteira?tipo=cliente&valor={busca}', f'/api/clientes?tipo=cliente&valor={busca}'],
+        'analise_cliente': [f'/analise/{cliente}', f'/api/widgets/cliente/{cliente}/resumo', f'/api/widgets/cliente/{cliente}/historico'],
+        'ranking': ['/ranking', '/api/widgets/ranking'],
+        'mapa_vendas': [f'/mapa?vendedor={vendedor}&{periodo}', f'/api/widgets/regional?vendedor={vendedor}&{periodo}'],
+    }
+
+def _limpar_caches(bi):
+    bi.ref.invalidar()
+    bi.historico.cache.invalidate()
+    if bi.respostas is not None: bi.respostas.invalidate()
+    bi._kpis.invalidate()
+    bi._marca['lida_em'] = float('-inf')
+
+def medir_escala(notas, iteracoes=20, aquecimento=2, quente=False, agregados=False, dados_dir=None, semente=42):
+    import app as bi
+    from flask.sessions import SecureCookieSessionInterface
+    from database.vetorial import indexar
+    from database.cache import TTLCache
+    from database.historico import HistoricoMensal
+
+    dados_dir = dados_dir or os.path.join(RAIZ, 'bench', 'dados')
+    os.makedirs(dados_dir, exist_ok=True)
+    path = os.path.join(dados_dir, f"erp_{notas}_{semente}_{date.today():%Y%m}.sqlite3")
+    t0 = time.perf_counter()
+    if not os.path.exists(path): gerar(path, notas, semente)
+    geracao_s = time.perf_counter() - t0
+
+    pool = PoolSQLite(path)
+    bi.pool = pool
+    bi.app.session_interface = SecureCookieSessionInterface()  # sem arquivos de sessão durante a medição
+    bi.historico = HistoricoMensal(bi.run_query, TTLCache(max_entradas=100_000, max_peso=10_000_000))
+    with pool.connection() as conn:
+        metas = dict(conn.cursor().execute("SELECT Codigo, Limite_Credito / 10 FROM clien").fetchall())
+
+    class _Objetivos:  # metas por cliente no lugar da planilha
+        def get(self): return metas
+        def indice(self, _i=indexar(metas)): return _i
+    bi.objetivos = _Objetivos()
+
+    if agregados:
+        from database.agregados import AgregadosVendas
+        bi.agregados = AgregadosVendas(os.path.join(tempfile.mkdtemp(), 'agregados.sqlite3'), bi.run_query)
+        bi.agregados.atualizar(forcar=True)
+
+    c = bi.app.test_client()
+    with c.session_transaction() as s: s['user'] = 'bench'
+    resultado = {'escala': escala(notas), 'geracao_s': round(geracao_s, 2), 'cenarios': {}}
+    for nome, urls in _cenarios(pool).items():
+        tempos, por_url, consultas = [], {u: [] for u in urls}, []
+        for i in range(aquecimento + iteracoes):
+            if not quente: _limpar_caches(bi)
+            n0, t_ini = pool.consultas, time.perf_counter()
+            for u in urls:
+                t = time.perf_counter()
+                r = c.get(u)
+                if r.status_code != 200: raise RuntimeError(f"{u} -> HTTP {r.status_code}")
+                por_url[u].append((time.perf_counter() - t) * 1000)
+            if i >= aquecimento:
+                tempos.append((time.perf_counter() - t_ini) * 1000)
+                consultas.append(pool.consultas - n0)
+        for u in urls: del por_url[u][:aquecimento]
+
+        if not quente: _limpar_caches(bi)
+        tracemalloc.start()
+        for u in urls: c.get(u)
+        pico = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+        resultado['cenarios'][nome] = {
+            'latencia_ms': {k: round(v, 2) for k, v in _percentis(tempos).items()},
+            'consultas': max(consultas), 'pico_memoria_kb': round(pico / 1024, 1),
+            'requisicoes': {u: {k: round(v, 2) for k, v in _percentis(t).items() if k in ('p50', 'p95')} for u, t in por_url.items()},
+        }
+        lat = resultado['cenarios'][nome]['latencia_ms']
+        print(f"  {nome:<20} p50 {lat['p50']:>9.1f} ms  p95 {lat['p95']:>9.1f} ms  {max(consultas):>3} consultas  {pico / 1024:>9.0f} KiB")
+    return resultado
+
+def _versao():
+    try: return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=RAIZ, capture_output=True, text=True, timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError): return None
+
+def comparar(atual, base, limiar=1.10):
+    """Imprime a razão atual/base de p50 e p95 por escala/cenário; devolve quantos pioraram além do limiar."""
+    piores = 0
+    for notas, esc in atual['escalas'].items():
+        esc_base = base['escalas'].get(notas)
+        if not esc_base: continue
+        for nome, cen in esc['cenarios'].items():
+            ref = esc_base['cenarios'].get(nome)
+            if not ref: continue
+            r50 = cen['latencia_ms']['p50'] / max(ref['latencia_ms']['p50'], 1e-9)
+            r95 = cen['latencia_ms']['p95'] / max(ref['latencia_ms']['p95'], 1e-9)
+            marca = '⚠️' if r50 > limiar else '  '
+            piores += r50 > limiar
+            print(f"{marca} {notas:>8} {nome:<20} p50 x{r50:.2f}  p95 x{r95:.2f}  consultas {ref['consultas']} -> {cen['consultas']}")
+    return piores
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument('--notas', type=int, nargs='+', default=[1_000, 10_000], help='escalas (nº de notas em NFSCB), de 1000 a 1000000')
+    ap.add_argument('--iteracoes', type=int, default=20)
+    ap.add_argument('--aquecimento', type=int, default=2)
+    ap.add_argument('--quente', action='store_true', help='mantém os caches entre iterações (mede o caminho com cache)')
+    ap.add_argument('--agregados', action='store_true', help='lê vendas dos agregados locais (SQLite) em vez do ERP')
+    ap.add_argument('--dados', help='pasta dos bancos sintéticos (padrão: bench/dados)')
+    ap.add_argument('--saida', help='arquivo JSON de resultado (padrão: bench/resultados/<data>_<commit>.json)')
+    ap.add_argument('--comparar', help='JSON de uma execução anterior para comparar')
+    args = ap.parse_args(argv)
+
+    relatorio = {'versao': _versao(), 'data': datetime.now().isoformat(timespec='seconds'), 'python': platform.python_version(),
+                 'plataforma': platform.platform(), 'iteracoes': args.iteracoes, 'quente': args.quente, 'agregados': args.agregados,
+                 'escalas': {}}
+    for notas in args.notas:
+        print(f"▶ {notas} notas")
+        relatorio['escalas'][str(notas)] = medir_escala(notas, args.iteracoes, args.aquecimento, args.quente, args.agregados, args.dados)
+
+    saida = args.saida or os.path.join(RAIZ, 'bench', 'resultados', f"{datetime.now():%Y%m%d_%H%M%S}_{relatorio['versao'] or 'local'}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(saida)), exist_ok=True)
+    with open(saida, 'w', encoding='utf-8') as f: json.dump(relatorio, f, indent=2, ensure_ascii=False)
+    print(f"💾 {saida}")
+    if args.comparar:
+        with open(args.comparar, encoding='utf-8') as f: base = json.load(f)
+        return 1 if comparar(relatorio, base) else 0
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
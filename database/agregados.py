@@ -0,0 +1,248 @@
+import sqlite3
+import threading
+import time
+import logging
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta
+
+from database.arrendamento import Arrendamento
+
+logger = logging.getLogger(__name__)
+
+# ============================================
+# AGREGADOS LOCAIS DE VENDAS (SQLITE)
+# ============================================
+# Somas diárias de NFSCB/VEOBJ copiadas do ERP para um SQLite ao lado do
+# config.json. A atualização é incremental: a partir da marca d'água
+# (último dia de emissão + maior Num_Nota vistos), recuando AGG_RETROATIVO_DIAS
+# para pegar cancelamentos e notas lançadas com atraso. Cancelamento mais
+# antigo que isso é corrigido pela ressincronização completa do mês fechado
+# anterior (e do corrente), feita a cada `ressincronizar_h` horas.
+#
+# Vários workers apontam para o mesmo arquivo: só o que tem o arrendamento
+# (linha 'lider' do controle, renovada a cada ciclo) consulta o ERP; os outros
+# só leem. Se o líder morre, o arrendamento vence e outro assume.
+#
+# A janela começa `meses` antes da primeira carga ('inicio_janela' no
+# controle); períodos anteriores a ela devem ir ao ERP (cobre()). Depois da
+# primeira carga o início da janela fica em memória, e disponivel()/cobre()
+# não abrem o SQLite.
+
+_ESQUEMA = """
+CREATE TABLE IF NOT EXISTS vendas_dia (
+    dia TEXT NOT NULL, cod_estabe INTEGER NOT NULL, cod_vendedor INTEGER, cod_cliente INTEGER,
+    vlr REAL NOT NULL, notas INTEGER NOT NULL);
+CREATE INDEX IF NOT EXISTS ix_vendas_dia ON vendas_dia (dia, cod_vendedor);
+CREATE INDEX IF NOT EXISTS ix_vendas_cli ON vendas_dia (cod_cliente, dia);
+CREATE TABLE IF NOT EXISTS regiao_dia (
+    dia TEXT NOT NULL, cod_vendedor INTEGER, cidade TEXT, bairro TEXT, origem TEXT, operador TEXT,
+    vlr REAL NOT NULL, notas INTEGER NOT NULL);
+CREATE INDEX IF NOT EXISTS ix_regiao_dia ON regiao_dia (cod_vendedor, dia);
+CREATE TABLE IF NOT EXISTS metas (
+    ano INTEGER NOT NULL, mes INTEGER NOT NULL, cod_vendedor INTEGER, vlr_cota REAL NOT NULL);
+CREATE TABLE IF NOT EXISTS controle (chave TEXT PRIMARY KEY, valor TEXT);
+"""
+
+def _dia(d):
+    return d.date().isoformat() if isinstance(d, datetime) else str(d)[:10]
+
+class AgregadosVendas:
+    def __init__(self, path, executar, meses=36, retroativo_dias=3, revalidar=3600, ressincronizar_h=24, arrendamento_s=900):
+        self.path = path
+        self.executar = executar
+        self.meses = meses
+        self.retroativo_dias = retroativo_dias
+        self.revalidar = revalidar
+        self.ressincronizar_h = ressincronizar_h
+        self._lock = threading.Lock()
+        self._thread = None
+        self._inicio = None  # início da janela (date), lido do controle até a primeira carga existir
+        with self._conectar() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_ESQUEMA)
+        self.arrendamento = Arrendamento(path, 'lider', arrendamento_s)
+
+    @contextmanager
+    def _conectar(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn: yield conn
+        finally:
+            conn.close()
+
+    # ---------- estado / frescor ----------
+
+    def _controle(self, conn):
+        return dict(conn.execute("SELECT chave, valor FROM controle").fetchall())
+
+    def arrendar(self):
+        """Pega ou renova o arrendamento de atualização; False se outro processo o tem e ele ainda vale."""
+        return self.arrendamento.pegar()
+
+    def inicio(self):
+        """Primeiro dia coberto pela janela local (None antes da primeira carga)."""
+        if self._inicio is None:
+            with self._conectar() as conn:
+                ctl = self._controle(conn)
+                dia = ctl.get('inicio_janela') or (conn.execute("SELECT MIN(dia) FROM vendas_dia").fetchone()[0] if 'atualizado_em' in ctl else None)
+            if dia: self._inicio = date.fromisoformat(dia)
+        return self._inicio
+
+    def disponivel(self):
+        return self.inicio() is not None
+
+    def cobre(self, periodo):
+        """True se a janela local contém o início do período."""
+        inicio = self.inicio()
+        return inicio is not None and _dia(periodo[0]) >= inicio.isoformat()
+
+    def frescor(self):
+        """Quando foi a última atualização concluída (None se nunca houve)."""
+        with self._conectar() as conn:
+            ctl = self._controle(conn)
+        if 'atualizado_em' not in ctl: return None
+        atualizado = datetime.fromisoformat(ctl['atualizado_em'])
+        return {'atualizado_em': atualizado, 'marca_dia': ctl.get('marca_dia'), 'marca_nota': ctl.get('marca_nota'),
+                'idade_s': int((datetime.now() - atualizado).total_seconds())}
+
+    # ---------- atualização incremental ----------
+
+    def atualizar(self, forcar=False):
+        """Atualiza a partir da marca d'água; devolve False se não conseguiu falar com o ERP.
+
+        `executar` deve levantar exceção em erro (e não devolver []), para que uma
+        falha nunca apague a janela local sem repô-la.
+        """
+        if not self._lock.acquire(blocking=False): return False
+        try:
+            t0 = time.monotonic()
+            sonda = self.executar("SELECT MAX(Num_Nota), MAX(Dat_Emissao) FROM NFSCB WITH (NOLOCK)")
+            if not sonda: return False
+            nota_max, emissao_max = sonda[0]
+            with self._conectar() as conn:
+                ctl = self._controle(conn)
+            ressinc = 'ressinc_em' not in ctl or (datetime.now() - datetime.fromisoformat(ctl['ressinc_em'])).total_seconds() >= self.ressincronizar_h * 3600
+            if ctl.get('marca_dia'):
+                ultimo = datetime.fromisoformat(ctl['atualizado_em'])
+                inalterado = ctl.get('marca_nota') == str(nota_max) and ctl['marca_dia'] == _dia(emissao_max)
+                if inalterado and not forcar and not ressinc and (datetime.now() - ultimo).total_seconds() < self.revalidar:
+                    return True
+                desde = date.fromisoformat(ctl['marca_dia']) - timedelta(days=self.retroativo_dias)
+                if ressinc:  # cancelamentos fora da janela retroativa: refaz o mês fechado anterior inteiro
+                    hoje = date.today()
+                    ano, mes = divmod(hoje.year * 12 + hoje.month - 2, 12)
+                    desde = min(desde, date(ano, mes + 1, 1))
+            else:
+                hoje = date.today()
+                ano, mes = divmod(hoje.year * 12 + hoje.month - 1 - self.meses, 12)
+                desde = date(ano, mes + 1, 1)
+            inicio = datetime(desde.year, desde.month, desde.day)
+
+            vendas = self.executar("""SELECT CAST(Dat_Emissao AS DATE), Cod_Estabe, Cod_Vendedor, Cod_Cliente, SUM(Vlr_TotalNota), COUNT(*)
+                FROM NFSCB WITH (NOLOCK) WHERE Status = 'F' AND Dat_Emissao >= ?
+                GROUP BY CAST(Dat_Emissao AS DATE), Cod_Estabe, Cod_Vendedor, Cod_Cliente""", [inicio])
+            regioes = self.executar("""SELECT CAST(nf.Dat_Emissao AS DATE), nf.Cod_Vendedor, ISNULL(nf.Cidade, 'NAO INF.'), ISNULL(nf.Bairro, 'NAO INF.'),
+                nf.Cod_OrigemNfs, ISNULL(ve.Nome_Guerra, 'NAO IDENT.'), SUM(nf.Vlr_TotalNota), COUNT(nf.Num_Nota)
+                FROM nfscb nf WITH (NOLOCK) LEFT JOIN VENDE ve ON ve.Codigo = nf.Cod_VendTlmkt
+                WHERE nf.Cod_Estabe = 0 AND nf.Status = 'F' AND nf.Dat_Emissao >= ?
+                GROUP BY CAST(nf.Dat_Emissao AS DATE), nf.Cod_Vendedor, nf.Cidade, nf.Bairro, nf.Cod_OrigemNfs, ve.Nome_Guerra""", [inicio])
+            metas = self.executar("SELECT Ano_Ref, Mes_Ref, Cod_Vendedor, SUM(Vlr_Cota) FROM VEOBJ WHERE Ano_Ref >= ? GROUP BY Ano_Ref, Mes_Ref, Cod_Vendedor",
+                                  [desde.year])
+
+            d_ini = desde.isoformat()
+            with self._conectar() as conn:
+                conn.execute("DELETE FROM vendas_dia WHERE dia >= ?", (d_ini,))
+                conn.executemany("INSERT INTO vendas_dia VALUES (?, ?, ?, ?, ?, ?)",
+                                 ((_dia(r[0]), r[1], r[2], r[3], float(r[4] or 0), int(r[5])) for r in vendas))
+                conn.execute("DELETE FROM regiao_dia WHERE dia >= ?", (d_ini,))
+                conn.executemany("INSERT INTO regiao_dia VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                                 ((_dia(r[0]), r[1], r[2], r[3], r[4], r[5], float(r[6] or 0), int(r[7])) for r in regioes))
+                if metas:
+                    conn.execute("DELETE FROM metas WHERE ano >= ?", (desde.year,))
+                    conn.executemany("INSERT INTO metas VALUES (?, ?, ?, ?)", ((r[0], r[1], r[2], float(r[3] or 0)) for r in metas))
+                conn.executemany("INSERT OR REPLACE INTO controle VALUES (?, ?)", [
+                    ('marca_dia', _dia(emissao_max) if emissao_max else d_ini), ('marca_nota', str(nota_max)),
+                    ('atualizado_em', datetime.now().isoformat(timespec='seconds'))]
+                    + ([('ressinc_em', datetime.now().isoformat(timespec='seconds'))] if ressinc else [])
+                    + ([] if ctl.get('marca_dia') else [('inicio_janela', d_ini)]))
+            if not ctl.get('marca_dia'): self._inicio = desde
+            logger.info(f"🔄 Agregados locais atualizados desde {d_ini}: {len(vendas)} linhas em {time.monotonic() - t0:.1f}s")
+            return True
+        except Exception as e:
+            logger.error(f"❌ Erro atualizando agregados locais: {e}")
+            return False
+        finally:
+            self._lock.release()
+
+    def iniciar(self, intervalo=300):
+        """Atualiza em segundo plano a cada `intervalo` segundos, se este processo tiver o arrendamento."""
+        if self._thread: return
+        self.arrendamento.duracao_s = max(self.arrendamento.duracao_s, 3 * intervalo)
+        def laco():
+            while True:
+                try: lider = self.arrendar()
+                except sqlite3.Error as e:
+                    logger.error(f"❌ Arrendamento dos agregados locais: {e}")
+                    lider = False
+                if lider: self.atualizar()
+                time.sleep(intervalo)
+        self._thread = threading.Thread(target=laco, name='agregados', daemon=True)
+        self._thread.start()
+
+    # ---------- leitura ----------
+
+    def _consultar(self, sql, params):
+        with self._conectar() as conn:
+            return conn.execute(sql, params).fetchall()
+
+    @staticmethod
+    def _filtro(periodo, cod_vendedor=None, cod_cliente=None, estabe=0):
+        where, params = ["dia >= ?", "dia < ?"], [_dia(periodo[0]), _dia(periodo[1])]
+        if estabe is not None: where.append("cod_estabe = ?"); params.append(estabe)
+        if cod_vendedor is not None: where.append("cod_vendedor = ?"); params.append(int(cod_vendedor))
+        if cod_cliente is not None: where.append("cod_cliente = ?"); params.append(int(cod_cliente))
+        return " AND ".join(where), params
+
+    def total(self, periodo, cod_vendedor=None, cod_cliente=None):
+        where, params = self._filtro(periodo, cod_vendedor, cod_cliente)
+        return float(self._consultar(f"SELECT IFNULL(SUM(vlr), 0) FROM vendas_dia WHERE {where}", params)[0][0])
+
+    def atendidos(self, periodo, cod_vendedor=None):
+        where, params = self._filtro(periodo, cod_vendedor)
+        return int(self._consultar(f"SELECT COUNT(DISTINCT cod_cliente) FROM vendas_dia WHERE {where}", params)[0][0])
+
+    def vendas_por_cliente(self, periodo):
+        where, params = self._filtro(periodo)
+        return dict(self._consultar(f"SELECT cod_cliente, SUM(vlr) FROM vendas_dia WHERE {where} AND cod_cliente IS NOT NULL GROUP BY cod_cliente", params))
+
+    def vendas_por_vendedor(self, periodo):
+        """{cod_vendedor: (faturamento, clientes distintos)} do período."""
+        where, params = self._filtro(periodo)
+        return {v: (t, n) for v, t, n in self._consultar(
+            f"SELECT cod_vendedor, SUM(vlr), COUNT(DISTINCT cod_cliente) FROM vendas_dia WHERE {where} GROUP BY cod_vendedor", params)}
+
+    def historico_mensal(self, cod_cliente, periodo):
+        where, params = self._filtro(periodo, cod_cliente=cod_cliente)
+        return self._consultar(f"""SELECT CAST(substr(dia, 1, 4) AS INTEGER), CAST(substr(dia, 6, 2) AS INTEGER), SUM(vlr)
+            FROM vendas_dia WHERE {where} GROUP BY 1, 2 ORDER BY 1, 2""", params)
+
+    def meta(self, ano, mes, cod_vendedor=None):
+        sql, params = "SELECT IFNULL(SUM(vlr_cota), 0) FROM metas WHERE ano = ? AND mes = ?", [ano, mes]
+        if cod_vendedor is not None: sql += " AND cod_vendedor = ?"; params.append(int(cod_vendedor))
+        return float(self._consultar(sql, params)[0][0])
+
+    def metas_por_vendedor(self, ano, mes):
+        return dict(self._consultar("SELECT cod_vendedor, SUM(vlr_cota) FROM metas WHERE ano = ? AND mes = ? GROUP BY cod_vendedor", [ano, mes]))
+
+    def regional(self, periodo, cod_vendedor):
+        """Mesmo formato do rollup regional do /mapa: nível, cidade, bairro, operador, ML (vlr, notas),
+        TL (vlr, notas), valor, notas, clientes distintos (só no total) e ranking ML (só por bairro)."""
+        where, params = self._filtro(periodo, cod_vendedor, estabe=None)
+        where_cli, params_cli = self._filtro(periodo, cod_vendedor)
+        ml, tl = "SUM(CASE WHEN origem = 'ML' THEN {} ELSE 0 END)", "SUM(CASE WHEN origem = 'TL' THEN {} ELSE 0 END)"
+        medidas = f"{ml.format('vlr')}, {ml.format('notas')}, {tl.format('vlr')}, {tl.format('notas')}, SUM(vlr), SUM(notas)"
+        return self._consultar(f"""WITH r AS (SELECT trim(cidade) AS cidade, trim(bairro) AS bairro, operador, origem, vlr, notas FROM regiao_dia WHERE {where})
+            SELECT 1, cidade, bairro, NULL, {medidas}, NULL, ROW_NUMBER() OVER (ORDER BY {ml.format('vlr')} DESC) FROM r GROUP BY cidade, bairro
+            UNION ALL SELECT 6, NULL, NULL, operador, {medidas}, NULL, NULL FROM r GROUP BY operador
+            UNION ALL SELECT 7, NULL, NULL, NULL, {medidas}, (SELECT COUNT(DISTINCT cod_cliente) FROM vendas_dia WHERE {where_cli}), NULL FROM r
+            ORDER BY 1, 2, 3, 4""", params + params_cli)
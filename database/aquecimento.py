@@ -0,0 +1,120 @@
+import logging
+import threading
+import time
+from datetime import datetime, timedelta
+
+from database.paralelo import registrar_degradacao
+
+logger = logging.getLogger(__name__)
+
+# ============================================
+# PRÉ-AQUECIMENTO DOS CACHES
+# ============================================
+# Na abertura do expediente todos abrem o /dashboard ao mesmo tempo. As tarefas
+# caras (KPIs da empresa, vendedores, carteiras, objetivos...) rodam aqui em
+# segundo plano, uma de cada vez, na subida do processo e nos horários
+# configurados, para a primeira requisição já encontrar os caches quentes.
+# Tarefa em que alguma consulta falhou (valor padrão no lugar do dado) conta
+# como falha no status.
+#
+# Com vários workers, as tarefas pesadas no ERP (`so_lider`) só rodam no
+# processo que pega o arrendamento; nos demais elas são puladas e os caches
+# em memória deles se enchem na primeira requisição (com voo único), sem
+# todos os workers martelarem o ERP no mesmo minuto.
+
+def proximo_horario(horarios, agora):
+    """Próxima ocorrência (datetime) de um dos horários (datetime.time) a partir de `agora`; None sem horários."""
+    candidatos = [datetime.combine(agora.date() + timedelta(days=d), h) for d in (0, 1) for h in horarios]
+    futuros = [c for c in candidatos if c > agora]
+    return min(futuros) if futuros else None
+
+def ler_horarios(texto):
+    """'07:50, 12:50' -> [time(7, 50), time(12, 50)]; entradas inválidas são ignoradas."""
+    horarios = []
+    for item in (texto or '').split(','):
+        try: horarios.append(datetime.strptime(item.strip(), '%H:%M').time())
+        except ValueError:
+            if item.strip(): logger.warning(f"⚠️ Horário de aquecimento inválido: {item.strip()!r}")
+    return sorted(horarios)
+
+class Aquecimento:
+    def __init__(self, tarefas, horarios=(), intervalo=0, arrendamento=None, so_lider=()):
+        self.tarefas = tarefas  # [(nome, funcao)]; a função pode devolver quantos itens carregou
+        self.horarios = list(horarios)
+        self.intervalo = intervalo  # segundos entre execuções (0 = só nos horários)
+        self.arrendamento = arrendamento  # Arrendamento entre workers (None = processo único)
+        self.so_lider = set(so_lider)
+        self._lock = threading.Lock()
+        self._acordar = threading.Event()
+        self._thread = None
+        self._status = {'rodando': False, 'execucoes': 0, 'inicio': None, 'fim': None, 'segundos': None, 'proxima': None,
+                        'atual': None, 'concluidas': 0, 'total': len(tarefas), 'tarefas': {}}
+
+    def rodar(self):
+        """Executa todas as tarefas em sequência; devolve False se já houver uma execução em andamento."""
+        if not self._lock.acquire(blocking=False): return False
+        try:
+            t0 = time.perf_counter()
+            self._status.update(rodando=True, inicio=datetime.now(), fim=None, segundos=None, concluidas=0, total=len(self.tarefas))
+            lider = self._lider()
+            for i, (nome, funcao) in enumerate(self.tarefas):
+                self._status['atual'] = nome
+                t1 = time.perf_counter()
+                if nome in self.so_lider and not lider:
+                    self._status['tarefas'][nome] = {'ok': True, 'erro': None, 'itens': None, 'segundos': 0.0, 'em': datetime.now(), 'pulada': 'outro worker'}
+                    self._status['concluidas'] = i + 1
+                    continue
+                try:
+                    with registrar_degradacao() as degradacao: itens, erro = funcao(), None
+                    if degradacao: raise RuntimeError(f"consultas com falha, nada foi para o cache: {', '.join(sorted(degradacao))}")
+                except Exception as e:
+                    itens, erro = None, str(e)
+                    logger.error(f"❌ Aquecimento ({nome}): {e}")
+                self._status['tarefas'][nome] = {'ok': erro is None, 'erro': erro, 'itens': itens if isinstance(itens, int) else None,
+                                                 'segundos': round(time.perf_counter() - t1, 3), 'em': datetime.now(), 'pulada': None}
+                self._status['concluidas'] = i + 1
+            self._status.update(rodando=False, atual=None, fim=datetime.now(), segundos=round(time.perf_counter() - t0, 3),
+                                execucoes=self._status['execucoes'] + 1)
+            logger.info(f"🔥 Caches aquecidos em {self._status['segundos']:.1f} s")
+            return True
+        finally:
+            self._status['rodando'] = False
+            self._lock.release()
+
+    def _lider(self):
+        if self.arrendamento is None: return True
+        try: return self.arrendamento.pegar()
+        except Exception as e:
+            logger.error(f"❌ Arrendamento do aquecimento: {e}")
+            return False
+
+    def _proxima(self, agora):
+        opcoes = [proximo_horario(self.horarios, agora)]
+        if self.intervalo: opcoes.append(agora + timedelta(seconds=self.intervalo))
+        opcoes = [o for o in opcoes if o is not None]
+        return min(opcoes) if opcoes else None
+
+    def iniciar(self):
+        """Roda uma vez já na subida e depois a cada horário/intervalo, numa thread daemon."""
+        if self._thread: return
+        def laco():
+            while True:
+                self.rodar()
+                self._acordar.clear()
+                proxima = self._status['proxima'] = self._proxima(datetime.now())
+                if proxima is None: return
+                self._acordar.wait(max(0.0, (proxima - datetime.now()).total_seconds()))
+        self._thread = threading.Thread(target=laco, name='aquecimento', daemon=True)
+        self._thread.start()
+
+    def disparar(self):
+        """Pede uma execução agora (na thread do agendador, ou numa thread avulsa se ele não estiver ativo)."""
+        if self._status['rodando']: return False
+        if self._thread and self._thread.is_alive(): self._acordar.set()
+        else: threading.Thread(target=self.rodar, name='aquecimento-avulso', daemon=True).start()
+        return True
+
+    def status(self):
+        """Cópia do estado para JSON (datas em ISO 8601)."""
+        iso = lambda d: {k: v.isoformat(timespec='seconds') if isinstance(v, datetime) else v for k, v in d.items()}
+        return {**iso(self._status), 'tarefas': {n: iso(t) for n, t in self._status['tarefas'].items()}}
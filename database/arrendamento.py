@@ -0,0 +1,41 @@
+import sqlite3
+import time
+import uuid
+
+# ============================================
+# ARRENDAMENTO ENTRE WORKERS (SQLITE)
+# ============================================
+# Vários processos do gunicorn, uma tarefa que só um deve fazer por vez
+# (carga dos agregados, pré-aquecimento). Quem pega o arrendamento grava
+# "dono|expira" numa linha da tabela `controle` do arquivo e o renova a cada
+# ciclo; os outros desistem enquanto ele valer. Se o dono morre, o prazo
+# vence e outro assume.
+
+class Arrendamento:
+    def __init__(self, path, chave, duracao_s=900):
+        self.path = path
+        self.chave = chave
+        self.duracao_s = duracao_s
+        self.dono = uuid.uuid4().hex  # um por processo/instância
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn: conn.execute("CREATE TABLE IF NOT EXISTS controle (chave TEXT PRIMARY KEY, valor TEXT)")
+        finally:
+            conn.close()
+
+    def pegar(self):
+        """Pega ou renova o arrendamento; False se outro processo o tem e ele ainda vale."""
+        agora = time.time()
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        try:
+            conn.execute("BEGIN IMMEDIATE")  # trava de escrita do arquivo: leitura + gravação do dono sem corrida
+            linha = conn.execute("SELECT valor FROM controle WHERE chave = ?", (self.chave,)).fetchone()
+            dono, expira = linha[0].rsplit('|', 1) if linha else ('', '0')
+            if dono != self.dono and float(expira) > agora:
+                conn.execute("ROLLBACK")
+                return False
+            conn.execute("INSERT OR REPLACE INTO controle VALUES (?, ?)", (self.chave, f"{self.dono}|{agora + self.duracao_s}"))
+            conn.execute("COMMIT")
+            return True
+        finally:
+            conn.close()
@@ -0,0 +1,110 @@
+import re
+import threading
+import unicodedata
+from bisect import bisect_left, insort
+from heapq import nsmallest
+
+# ============================================
+# ÍNDICE DE BUSCA DE CLIENTES (CÓDIGO / RAZÃO SOCIAL)
+# ============================================
+# Substitui o LIKE '%valor%' sobre clien (varredura a cada tecla) por um índice
+# em memória: texto "codigo razao" dobrado (sem acento, minúsculo), trigramas
+# para termos com 3+ caracteres e lista ordenada de palavras para prefixos
+# curtos. Cada termo da busca precisa aparecer no texto (E entre termos).
+# sincronizar() recebe o cadastro inteiro (vindo do cache de referência) e só
+# reindexa os clientes novos, renomeados ou removidos.
+
+_NAO_ALFANUM = re.compile(r'[^0-9a-z]+')
+
+def dobrar(texto):
+    """Minúsculas, sem acentos e só [0-9a-z] separados por um espaço."""
+    texto = unicodedata.normalize('NFKD', str(texto or '')).encode('ascii', 'ignore').decode().lower()
+    return _NAO_ALFANUM.sub(' ', texto).strip()
+
+def _trigramas(texto):
+    t = f" {texto} "
+    return {t[i:i + 3] for i in range(len(t) - 2)}
+
+class IndiceClientes:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.fonte = None           # última lista recebida em sincronizar() (comparada por identidade)
+        self._nomes = {}            # codigo -> razão social original
+        self._textos = {}           # codigo -> "codigo razao" dobrado
+        self._trigramas = {}        # trigrama -> set(codigos)
+        self._palavras = []         # [(palavra, codigo)] ordenada, para prefixos
+
+    def __len__(self):
+        return len(self._textos)
+
+    def _remover(self, codigo):
+        texto = self._textos.pop(codigo)
+        self._nomes.pop(codigo, None)
+        for tri in _trigramas(texto):
+            s = self._trigramas.get(tri)
+            if s is not None:
+                s.discard(codigo)
+                if not s: del self._trigramas[tri]
+        for palavra in set(texto.split()):
+            i = bisect_left(self._palavras, (palavra, codigo))
+            if i < len(self._palavras) and self._palavras[i] == (palavra, codigo): del self._palavras[i]
+
+    def _incluir(self, codigo, nome, em_lote=False):
+        texto = dobrar(f"{codigo} {nome}")
+        self._nomes[codigo], self._textos[codigo] = nome, texto
+        for tri in _trigramas(texto): self._trigramas.setdefault(tri, set()).add(codigo)
+        for palavra in set(texto.split()):
+            if em_lote: self._palavras.append((palavra, codigo))
+            else: insort(self._palavras, (palavra, codigo))
+
+    def sincronizar(self, linhas):
+        """linhas = [(Codigo, Razao_Social)] do cadastro ativo; devolve quantos clientes foram (re)indexados ou removidos."""
+        with self._lock:
+            if linhas is self.fonte: return 0
+            novos = {int(c): (n or '').strip() for c, n in linhas}
+            removidos = [c for c in self._nomes if c not in novos]
+            alterados = [(c, n) for c, n in novos.items() if self._nomes.get(c) != n]
+            for c in removidos: self._remover(c)
+            carga_inicial = not self._textos
+            for c, n in alterados:
+                if c in self._textos: self._remover(c)
+                self._incluir(c, n, em_lote=carga_inicial)
+            if carga_inicial: self._palavras.sort()
+            self.fonte = linhas
+            return len(removidos) + len(alterados)
+
+    def _candidatos(self, termo):
+        if len(termo) >= 3:
+            conjuntos = sorted((self._trigramas.get(termo[i:i + 3], set()) for i in range(len(termo) - 2)), key=len)
+            if not conjuntos or not conjuntos[0]: return set()
+            res = set(conjuntos[0]).intersection(*conjuntos[1:])
+            return {c for c in res if termo in self._textos[c]}
+        res, i = set(), bisect_left(self._palavras, (termo,))
+        while i < len(self._palavras) and self._palavras[i][0].startswith(termo):
+            res.add(self._palavras[i][1]); i += 1
+        return res
+
+    def codigos(self, busca):
+        """Todos os códigos que casam com a busca (sem ordem)."""
+        termos = dobrar(busca).split()
+        if not termos: return set()
+        with self._lock:
+            res = None
+            for termo in sorted(termos, key=len, reverse=True):
+                res = self._candidatos(termo) if res is None else res & self._candidatos(termo)
+                if not res: break
+            return res
+
+    def buscar(self, busca, limite=10):
+        """[(codigo, razão social)] ordenados por relevância: código exato, início do nome, início de palavra, nome curto."""
+        consulta = dobrar(busca)
+        termos = consulta.split()
+        achados = self.codigos(busca)
+        if not achados: return []
+        with self._lock:
+            def chave(c):
+                texto = self._textos[c]
+                nome, palavras = texto[len(str(c)) + 1:], texto.split()
+                return (str(c) != consulta, not nome.startswith(consulta),
+                        -sum(any(p.startswith(t) for p in palavras) for t in termos), len(nome), nome)
+            return [(c, self._nomes[c]) for c in nsmallest(limite, achados, key=chave)]
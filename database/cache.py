@@ -0,0 +1,251 @@
+import pickle
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+
+# ============================================
+# CACHE TTL + LRU EM MEMÓRIA
+# ============================================
+
+_AUSENTE = object()
+
+def _peso(valor):
+    """Peso aproximado de uma entrada: nº de linhas para listas/tuplas/dicts, 1 para escalares."""
+    try: return max(1, len(valor))
+    except TypeError: return 1
+
+class VooUnico:
+    """Junta chamadas simultâneas com a mesma chave numa só execução ("single flight").
+
+    A primeira chamada executa; as que chegam enquanto ela roda esperam e recebem
+    o mesmo resultado (ou a mesma exceção), sem ir ao banco de novo.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._voos = {}  # chave -> Future da execução em andamento
+        self.compartilhadas = 0
+
+    def executar(self, chave, funcao):
+        with self._lock:
+            voo = self._voos.get(chave)
+            lider = voo is None
+            if lider: voo = self._voos[chave] = Future()
+            else: self.compartilhadas += 1
+        if not lider: return voo.result()
+        try: voo.set_result(funcao())
+        except BaseException as e: voo.set_exception(e)
+        finally:
+            with self._lock: del self._voos[chave]
+        return voo.result()
+
+class TTLCache:
+    """Cache em memória com expiração por entrada e despejo LRU.
+
+    O limite é dado em entradas e em "peso" (soma das linhas guardadas), para
+    que poucas listas enormes não ocupem a memória do worker sem controle.
+    """
+
+    def __init__(self, ttl=300, max_entradas=1024, max_peso=500_000):
+        self.ttl = ttl
+        self.max_entradas = max_entradas
+        self.max_peso = max_peso
+        self._dados = OrderedDict()  # chave -> (valor, expira_em, peso)
+        self._peso_total = 0
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.despejos = 0
+        self._voos = VooUnico()
+
+    def get(self, chave, default=None):
+        with self._lock:
+            item = self._dados.get(chave, _AUSENTE)
+            if item is not _AUSENTE:
+                if item[1] > time.monotonic():
+                    self._dados.move_to_end(chave)
+                    self.hits += 1
+                    return item[0]
+                self._remover(chave)
+            self.misses += 1
+            return default
+
+    def set(self, chave, valor, ttl=None):
+        peso = _peso(valor)
+        with self._lock:
+            if chave in self._dados: self._remover(chave)
+            self._dados[chave] = (valor, time.monotonic() + (self.ttl if ttl is None else ttl), peso)
+            self._peso_total += peso
+            while self._dados and (len(self._dados) > self.max_entradas or self._peso_total > self.max_peso):
+                self._remover(next(iter(self._dados)))
+                self.despejos += 1
+
+    def get_many(self, chaves):
+        """{chave: valor} das chaves presentes e válidas (as ausentes ficam de fora)."""
+        res = {}
+        for chave in chaves:
+            valor = self.get(chave, _AUSENTE)
+            if valor is not _AUSENTE: res[chave] = valor
+        return res
+
+    def set_many(self, itens, ttl=None):
+        for chave, valor in itens.items(): self.set(chave, valor, ttl)
+
+    def get_or_load(self, chave, carregar, ttl=None, cachear_vazio=False):
+        """Valor em cache ou carregado agora; faltas simultâneas da mesma chave compartilham um único carregamento."""
+        valor = self.get(chave, _AUSENTE)
+        if valor is not _AUSENTE: return valor
+        def carregar_e_guardar():
+            valor = carregar()
+            if valor or cachear_vazio: self.set(chave, valor, ttl)
+            return valor
+        return self._voos.executar(chave, carregar_e_guardar)
+
+    def _remover(self, chave):
+        self._peso_total -= self._dados.pop(chave)[2]
+
+    def delete(self, chave):
+        with self._lock:
+            if chave in self._dados: self._remover(chave)
+
+    def limpar_expirados(self):
+        """Remove as entradas vencidas (o get só descarta as que forem lidas); devolve quantas saíram."""
+        agora = time.monotonic()
+        with self._lock:
+            vencidas = [c for c, item in self._dados.items() if item[1] <= agora]
+            for chave in vencidas: self._remover(chave)
+        return len(vencidas)
+
+    def invalidate(self, prefixo=None):
+        """Remove tudo, ou só as chaves-tupla cujo primeiro elemento é `prefixo`."""
+        with self._lock:
+            if prefixo is None:
+                self._dados.clear(); self._peso_total = 0
+                return
+            for chave in [c for c in self._dados if isinstance(c, tuple) and c and c[0] == prefixo]:
+                self._remover(chave)
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {'entradas': len(self._dados), 'peso': self._peso_total, 'hits': self.hits, 'misses': self.misses,
+                    'despejos': self.despejos, 'compartilhadas': self._voos.compartilhadas, 'hit_ratio': (self.hits / total if total else 0.0)}
+
+# ============================================
+# CACHE COMPARTILHADO ENTRE WORKERS (SQLITE)
+# ============================================
+
+LOTE_SQLITE = 500  # chaves por "IN (...)" (o SQLite antigo aceita até 999 parâmetros)
+
+class SQLiteCache:
+    """Mesma interface do TTLCache, num arquivo SQLite visível a todos os workers da máquina.
+
+    Valores são serializados com pickle (o arquivo é só nosso); chaves-tupla são
+    gravadas com repr() e o primeiro elemento fica numa coluna à parte, para
+    invalidate(prefixo). Entradas vencidas são limpas a cada `limpar_a_cada` gravações.
+    get_many/set_many usam uma conexão só para muitas chaves.
+    """
+
+    def __init__(self, path, ttl=300, max_entradas=10_000, limpar_a_cada=200):
+        self.path = path
+        self.ttl = ttl
+        self.max_entradas = max_entradas
+        self.limpar_a_cada = limpar_a_cada
+        self._gravacoes = 0
+        self.hits = self.misses = self.despejos = 0
+        self._voos = VooUnico()
+        with self._conectar() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("CREATE TABLE IF NOT EXISTS cache (chave TEXT PRIMARY KEY, prefixo TEXT, valor BLOB NOT NULL, expira REAL NOT NULL)")
+
+    def _conectar(self):
+        return sqlite3.connect(self.path, timeout=5, isolation_level=None)
+
+    @staticmethod
+    def _chave(chave):
+        return repr(chave), (str(chave[0]) if isinstance(chave, tuple) and chave else None)
+
+    def get(self, chave, default=None):
+        conn = self._conectar()
+        try: linha = conn.execute("SELECT valor FROM cache WHERE chave = ? AND expira > ?", (self._chave(chave)[0], time.time())).fetchone()
+        finally: conn.close()
+        if linha is None:
+            self.misses += 1
+            return default
+        self.hits += 1
+        return pickle.loads(linha[0])
+
+    def get_many(self, chaves):
+        """{chave: valor} das chaves presentes e válidas, numa só conexão (consultas em lotes IN)."""
+        textos = {self._chave(c)[0]: c for c in chaves}
+        res, lista, agora = {}, list(textos), time.time()
+        conn = self._conectar()
+        try:
+            for i in range(0, len(lista), LOTE_SQLITE):
+                lote = lista[i:i + LOTE_SQLITE]
+                for texto, valor in conn.execute(f"SELECT chave, valor FROM cache WHERE chave IN ({', '.join('?' * len(lote))}) AND expira > ?", lote + [agora]):
+                    res[textos[texto]] = pickle.loads(valor)
+        finally:
+            conn.close()
+        self.hits += len(res); self.misses += len(textos) - len(res)
+        return res
+
+    def set(self, chave, valor, ttl=None):
+        self.set_many({chave: valor}, ttl)
+
+    def set_many(self, itens, ttl=None):
+        """Grava várias entradas numa só conexão e transação."""
+        if not itens: return
+        agora = time.time()
+        expira = agora + (self.ttl if ttl is None else ttl)
+        conn = self._conectar()
+        try:
+            with conn:
+                conn.execute("BEGIN")
+                conn.executemany("INSERT OR REPLACE INTO cache VALUES (?, ?, ?, ?)",
+                                 [(*self._chave(c), pickle.dumps(v, pickle.HIGHEST_PROTOCOL), expira) for c, v in itens.items()])
+            antes, self._gravacoes = self._gravacoes, self._gravacoes + len(itens)
+            if self._gravacoes // self.limpar_a_cada != antes // self.limpar_a_cada:  # passou de um múltiplo de limpar_a_cada
+                conn.execute("DELETE FROM cache WHERE expira <= ?", (agora,))
+                excesso = conn.execute("SELECT COUNT(*) FROM cache").fetchone()[0] - self.max_entradas
+                if excesso > 0:
+                    conn.execute("DELETE FROM cache WHERE chave IN (SELECT chave FROM cache ORDER BY expira LIMIT ?)", (excesso,))
+                    self.despejos += excesso
+        finally:
+            conn.close()
+
+    def get_or_load(self, chave, carregar, ttl=None, cachear_vazio=False):
+        """Valor em cache ou carregado agora; faltas simultâneas da mesma chave compartilham um único carregamento."""
+        valor = self.get(chave, _AUSENTE)
+        if valor is not _AUSENTE: return valor
+        def carregar_e_guardar():
+            valor = carregar()
+            if valor or cachear_vazio: self.set(chave, valor, ttl)
+            return valor
+        return self._voos.executar(chave, carregar_e_guardar)
+
+    def delete(self, chave):
+        conn = self._conectar()
+        try: conn.execute("DELETE FROM cache WHERE chave = ?", (self._chave(chave)[0],))
+        finally: conn.close()
+
+    def limpar_expirados(self):
+        conn = self._conectar()
+        try: return conn.execute("DELETE FROM cache WHERE expira <= ?", (time.time(),)).rowcount
+        finally: conn.close()
+
+    def invalidate(self, prefixo=None):
+        conn = self._conectar()
+        try:
+            if prefixo is None: conn.execute("DELETE FROM cache")
+            else: conn.execute("DELETE FROM cache WHERE prefixo = ?", (str(prefixo),))
+        finally:
+            conn.close()
+
+    def stats(self):
+        conn = self._conectar()
+        try: entradas = conn.execute("SELECT COUNT(*) FROM cache WHERE expira > ?", (time.time(),)).fetchone()[0]
+        finally: conn.close()
+        total = self.hits + self.misses
+        return {'entradas': entradas, 'hits': self.hits, 'misses': self.misses, 'despejos': self.despejos,
+                'compartilhadas': self._voos.compartilhadas, 'hit_ratio': (self.hits / total if total else 0.0)}
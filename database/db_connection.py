@@ -1,36 +1,304 @@
 import pyodbc
 import json
 import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from functools import lru_cache
+
+from database.disjuntor import Disjuntor
+
+CONFIG_FILE = os.path.join(os.path.dirname(__file__), 'config.json')
+
+# ============================================
+# CONFIGURAÇÃO (LIDA UMA VEZ, RECARREGADA SE O ARQUIVO MUDAR)
+# ============================================
+
+_config_lock = threading.Lock()
+_config_cache = {'assinatura': None, 'config': None}
+
+def _assinatura(path):
+    try:
+        st = os.stat(path)
+        return (st.st_mtime_ns, st.st_size)
+    except OSError:
+        return None
+
+def get_config(path=CONFIG_FILE):
+    """Retorna o config.json parseado; só relê o arquivo quando mtime/tamanho mudam."""
+    ass = _assinatura(path)
+    if ass is None: return None
+    with _config_lock:
+        if _config_cache['assinatura'] != ass:
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    _config_cache['config'] = json.load(f)
+            except (OSError, ValueError):
+                _config_cache['config'] = None
+            _config_cache['assinatura'] = ass
+        return _config_cache['config']
+
+def build_conn_str(cfg):
+    return (f"Driver={{ODBC Driver 17 for SQL Server}};Server={cfg['server']};"
+            f"Database={cfg['database']};UID={cfg['username']};PWD={cfg['password']};")
+
+# ============================================
+# POOL DE CONEXÕES
+# ============================================
+
+class PoolError(Exception):
+    pass
+
+# Erros que indicam servidor fora/lento (conexão, timeout, link caído); erro de SQL não conta para o disjuntor
+FALHAS_SERVIDOR = (pyodbc.OperationalError, pyodbc.InterfaceError)
+
+class ConnectionPool:
+    """Pool limitado de conexões pyodbc reaproveitadas entre consultas e requisições.
+
+    A configuração é lida via get_config(); quando o config.json muda, as conexões
+    abertas com a configuração antiga são descartadas na devolução. Falhas de
+    servidor seguidas abrem o disjuntor (ver database/disjuntor.py).
+    """
+
+    def __init__(self, config_file=CONFIG_FILE, max_size=10, connect_timeout=10,
+                 acquire_timeout=15, health_interval=30, max_idle=300, limite_falhas=5, espera_disjuntor=30):
+        self.config_file = config_file
+        self.max_size = max_size
+        self.connect_timeout = connect_timeout
+        self.acquire_timeout = acquire_timeout
+        self.health_interval = health_interval
+        self.max_idle = max_idle
+        self._cond = threading.Condition()
+        self._idle = deque()  # (conn, geracao, ultimo_uso)
+        self._size = 0
+        self._in_use = 0
+        self._geracao = 0
+        self._cfg_key = None
+        self.stats = {'criadas': 0, 'reusadas': 0, 'descartadas': 0, 'esperas': 0}
+        self.disjuntor = Disjuntor(self._sondar, limite_falhas, espera_disjuntor)
+
+    def _config_atual(self):
+        cfg = get_config(self.config_file)
+        if not cfg: raise PoolError("Sem config")
+        chave = build_conn_str(cfg)
+        if chave != self._cfg_key:
+            # Config nova: invalida as conexões ociosas da geração anterior
+            self._cfg_key = chave
+            self._geracao += 1
+            while self._idle:
+                self._fechar(self._idle.popleft()[0])
+        return chave
+
+    def _fechar(self, conn):
+        self._size -= 1
+        self.stats['descartadas'] += 1
+        try: conn.close()
+        except Exception: pass
+
+    def _saudavel(self, conn, ultimo_uso):
+        if time.monotonic() - ultimo_uso < self.health_interval: return True
+        try:
+            cur = conn.cursor()
+            cur.execute("SELECT 1")
+            cur.fetchone()
+            cur.close()
+            return True
+        except Exception:
+            return False
+
+    def _sondar(self):
+        cfg = get_config(self.config_file)
+        if not cfg: raise PoolError("Sem config")
+        conn = pyodbc.connect(build_conn_str(cfg), timeout=self.connect_timeout, autocommit=True)
+        try:
+            cur = conn.cursor()
+            cur.execute("SELECT 1")
+            cur.fetchone()
+        finally:
+            conn.close()
+
+    def _pegar_ocioso(self, geracao):
+        agora = time.monotonic()
+        while self._idle:
+            conn, ger, ultimo = self._idle.pop()
+            if ger == geracao and agora - ultimo <= self.max_idle:
+                return conn, ultimo
+            self._fechar(conn)
+        return None
+
+    def acquire(self):
+        self.disjuntor.permitir()  # ERP fora: falha na hora, sem esperar o timeout de conexão
+        limite = time.monotonic() + self.acquire_timeout
+        with self._cond:
+            while True:
+                conn_str = self._config_atual()
+                geracao = self._geracao
+                ocioso = self._pegar_ocioso(geracao)
+                if ocioso or self._size < self.max_size:
+                    if not ocioso: self._size += 1
+                    self._in_use += 1
+                    break
+                restante = limite - time.monotonic()
+                if restante <= 0: raise PoolError("Tempo esgotado aguardando conexão livre no pool")
+                self.stats['esperas'] += 1
+                self._cond.wait(restante)
+
+        # Health check e abertura de conexão acontecem fora do lock
+        if ocioso:
+            conn, ultimo = ocioso
+            if self._saudavel(conn, ultimo):
+                with self._cond: self.stats['reusadas'] += 1
+                return conn, geracao
+            with self._cond:
+                self._fechar(conn); self._size += 1
+        try:
+            conn = pyodbc.connect(conn_str, timeout=self.connect_timeout, autocommit=True)
+        except Exception as e:
+            if isinstance(e, FALHAS_SERVIDOR): self.disjuntor.falha(e)
+            with self._cond:
+                self._size -= 1; self._in_use -= 1
+                self._cond.notify()
+            raise
+        with self._cond: self.stats['criadas'] += 1
+        return conn, geracao
+
+    def release(self, conn, geracao, descartar=False):
+        with self._cond:
+            self._in_use -= 1
+            if descartar or geracao != self._geracao:
+                self._fechar(conn)
+            else:
+                self._idle.append((conn, geracao, time.monotonic()))
+            self._cond.notify()
+
+    @contextmanager
+    def connection(self):
+        conn, geracao = self.acquire()
+        falhou = False
+        try:
+            yield conn
+        except Exception as e:
+            # Sem como saber se a conexão ficou utilizável: descarta
+            falhou = True
+            if isinstance(e, FALHAS_SERVIDOR): self.disjuntor.falha(e)
+            raise
+        else:
+            self.disjuntor.sucesso()
+        finally:
+            self.release(conn, geracao, descartar=falhou)
+
+    def close_all(self):
+        with self._cond:
+            while self._idle:
+                self._fechar(self._idle.popleft()[0])
+            self._geracao += 1
+
+    def status(self):
+        with self._cond:
+            return {'tamanho': self._size, 'em_uso': self._in_use, 'ociosas': len(self._idle),
+                    'max': self.max_size, **self.stats}
+
+pool = ConnectionPool(max_size=int(os.getenv('DB_POOL_SIZE', 10)),
+                      connect_timeout=int(os.getenv('DB_CONNECT_TIMEOUT', 10)),
+                      acquire_timeout=float(os.getenv('DB_POOL_TIMEOUT', 15)),
+                      limite_falhas=int(os.getenv('DB_DISJUNTOR_FALHAS', 5)),
+                      espera_disjuntor=float(os.getenv('DB_DISJUNTOR_ESPERA', 30)))
+
+# ============================================
+# LEITURA EM LOTES E LINHAS COMPACTAS
+# ============================================
+# fetchmany(arraysize) em vez de fetchall: o resultado nunca fica inteiro em
+# memória duas vezes. Linhas com nome são tuplas de uma classe por esquema
+# (colunas guardadas uma vez na classe, não em cada linha como num dict).
+
+ARRAYSIZE = int(os.getenv('DB_ARRAYSIZE', 1000))
+
+def lotes(cursor, arraysize=None):
+    """Itera o resultado do cursor em listas de até `arraysize` linhas."""
+    arraysize = arraysize or ARRAYSIZE
+    cursor.arraysize = arraysize
+    while True:
+        lote = cursor.fetchmany(arraysize)
+        if not lote: return
+        yield lote
+
+class Linha(tuple):
+    """Tupla com acesso por nome: linha['Codigo'], linha.Codigo ou linha[0]."""
+    __slots__ = ()
+    _indice = {}
+    colunas = ()
+
+    def __getitem__(self, chave):
+        if isinstance(chave, str):
+            try: chave = self._indice[chave]
+            except KeyError: chave = self._indice[chave.lower()]
+        return tuple.__getitem__(self, chave)
+
+    def __getattr__(self, nome):
+        try: return self[nome]
+        except KeyError: raise AttributeError(nome) from None
+
+    def get(self, nome, default=None):
+        try: return self[nome]
+        except KeyError: return default
+
+    def keys(self):
+        return self.colunas
+
+    def as_dict(self):
+        return dict(zip(self.colunas, self))
+
+    def __repr__(self):
+        return 'Linha(' + ', '.join(f"{c}={v!r}" for c, v in zip(self.colunas, self)) + ')'
+
+@lru_cache(maxsize=256)
+def tipo_linha(colunas):
+    """Classe de linha para a tupla de nomes de coluna (uma por esquema, reaproveitada)."""
+    indice = {c: i for i, c in enumerate(colunas)}
+    indice.update({c.lower(): i for c, i in list(indice.items()) if c.lower() not in indice})
+    return type('Linha', (Linha,), {'__slots__': (), '_indice': indice, 'colunas': colunas})
+
+def linhas_nomeadas(cursor, arraysize=None):
+    """Gera Linha por Linha do resultado do cursor, lendo em lotes."""
+    tipo = tipo_linha(tuple(d[0] for d in cursor.description))
+    for lote in lotes(cursor, arraysize):
+        yield from map(tipo, lote)
 
 class DatabaseConnection:
-    def __init__(self):
-        self.connection = None
-        self.config_file = os.path.join(os.path.dirname(__file__), 'config.json')
+    def __init__(self, pool):
+        self.pool = pool
+        self.config_file = pool.config_file
         self.config = self.load_config()
 
+    @property
+    def connection(self):
+        return self.pool if self.pool.status()['tamanho'] > 0 else None
+
     def load_config(self):
-        try:
-            if os.path.exists(self.config_file):
-                with open(self.config_file, 'r') as f:
-                    return json.load(f)
-        except: return None
+        return get_config(self.config_file)
 
     def connect(self):
+        self.config = self.load_config()
         if not self.config: return False, "Sem config"
         try:
-            conn_str = (f"Driver={{ODBC Driver 17 for SQL Server}};Server={self.config['server']};"
-                        f"Database={self.config['database']};UID={self.config['username']};PWD={self.config['password']}")
-            self.connection = pyodbc.connect(conn_str, autocommit=True)
+            with self.pool.connection(): pass
             return True, "Ok"
         except Exception as e: return False, str(e)
 
-    def execute_query(self, query):
-        if not self.connection: self.connect()
-        try:
-            cursor = self.connection.cursor()
-            cursor.execute(query)
-            columns = [desc[0] for desc in cursor.description]
-            return [dict(zip(columns, row)) for row in cursor.fetchall()]
-        except: return []
+    def iter_query(self, query, params=None, arraysize=None):
+        """Gera Linha (acesso por nome e posição) lendo em lotes de `arraysize`; a conexão volta ao pool ao fim da iteração."""
+        with self.pool.connection() as conn:
+            cursor = conn.cursor()
+            try:
+                if params: cursor.execute(query, params)
+                else: cursor.execute(query)
+                yield from linhas_nomeadas(cursor, arraysize)
+            finally:
+                cursor.close()
+
+    def execute_query(self, query, params=None, arraysize=None):
+        try: return list(self.iter_query(query, params, arraysize))
+        except Exception: return []
 
-db = DatabaseConnection()
\ No newline at end of file
+db = DatabaseConnection(pool)
@@ -0,0 +1,73 @@
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# ============================================
+# DISJUNTOR (CIRCUIT BREAKER) DO ERP
+# ============================================
+# Com o SQL Server fora do ar, cada consulta esperaria o timeout de conexão e
+# prenderia um worker. Depois de `limite` falhas seguidas o disjuntor abre e as
+# consultas falham na hora (CircuitoAberto). Passados `espera` segundos, a
+# próxima chamada dispara uma sondagem em segundo plano (meio-aberto), que
+# fecha o disjuntor se o servidor respondeu ou o mantém aberto por mais `espera`.
+
+FECHADO, ABERTO, MEIO_ABERTO = 'fechado', 'aberto', 'meio_aberto'
+
+class CircuitoAberto(Exception):
+    pass
+
+class Disjuntor:
+    def __init__(self, sondar, limite=5, espera=30):
+        self.sondar = sondar  # testa o servidor; levanta exceção se ainda estiver fora
+        self.limite = limite
+        self.espera = espera
+        self._lock = threading.Lock()
+        self.estado = FECHADO
+        self.falhas = 0
+        self.aberto_em = None
+        self.ultimo_erro = None
+        self.stats = {'aberturas': 0, 'rejeitadas': 0, 'sondagens': 0}
+
+    def permitir(self):
+        """Retorna se a chamada pode ir ao banco; senão levanta CircuitoAberto sem esperar nada."""
+        if self.estado == FECHADO: return
+        with self._lock:
+            if self.estado == FECHADO: return
+            self.stats['rejeitadas'] += 1
+            if self.estado == ABERTO and time.monotonic() - self.aberto_em >= self.espera:
+                self.estado = MEIO_ABERTO
+                threading.Thread(target=self._sondar, name='disjuntor-sonda', daemon=True).start()
+        raise CircuitoAberto(f"ERP indisponível: {self.ultimo_erro}")
+
+    def _sondar(self):
+        self.stats['sondagens'] += 1
+        try: self.sondar()
+        except Exception as e:
+            with self._lock: self.estado, self.aberto_em, self.ultimo_erro = ABERTO, time.monotonic(), str(e)
+            logger.warning(f"⚡ ERP ainda indisponível, nova sondagem em {self.espera} s: {e}")
+            return
+        self.sucesso()
+
+    def sucesso(self):
+        if not self.falhas and self.estado == FECHADO: return
+        with self._lock:
+            reabriu = self.estado != FECHADO
+            self.estado, self.falhas = FECHADO, 0
+        if reabriu: logger.info("⚡ ERP respondeu: disjuntor fechado")
+
+    def falha(self, erro):
+        with self._lock:
+            self.falhas += 1
+            self.ultimo_erro = str(erro)
+            if self.estado != FECHADO or self.falhas < self.limite: return
+            self.estado, self.aberto_em = ABERTO, time.monotonic()
+            self.stats['aberturas'] += 1
+        logger.error(f"⚡ Disjuntor aberto após {self.falhas} falhas seguidas do ERP: {erro}")
+
+    def aberto(self):
+        return self.estado != FECHADO
+
+    def status(self):
+        return {'estado': self.estado, 'falhas': self.falhas, 'ultimo_erro': self.ultimo_erro, **self.stats}
@@ -0,0 +1,126 @@
+import io
+import csv
+import zipfile
+from datetime import date, datetime
+from decimal import Decimal
+from xml.sax.saxutils import escape
+
+# ============================================
+# EXPORTAÇÃO EM STREAMING (CSV / XLSX)
+# ============================================
+# Geradores de bytes: recebem um iterável de linhas (ex.: iter_query, que lê
+# com fetchmany) e devolvem pedaços prontos para a resposta HTTP. Nada é
+# acumulado além de um lote, então a memória não depende do tamanho da
+# exportação, e o cabeçalho sai antes de a consulta terminar.
+#
+# O XLSX é montado à mão (zip sem seek, planilha com inlineStr): o modo
+# write_only do openpyxl ainda grava tudo num arquivo temporário antes de
+# entregar o primeiro byte.
+
+LOTE = 500  # linhas por pedaço enviado
+
+def _texto_csv(v):
+    if v is None: return ''
+    if isinstance(v, (float, Decimal)): return f"{v:.2f}".replace('.', ',')  # Excel pt-BR
+    if isinstance(v, datetime): return v.strftime('%d/%m/%Y') if v.time() == datetime.min.time() else v.strftime('%d/%m/%Y %H:%M')
+    if isinstance(v, date): return v.strftime('%d/%m/%Y')
+    return str(v).strip()
+
+def csv_stream(colunas, linhas):
+    """CSV com ';' e BOM (abre direto no Excel em português)."""
+    buf = io.StringIO()
+    w = csv.writer(buf, delimiter=';', lineterminator='\r\n')
+    w.writerow(colunas)
+    yield '\ufeff'.encode('utf-8') + buf.getvalue().encode('utf-8')
+    buf.seek(0); buf.truncate()
+    for i, linha in enumerate(linhas, 1):
+        w.writerow([_texto_csv(v) for v in linha])
+        if i % LOTE == 0:
+            yield buf.getvalue().encode('utf-8')
+            buf.seek(0); buf.truncate()
+    if buf.tell(): yield buf.getvalue().encode('utf-8')
+
+# ---------- XLSX ----------
+
+_EPOCA = datetime(1899, 12, 30)
+
+_FIXOS = {
+    '[Content_Types].xml': '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        '<Override PartName="/xl/worksheets/sheet1.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        '<Override PartName="/xl/styles.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+        '</Types>',
+    '_rels/.rels': '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" Target="xl/workbook.xml"/>'
+        '</Relationships>',
+    'xl/_rels/workbook.xml.rels': '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" Target="worksheets/sheet1.xml"/>'
+        '<Relationship Id="rId2" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles" Target="styles.xml"/>'
+        '</Relationships>',
+    # estilos: 0 = padrão, 1 = data (dd/mm/aaaa), 2 = número com 2 casas, 3 = cabeçalho em negrito
+    'xl/styles.xml': '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<styleSheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+        '<fonts count="2"><font><sz val="11"/><name val="Calibri"/></font><font><b/><sz val="11"/><name val="Calibri"/></font></fonts>'
+        '<fills count="2"><fill><patternFill patternType="none"/></fill><fill><patternFill patternType="gray125"/></fill></fills>'
+        '<borders count="1"><border><left/><right/><top/><bottom/><diagonal/></border></borders>'
+        '<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>'
+        '<cellXfs count="4"><xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/>'
+        '<xf numFmtId="14" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/>'
+        '<xf numFmtId="4" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/>'
+        '<xf numFmtId="0" fontId="1" fillId="0" borderId="0" xfId="0" applyFont="1"/></cellXfs>'
+        '<cellStyles count="1"><cellStyle name="Normal" xfId="0" builtinId="0"/></cellStyles>'
+        '</styleSheet>',
+}
+
+def _celula(v, estilo_texto=0):
+    if v is None: return '<c/>'
+    if isinstance(v, bool): return f'<c t="b"><v>{int(v)}</v></c>'
+    if isinstance(v, int): return f'<c><v>{v}</v></c>'
+    if isinstance(v, (float, Decimal)): return f'<c s="2"><v>{float(v)!r}</v></c>'
+    if isinstance(v, datetime): return f'<c s="1"><v>{(v - _EPOCA).total_seconds() / 86400!r}</v></c>'
+    if isinstance(v, date): return f'<c s="1"><v>{(v - _EPOCA.date()).days}</v></c>'
+    s = f' s="{estilo_texto}"' if estilo_texto else ''
+    return f'<c t="inlineStr"{s}><is><t xml:space="preserve">{escape(str(v).strip())}</t></is></c>'
+
+class _Saida(io.RawIOBase):
+    """Destino do zip sem seek: acumula só o que ainda não foi entregue."""
+    def __init__(self): self.pedacos, self.posicao = [], 0
+    def writable(self): return True
+    def write(self, b):
+        self.pedacos.append(bytes(b)); self.posicao += len(b)
+        return len(b)
+    def tell(self): return self.posicao
+    def retirar(self):
+        dados = b''.join(self.pedacos); self.pedacos.clear()
+        return dados
+
+def xlsx_stream(colunas, linhas, aba='Dados'):
+    """Planilha única; datas e números viram células tipadas."""
+    saida = _Saida()
+    with zipfile.ZipFile(saida, 'w', zipfile.ZIP_DEFLATED) as zf:
+        for nome, xml in _FIXOS.items(): zf.writestr(nome, xml)
+        zf.writestr('xl/workbook.xml', '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                    '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+                    'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+                    f'<sheets><sheet name="{escape(aba[:31])}" sheetId="1" r:id="rId1"/></sheets></workbook>')
+        with zf.open('xl/worksheets/sheet1.xml', 'w', force_zip64=True) as planilha:
+            planilha.write(('<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                            '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+                            '<row>' + ''.join(_celula(c, 3) for c in colunas) + '</row>').encode('utf-8'))
+            yield saida.retirar()
+            lote = []
+            for i, linha in enumerate(linhas, 1):
+                lote.append('<row>' + ''.join(_celula(v) for v in linha) + '</row>')
+                if i % LOTE == 0:
+                    planilha.write(''.join(lote).encode('utf-8')); lote.clear()
+                    yield saida.retirar()
+            planilha.write((''.join(lote) + '</sheetData></worksheet>').encode('utf-8'))
+    yield saida.retirar()
+
+FORMATOS = {'csv': (csv_stream, 'text/csv; charset=utf-8'),
+            'xlsx': (xlsx_stream, 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')}
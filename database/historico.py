@@ -0,0 +1,66 @@
+from datetime import datetime
+
+from database.parametros import filtro_in
+from database.periodos import periodo_mes, periodo_ultimos_meses, filtro_emissao
+
+# ============================================
+# HISTÓRICO MENSAL POR CLIENTE (JANELA MÓVEL)
+# ============================================
+# Mês fechado não muda mais: as somas mensais de cada cliente ficam no cache
+# sem prazo, com o intervalo coberto [desde, ate). Na virada do mês só o mês
+# que fechou é buscado; o mês corrente é sempre consultado ao vivo.
+# prefetch() carrega de uma vez (em lotes IN) os clientes de uma carteira; o
+# cache é lido e gravado em lote (get_many/set_many), não cliente a cliente.
+
+PERMANENTE = 10 * 365 * 86400  # "sem prazo" para os caches com TTL
+LOTE_IN = 1000                 # SQL Server: até 2100 parâmetros por comando
+
+class HistoricoMensal:
+    def __init__(self, executar, cache):
+        self.executar = executar  # deve levantar exceção em erro: mês vazio por falha não pode ir para o cache
+        self.cache = cache
+
+    def _somas(self, clientes, periodo, nome):
+        f_per, p_per = filtro_emissao(periodo)
+        res = {c: {} for c in clientes}
+        for i in range(0, len(clientes), LOTE_IN):
+            f_cli, p_cli = filtro_in('Cod_Cliente', clientes[i:i + LOTE_IN])
+            linhas = self.executar(f"""SELECT Cod_Cliente, YEAR(Dat_Emissao), MONTH(Dat_Emissao), SUM(Vlr_TotalNota) FROM NFSCB WITH (NOLOCK)
+                WHERE {f_cli} AND Status = 'F' AND Cod_Estabe = 0 AND {f_per}
+                GROUP BY Cod_Cliente, YEAR(Dat_Emissao), MONTH(Dat_Emissao)""", p_cli + p_per, nome=nome)
+            for c, ano, mes, total in linhas: res[int(c)][(int(ano), int(mes))] = float(total or 0)
+        return res
+
+    def fechados(self, clientes, inicio, atual):
+        """{cliente: {(ano, mes): total}} dos meses fechados [inicio, atual), consultando só o que falta no cache."""
+        return self._fechados(clientes, inicio, atual)[0]
+
+    def _fechados(self, clientes, inicio, atual):
+        res, faltando = {}, {}  # faltando: (desde já coberto, início da busca) -> clientes
+        em_cache = self.cache.get_many([('historico', c) for c in clientes])
+        for c in clientes:
+            item = em_cache.get(('historico', c))
+            if item and item['desde'] <= inicio and item['ate'] == atual:
+                res[c] = item['meses']; continue
+            if item and item['desde'] <= inicio and item['ate'] < atual:
+                res[c] = dict(item['meses']); faltando.setdefault((item['desde'], item['ate']), []).append(c)
+            else:
+                res[c] = {}; faltando.setdefault((inicio, inicio), []).append(c)
+        for (desde, de), cs in faltando.items():
+            novos = {}
+            for c, meses in self._somas(cs, (de, atual), 'cliente_historico_fechados').items():
+                res[c].update(meses)
+                novos[('historico', c)] = {'desde': desde, 'ate': atual, 'meses': res[c]}
+            self.cache.set_many(novos, ttl=PERMANENTE)
+        return res, sum(len(cs) for cs in faltando.values())
+
+    def mensal(self, cliente, meses, hoje):
+        """[(ano, mes, total)] da janela móvel: meses fechados do cache + mês corrente ao vivo."""
+        atual, inicio = datetime(hoje.year, hoje.month, 1), periodo_ultimos_meses(meses, hoje)[0]
+        historico = dict(self.fechados([cliente], inicio, atual)[cliente])
+        historico.update(self._somas([cliente], periodo_mes(hoje.year, hoje.month), 'cliente_historico_mes')[cliente])
+        return [(a, m, v) for (a, m), v in sorted(historico.items()) if (a, m) >= (inicio.year, inicio.month)]
+
+    def prefetch(self, clientes, meses, hoje):
+        """Aquece os meses fechados de vários clientes (ex.: a carteira de um vendedor); devolve quantos precisaram de consulta."""
+        return self._fechados(sorted({int(c) for c in clientes}), periodo_ultimos_meses(meses, hoje)[0], datetime(hoje.year, hoje.month, 1))[1]
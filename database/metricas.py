@@ -0,0 +1,140 @@
+import os
+import time
+import logging
+import threading
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+logger = logging.getLogger(__name__)
+logger_lenta = logging.getLogger('sql_lenta')  # direcionável para um arquivo próprio
+
+# ============================================
+# MÉTRICAS (FORMATO TEXTO DO PROMETHEUS)
+# ============================================
+# Registro mínimo de contadores/histogramas com rótulos, sem dependências.
+# A rota corrente fica num ContextVar, para que consultas disparadas em
+# threads auxiliares (ver paralelo.py) sejam atribuídas à rota certa.
+
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+SQL_LENTA_S = float(os.getenv('SQL_LENTA_MS', 1000)) / 1000
+
+rota_atual = ContextVar('rota_atual', default='segundo_plano')
+LE = 'le="%s"'  # rótulo extra dos buckets do histograma
+
+def _escapar(v):
+    return str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', ' ')
+
+def _rotulos(nomes, valores, extra=''):
+    pares = [f'{n}="{_escapar(v)}"' for n, v in zip(nomes, valores)]
+    if extra: pares.append(extra)
+    return '{' + ','.join(pares) + '}' if pares else ''
+
+def _num(v):
+    return repr(float(v)) if isinstance(v, float) else str(v)
+
+class Contador:
+    tipo = 'counter'
+
+    def __init__(self, nome, ajuda, rotulos=()):
+        self.nome, self.ajuda, self.rotulos = nome, ajuda, tuple(rotulos)
+        self._valores = {}
+        self._lock = threading.Lock()
+
+    def inc(self, n=1, **rotulos):
+        chave = tuple(rotulos[r] for r in self.rotulos)
+        with self._lock: self._valores[chave] = self._valores.get(chave, 0) + n
+
+    def amostras(self):
+        with self._lock:
+            return [f"{self.nome}{_rotulos(self.rotulos, k)} {_num(v)}" for k, v in sorted(self._valores.items())]
+
+class Histograma:
+    tipo = 'histogram'
+
+    def __init__(self, nome, ajuda, rotulos=(), buckets=BUCKETS):
+        self.nome, self.ajuda, self.rotulos, self.buckets = nome, ajuda, tuple(rotulos), tuple(buckets)
+        self._series = {}  # rótulos -> [contagens por bucket..., soma, total]
+        self._lock = threading.Lock()
+
+    def observar(self, valor, **rotulos):
+        chave = tuple(rotulos[r] for r in self.rotulos)
+        i = bisect_left(self.buckets, valor)
+        with self._lock:
+            serie = self._series.get(chave)
+            if serie is None: serie = self._series[chave] = [0] * len(self.buckets) + [0.0, 0]
+            if i < len(self.buckets): serie[i] += 1
+            serie[-2] += valor; serie[-1] += 1
+
+    def amostras(self):
+        linhas = []
+        with self._lock: series = {k: list(v) for k, v in self._series.items()}
+        for chave, serie in sorted(series.items()):
+            acumulado = 0
+            for le, n in zip(self.buckets, serie):
+                acumulado += n
+                linhas.append(f"{self.nome}_bucket{_rotulos(self.rotulos, chave, LE % le)} {acumulado}")
+            linhas.append(f"{self.nome}_bucket{_rotulos(self.rotulos, chave, LE % '+Inf')} {serie[-1]}")
+            linhas.append(f"{self.nome}_sum{_rotulos(self.rotulos, chave)} {_num(serie[-2])}")
+            linhas.append(f"{self.nome}_count{_rotulos(self.rotulos, chave)} {serie[-1]}")
+        return linhas
+
+class Registro:
+    def __init__(self):
+        self._metricas = []
+        self._coletores = []
+
+    def contador(self, *args, **kwargs):
+        m = Contador(*args, **kwargs); self._metricas.append(m); return m
+
+    def histograma(self, *args, **kwargs):
+        m = Histograma(*args, **kwargs); self._metricas.append(m); return m
+
+    def coletor(self, fn):
+        """fn() -> [(nome, tipo, ajuda, [(dict de rótulos, valor)])], lido a cada exportação (pool, caches)."""
+        self._coletores.append(fn)
+        return fn
+
+    def exportar(self):
+        linhas = []
+        for m in self._metricas:
+            linhas += [f"# HELP {m.nome} {m.ajuda}", f"# TYPE {m.nome} {m.tipo}"] + m.amostras()
+        for fn in self._coletores:
+            try:
+                for nome, tipo, ajuda, amostras in fn():
+                    linhas += [f"# HELP {nome} {ajuda}", f"# TYPE {nome} {tipo}"]
+                    linhas += [f"{nome}{_rotulos(list(r), list(r.values()))} {_num(v)}" for r, v in amostras]
+            except Exception as e:
+                logger.error(f"❌ Coletor de métricas: {e}")
+        return '\n'.join(linhas) + '\n'
+
+registro = Registro()
+
+rota_segundos = registro.histograma('bi_rota_segundos', 'Tempo de resposta por rota.', ('rota',))
+rota_respostas = registro.contador('bi_rota_respostas_total', 'Respostas por rota e status HTTP.', ('rota', 'status'))
+consulta_segundos = registro.histograma('bi_consulta_segundos', 'Tempo de execução por consulta SQL (inclui a leitura das linhas).', ('rota', 'consulta'))
+consulta_linhas = registro.contador('bi_consulta_linhas_total', 'Linhas lidas por consulta SQL.', ('rota', 'consulta'))
+consulta_erros = registro.contador('bi_consulta_erros_total', 'Consultas SQL que falharam.', ('rota', 'consulta'))
+consulta_lentas = registro.contador('bi_consulta_lentas_total', 'Consultas acima de SQL_LENTA_MS.', ('rota', 'consulta'))
+tarefas_padrao = registro.contador('bi_tarefa_padrao_total', 'Tarefas paralelas que estouraram o prazo ou falharam e devolveram o valor padrão.', ('rota', 'tarefa', 'motivo'))
+pool_espera = registro.histograma('bi_pool_espera_segundos', 'Espera para obter uma conexão do pool.', ('rota',))
+
+@contextmanager
+def medir_consulta(nome, sql=''):
+    """Mede uma consulta; o chamador preenche m['linhas'] e m['espera'] (aquisição da conexão)."""
+    m = {'linhas': 0, 'espera': None}
+    rota = rota_atual.get()
+    t0 = time.perf_counter()
+    try:
+        yield m
+    except Exception:
+        consulta_erros.inc(rota=rota, consulta=nome)
+        raise
+    finally:
+        dur = time.perf_counter() - t0
+        consulta_segundos.observar(dur, rota=rota, consulta=nome)
+        consulta_linhas.inc(m['linhas'], rota=rota, consulta=nome)
+        if m['espera'] is not None: pool_espera.observar(m['espera'], rota=rota)
+        if dur >= SQL_LENTA_S:
+            consulta_lentas.inc(rota=rota, consulta=nome)
+            logger_lenta.warning(f"🐢 {nome} [{rota}] {dur * 1000:.0f} ms, {m['linhas']} linhas: {' '.join(sql.split())[:500]}")
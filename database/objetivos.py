@@ -0,0 +1,90 @@
+import os
+import struct
+import threading
+import logging
+from array import array
+from database.vetorial import indexar
+
+logger = logging.getLogger(__name__)
+
+# ============================================
+# OBJETIVOS POR CLIENTE (Vlr_ObjetivoClie.xlsx)
+# ============================================
+# A planilha só é lida (com pandas/openpyxl) quando muda. O resultado fica em
+# memória e também num arquivo binário ao lado dela (.bin), para que um worker
+# recém-iniciado não precise parsear o XLSX. Uma planilha ilegível também fica
+# memorizada (como {}) até o arquivo mudar, em vez de ser reparseada a cada
+# requisição.
+
+_CABECALHO = struct.Struct('<4sqqq')  # magic, mtime_ns, tamanho, quantidade
+_MAGIC = b'OBJ1'
+
+class ObjetivosCache:
+    def __init__(self, path, sidecar=None):
+        self.path = path
+        self.sidecar = sidecar or path + '.bin'
+        self._lock = threading.Lock()
+        self._assinatura = None
+        self._dados = {}
+        self._indice = (None, None)
+
+    def _assinatura_atual(self):
+        try:
+            st = os.stat(self.path)
+            return (st.st_mtime_ns, st.st_size)
+        except OSError:
+            return None
+
+    def get(self):
+        """Mapa Codigo (int) -> Vlr_ObjetivoClie (float); {} se a planilha não existir ou não puder ser lida."""
+        ass = self._assinatura_atual()
+        if ass is None: return {}
+        if ass == self._assinatura: return self._dados
+        with self._lock:
+            if ass != self._assinatura:
+                dados = self._ler_sidecar(ass)
+                if dados is None:
+                    dados = self._ler_excel()
+                    if dados is None: dados = {}  # falha memorizada com a mesma assinatura; sem sidecar
+                    else: self._gravar_sidecar(ass, dados)
+                self._dados, self._assinatura = dados, ass
+            return self._dados
+
+    def indice(self):
+        """Objetivos como arrays ordenados (codigos, valores), para junções vetorizadas."""
+        dados = self.get()
+        if self._indice[0] is not dados: self._indice = (dados, indexar(dados))
+        return self._indice[1]
+
+    def _ler_excel(self):
+        try:
+            import pandas as pd  # só importado quando a planilha precisa ser relida
+            df = pd.read_excel(self.path, usecols=['Codigo', 'Vlr_ObjetivoClie'])
+            df = df.dropna(subset=['Codigo'])
+            return dict(zip(df['Codigo'].astype(int).tolist(), df['Vlr_ObjetivoClie'].fillna(0).astype(float).tolist()))
+        except Exception as e:
+            logger.error(f"❌ Erro lendo objetivos: {e}")
+            return None
+
+    def _ler_sidecar(self, ass):
+        try:
+            with open(self.sidecar, 'rb') as f:
+                magic, mtime_ns, tamanho, qtd = _CABECALHO.unpack(f.read(_CABECALHO.size))
+                if magic != _MAGIC or (mtime_ns, tamanho) != ass: return None
+                codigos, valores = array('q'), array('d')
+                codigos.fromfile(f, qtd); valores.fromfile(f, qtd)
+            return dict(zip(codigos, valores))
+        except (OSError, EOFError, struct.error):
+            return None
+
+    def _gravar_sidecar(self, ass, dados):
+        tmp = f"{self.sidecar}.{os.getpid()}.tmp"
+        try:
+            with open(tmp, 'wb') as f:
+                f.write(_CABECALHO.pack(_MAGIC, ass[0], ass[1], len(dados)))
+                array('q', dados.keys()).tofile(f)
+                array('d', dados.values()).tofile(f)
+            os.replace(tmp, self.sidecar)
+        except OSError:
+            try: os.remove(tmp)
+            except OSError: pass
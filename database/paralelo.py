@@ -0,0 +1,69 @@
+import os
+import time
+import logging
+import contextvars
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturoTimeout
+
+from database.metricas import rota_atual, tarefas_padrao
+
+logger = logging.getLogger(__name__)
+
+# ============================================
+# CONSULTAS INDEPENDENTES EM PARALELO
+# ============================================
+# As threads das requisições usam o mesmo pool de conexões: com uma thread
+# aqui por conexão, os KPIs paralelos tomariam o pool inteiro e as consultas
+# das páginas estourariam o prazo de acquire. Por padrão o executor fica com
+# metade das conexões (QUERY_WORKERS muda isso); tarefas a mais esperam na
+# fila, dentro do mesmo prazo.
+
+_executor = ThreadPoolExecutor(max_workers=int(os.getenv('QUERY_WORKERS', max(1, int(os.getenv('DB_POOL_SIZE', 10)) // 2))), thread_name_prefix='consulta')
+
+# Resposta degradada: alguma consulta falhou ou caiu no valor padrão durante o
+# cálculo. O conjunto de motivos é mutável e compartilhado com as threads
+# auxiliares (copy_context copia a referência), então a marcação feita lá
+# chega a quem abriu o registro (cache_resposta, caches de KPIs).
+_degradacao = contextvars.ContextVar('degradacao', default=None)
+
+@contextmanager
+def registrar_degradacao():
+    """Abre um registro de degradações no contexto atual e entrega o conjunto de motivos (vazio = resultado íntegro)."""
+    motivos = set()
+    externo = _degradacao.get()
+    token = _degradacao.set(motivos)
+    try: yield motivos
+    finally:
+        _degradacao.reset(token)
+        if externo is not None: externo |= motivos  # registro aninhado: o de fora também fica sabendo
+
+def marcar_degradado(motivo):
+    motivos = _degradacao.get()
+    if motivos is not None: motivos.add(motivo)
+
+def executar_em_paralelo(tarefas, timeout=30, padroes=None, padrao=0):
+    """Executa {nome: callable} no pool de threads e devolve {nome: resultado}.
+
+    Cada tarefa tem até `timeout` segundos (contados a partir do envio); se
+    estourar o prazo ou falhar, o resultado é padroes[nome] (ou `padrao`) e o
+    nome é marcado como degradação (marcar_degradado).
+    """
+    padroes = padroes or {}
+    inicio = time.monotonic()
+    # copy_context: a thread auxiliar herda a rota corrente (rótulo das métricas de consulta)
+    futuros = {nome: _executor.submit(contextvars.copy_context().run, fn) for nome, fn in tarefas.items()}
+    resultados = {}
+    for nome, futuro in futuros.items():
+        try:
+            resultados[nome] = futuro.result(timeout=max(0, timeout - (time.monotonic() - inicio)))
+            continue
+        except FuturoTimeout:
+            motivo = 'fila' if futuro.cancel() else 'prazo'  # cancel() só funciona se a tarefa nem começou
+            logger.warning(f"⏱️ Consulta '{nome}' excedeu {timeout}s ({'ainda na fila' if motivo == 'fila' else 'em execução'})")
+        except Exception as e:
+            motivo = 'erro'
+            logger.error(f"❌ Consulta '{nome}': {e}")
+        tarefas_padrao.inc(rota=rota_atual.get(), tarefa=nome, motivo=motivo)
+        resultados[nome] = padroes.get(nome, padrao)
+        marcar_degradado(nome)
+    return resultados
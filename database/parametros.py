@@ -0,0 +1,16 @@
+# ============================================
+# LISTAS "IN (?, ?, ...)" COM TAMANHO FIXO
+# ============================================
+# Cada quantidade de marcadores é um texto de comando diferente, e o SQL
+# Server compila e guarda um plano para cada um. A lista é completada até o
+# próximo tamanho de TAMANHOS_IN repetindo o último valor (duplicata num IN
+# não muda o resultado), e assim só existem poucos textos, sempre os mesmos.
+
+TAMANHOS_IN = (10, 50, 200, 500, 1000, 2000)  # o SQL Server aceita até 2100 parâmetros por comando
+
+def filtro_in(coluna, valores):
+    """("coluna IN (?, ...)", params) com o número de marcadores arredondado para cima em TAMANHOS_IN."""
+    valores = list(valores)
+    if not valores: raise ValueError('lista IN vazia')
+    n = next((t for t in TAMANHOS_IN if t >= len(valores)), len(valores))
+    return f"{coluna} IN ({', '.join('?' * n)})", valores + valores[-1:] * (n - len(valores))
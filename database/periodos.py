@@ -0,0 +1,38 @@
+from datetime import date, datetime, timedelta
+
+# ============================================
+# PERÍODOS DE EMISSÃO (INTERVALOS SEMIABERTOS)
+# ============================================
+# Todos os filtros de data viram "coluna >= inicio AND coluna < fim", sem
+# funções sobre a coluna, para que o SQL Server consiga usar índice em Dat_Emissao.
+
+def _como_data(d):
+    if isinstance(d, datetime): return d.date()
+    if isinstance(d, date): return d
+    return date.fromisoformat(str(d).strip())
+
+def periodo_mes(ano, mes):
+    """Mês inteiro: [1º dia do mês, 1º dia do mês seguinte)."""
+    inicio = datetime(ano, mes, 1)
+    fim = datetime(ano + 1, 1, 1) if mes == 12 else datetime(ano, mes + 1, 1)
+    return inicio, fim
+
+def periodo_anos(ano_ini, ano_fim=None):
+    """Anos completos de ano_ini até ano_fim (inclusive)."""
+    return datetime(ano_ini, 1, 1), datetime((ano_fim or ano_ini) + 1, 1, 1)
+
+def periodo_ultimos_meses(meses, hoje=None):
+    """Janela móvel de `meses` meses inteiros terminando no mês de `hoje` (inclusive)."""
+    hoje = hoje or date.today()
+    n = hoje.year * 12 + hoje.month - meses
+    return datetime(n // 12, n % 12 + 1, 1), periodo_mes(hoje.year, hoje.month)[1]
+
+def periodo_datas(inicio, fim):
+    """Dias de inicio até fim (inclusive); aceita date, datetime ou 'AAAA-MM-DD'."""
+    d_ini, d_fim = _como_data(inicio), _como_data(fim)
+    return datetime(d_ini.year, d_ini.month, d_ini.day), datetime(d_fim.year, d_fim.month, d_fim.day) + timedelta(days=1)
+
+def filtro_emissao(periodo, coluna='Dat_Emissao'):
+    """Predicado SQL parametrizado para o período: (sql, [inicio, fim])."""
+    inicio, fim = periodo
+    return f"{coluna} >= ? AND {coluna} < ?", [inicio, fim]
@@ -0,0 +1,56 @@
+import os
+from database.cache import TTLCache
+
+# ============================================
+# DADOS DE REFERÊNCIA (vende / clien / enxes)
+# ============================================
+# Cadastros mudam poucas vezes ao dia; cada tabela tem seu próprio TTL (segundos).
+
+TTLS = {
+    'vende': int(os.getenv('REF_TTL_VENDE', 3600)),
+    'clien': int(os.getenv('REF_TTL_CLIEN', 600)),
+    'enxes': int(os.getenv('REF_TTL_ENXES', 600)),
+}
+
+class DadosReferencia:
+    def __init__(self, executar, ttls=None, max_entradas=20_000):
+        self.executar = executar
+        self.ttls = {**TTLS, **(ttls or {})}
+        self.cache = TTLCache(max_entradas=max_entradas)
+
+    def vendedores(self):
+        """Vendedores ativos: [(Codigo, Nome_guerra)] ordenados por nome."""
+        return self.cache.get_or_load(('vende',), lambda: self.executar(
+            "SELECT Codigo, Nome_guerra FROM vende WHERE Bloqueado = 0 ORDER BY Nome_guerra"), self.ttls['vende'])
+
+    def cliente(self, codigo):
+        """Cadastro do cliente: (Codigo, Razao_Social, Limite_Credito, Total_Debito, Bloqueado) ou None."""
+        res = self.cache.get_or_load(('clien', int(codigo)), lambda: self.executar(
+            "SELECT Codigo, Razao_Social, ISNULL(Limite_Credito, 0), ISNULL(Total_Debito, 0), Bloqueado FROM clien WHERE Codigo = ?", [int(codigo)]),
+            self.ttls['clien'])
+        return res[0] if res else None
+
+    def clientes_ativos(self):
+        """Cadastro resumido de todos os clientes desbloqueados: [(Codigo, Razao_Social)] (base do índice de busca)."""
+        return self.cache.get_or_load(('clien', 'ativos'), lambda: self.executar(
+            "SELECT Codigo, Razao_Social FROM clien WHERE Bloqueado = 0"), self.ttls['clien'])
+
+    def carteira(self, cod_vendedor):
+        """Códigos dos clientes atribuídos ao vendedor no enxes (estabelecimento 0)."""
+        return self.cache.get_or_load(('enxes', int(cod_vendedor)), lambda: tuple(r[0] for r in self.executar(
+            "SELECT DISTINCT Cod_Client FROM enxes WHERE Cod_Vendedor = ? AND Cod_Estabe = 0", [int(cod_vendedor)])),
+            self.ttls['enxes'])
+
+    def carregar_carteiras(self):
+        """Preenche o cache de carteira() de todos os vendedores com uma só consulta ao enxes; devolve quantos vendedores."""
+        carteiras = {}
+        for cod_v, cod_c in self.executar("SELECT DISTINCT Cod_Vendedor, Cod_Client FROM enxes WHERE Cod_Estabe = 0 ORDER BY Cod_Vendedor, Cod_Client"):
+            carteiras.setdefault(int(cod_v), []).append(cod_c)
+        for cod_v, clientes in carteiras.items(): self.cache.set(('enxes', cod_v), tuple(clientes), self.ttls['enxes'])
+        return len(carteiras)
+
+    def invalidar(self, tabela=None):
+        self.cache.invalidate(tabela)
+
+    def stats(self):
+        return self.cache.stats()
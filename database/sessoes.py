@@ -0,0 +1,124 @@
+import os
+import re
+import hashlib
+import time
+import secrets
+import logging
+import threading
+from flask.sessions import SessionInterface, SessionMixin, SecureCookieSessionInterface
+from werkzeug.datastructures import CallbackDict
+
+logger = logging.getLogger(__name__)
+
+# ============================================
+# SESSÕES (COOKIE ASSINADO OU CHAVE-VALOR)
+# ============================================
+# A sessão só guarda `user`. Por padrão ela vai inteira num cookie assinado
+# com a SECRET_KEY (que vem do ambiente, nunca do código), então
+# login_required não toca o disco. Com "memoria" ou "sqlite", o cookie leva só
+# um id aleatório e os dados ficam num TTLCache/SQLiteCache, com expiração e
+# limpeza em segundo plano; o id é trocado a cada login (session.clear()).
+#
+# Migração: um cookie antigo do Flask-Session (id uuid4 de um arquivo em
+# flask_session/) é lido uma única vez, copiado para o backend novo e o
+# arquivo é apagado. O usuário continua logado sem digitar a senha.
+
+_SID_LEGADO = re.compile(r'^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}$')
+
+class LegadoFilesystem:
+    """Leitor das sessões gravadas pelo Flask-Session (SESSION_TYPE='filesystem')."""
+
+    def __init__(self, pasta):
+        self.pasta = pasta
+
+    def migrar(self, valor_cookie):
+        """Dados da sessão antiga (removendo o arquivo), ou None."""
+        if not valor_cookie or not _SID_LEGADO.match(valor_cookie) or not os.path.isdir(self.pasta): return None
+        dados, chave = None, 'session:' + valor_cookie
+        try:
+            from cachelib import FileSystemCache  # vem com o Flask-Session; só necessário na migração
+            # Nomes de arquivo em md5 (cachelib antigo, o que está em produção) ou sha256 (atual)
+            for hash_method in (hashlib.md5, hashlib.sha256):
+                cache = FileSystemCache(self.pasta, hash_method=hash_method)
+                dados = cache.get(chave)
+                if dados is not None:
+                    cache.delete(chave)
+                    break
+        except Exception as e:
+            logger.warning(f"⚠️ Sessão legada ilegível: {e}")
+            return None
+        return {k: v for k, v in (dados or {}).items() if not k.startswith('_')} or None
+
+class SessaoCookie(SecureCookieSessionInterface):
+    """Cookie assinado do Flask, com migração das sessões em arquivo."""
+
+    def __init__(self, legado=None):
+        self.legado = legado
+
+    def open_session(self, app, request):
+        s = super().open_session(app, request)
+        if s is not None and not s and self.legado:
+            dados = self.legado.migrar(request.cookies.get(self.get_cookie_name(app)))
+            if dados: s.update(dados); s.permanent = True
+        return s
+
+class SessaoKV(CallbackDict, SessionMixin):
+    def __init__(self, inicial=None, sid=None, nova=False):
+        def marcar(self): self.modified = True
+        super().__init__(inicial, marcar)
+        self.sid, self.new, self.modified = sid, nova, False
+        self.trocar_sid = False
+
+    def clear(self):
+        super().clear()
+        self.trocar_sid = True  # login/logout: o id antigo (talvez plantado por terceiros) não é reaproveitado
+
+class SessaoKVInterface(SessionInterface):
+    """Sessão no servidor: o cookie tem só o id; os dados ficam em `backend` (get/set/delete/limpar_expirados)."""
+
+    def __init__(self, backend, legado=None, limpeza_s=300):
+        self.backend = backend
+        self.legado = legado
+        if limpeza_s: threading.Thread(target=self._limpar, args=(limpeza_s,), name='sessoes', daemon=True).start()
+
+    def _limpar(self, intervalo):
+        while True:
+            time.sleep(intervalo)
+            try: self.backend.limpar_expirados()
+            except Exception as e: logger.error(f"❌ Limpeza de sessões: {e}")
+
+    def open_session(self, app, request):
+        valor = request.cookies.get(self.get_cookie_name(app))
+        if valor:
+            dados = self.backend.get(('sessao', valor))
+            if dados is not None: return SessaoKV(dados, sid=valor)
+            if self.legado:
+                dados = self.legado.migrar(valor)
+                if dados:
+                    s = SessaoKV(dados, sid=secrets.token_urlsafe(32), nova=True)
+                    s.permanent, s.modified = True, True
+                    return s
+        return SessaoKV(sid=secrets.token_urlsafe(32), nova=True)
+
+    def save_session(self, app, session, response):
+        nome, dominio, caminho = self.get_cookie_name(app), self.get_cookie_domain(app), self.get_cookie_path(app)
+        if not session:
+            if session.modified:  # logout
+                self.backend.delete(('sessao', session.sid))
+                response.delete_cookie(nome, domain=dominio, path=caminho)
+            return
+        if not session.modified: return
+        if session.trocar_sid:
+            self.backend.delete(('sessao', session.sid))
+            session.sid = secrets.token_urlsafe(32)
+        self.backend.set(('sessao', session.sid), dict(session), ttl=int(app.permanent_session_lifetime.total_seconds()))
+        response.set_cookie(nome, session.sid, expires=self.get_expiration_time(app, session), httponly=self.get_cookie_httponly(app),
+                            domain=dominio, path=caminho, secure=self.get_cookie_secure(app), samesite=self.get_cookie_samesite(app))
+
+def interface_sessao(tipo, pasta_legado=None, sqlite_path=None):
+    """cookie (padrão) | memoria (um processo só) | sqlite (compartilhado entre workers da máquina)."""
+    from database.cache import TTLCache, SQLiteCache
+    legado = LegadoFilesystem(pasta_legado) if pasta_legado else None
+    if tipo == 'memoria': return SessaoKVInterface(TTLCache(max_entradas=100_000), legado)
+    if tipo == 'sqlite': return SessaoKVInterface(SQLiteCache(sqlite_path, max_entradas=100_000), legado)
+    return SessaoCookie(legado)
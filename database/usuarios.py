@@ -0,0 +1,104 @@
+import os
+import hmac
+import json
+import time
+import tempfile
+import threading
+from contextlib import contextmanager
+
+# ============================================
+# DIRETÓRIO DE USUÁRIOS (users.json)
+# ============================================
+# O arquivo fica em memória, indexado pelo login, e só é relido quando o
+# mtime/tamanho muda (conferido no máximo a cada `verificar_s` segundos).
+# Gravações: trava de arquivo entre processos (users.json.lock), releitura do
+# disco, alteração, arquivo temporário + os.replace (atômico no Windows e no
+# Linux). Assim dois workers editando ao mesmo tempo não perdem alterações nem
+# deixam o JSON truncado.
+
+USUARIO_INICIAL = {"admin": {"nome": "Administrador", "senha": "admin123456"}}
+
+@contextmanager
+def trava_arquivo(path, tentativas=100, espera=0.1):
+    """Trava exclusiva entre processos (msvcrt no Windows, fcntl no resto)."""
+    f = open(path, 'a+b')
+    try:
+        if os.name == 'nt':
+            import msvcrt
+            for _ in range(tentativas):
+                try:
+                    f.seek(0); msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+                    break
+                except OSError:
+                    time.sleep(espera)
+            else:
+                raise TimeoutError(f"trava ocupada: {path}")
+            try: yield
+            finally: f.seek(0); msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+        else:
+            import fcntl
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            try: yield
+            finally: fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+    finally:
+        f.close()
+
+class DiretorioUsuarios:
+    def __init__(self, path, verificar_s=2.0):
+        self.path = path
+        self.verificar_s = verificar_s
+        self._lock = threading.Lock()
+        self._assinatura = None
+        self._verificado_em = float('-inf')
+        self._usuarios = {}
+
+    def _assinatura_atual(self):
+        try:
+            st = os.stat(self.path)
+            return (st.st_mtime_ns, st.st_size)
+        except OSError:
+            return None
+
+    def _ler_disco(self):
+        with open(self.path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def todos(self):
+        """Mapa login -> {'nome', 'senha'} (não alterar; use atualizar())."""
+        if time.monotonic() - self._verificado_em < self.verificar_s: return self._usuarios
+        with self._lock:
+            ass = self._assinatura_atual()
+            if ass is None:
+                self._gravar(lambda u: None)
+                ass = self._assinatura_atual()
+            if ass != self._assinatura:
+                self._usuarios, self._assinatura = self._ler_disco(), ass
+            self._verificado_em = time.monotonic()
+            return self._usuarios
+
+    def autenticar(self, login, senha):
+        usuario = self.todos().get(login)
+        return usuario is not None and hmac.compare_digest(str(usuario.get('senha', '')).encode(), str(senha).encode())
+
+    def atualizar(self, alterar):
+        """Aplica alterar(dict) sobre o conteúdo atual do disco e grava; devolve o retorno de `alterar`."""
+        with self._lock:
+            return self._gravar(alterar)
+
+    def _gravar(self, alterar):
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        with trava_arquivo(self.path + '.lock'):
+            usuarios = self._ler_disco() if os.path.exists(self.path) else json.loads(json.dumps(USUARIO_INICIAL))
+            resultado = alterar(usuarios)
+            fd, tmp = tempfile.mkstemp(dir=os.path.dirname(self.path) or '.', prefix='.users.', suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                    json.dump(usuarios, f, indent=4)
+                    f.flush(); os.fsync(f.fileno())
+                os.replace(tmp, self.path)
+            except BaseException:
+                try: os.remove(tmp)
+                except OSError: pass
+                raise
+            self._usuarios, self._assinatura, self._verificado_em = usuarios, self._assinatura_atual(), time.monotonic()
+        return resultado
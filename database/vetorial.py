@@ -0,0 +1,37 @@
+import numpy as np
+from datetime import datetime
+
+# ============================================
+# OPERAÇÕES COLUNARES SOBRE A CARTEIRA
+# ============================================
+# Junções por código de cliente via busca binária em arrays ordenados, no
+# lugar de dict.get() linha a linha.
+
+def indexar(mapa):
+    """dict codigo -> valor em (chaves ordenadas int64, valores float64)."""
+    chaves = np.fromiter(mapa.keys(), dtype=np.int64, count=len(mapa))
+    valores = np.fromiter(mapa.values(), dtype=np.float64, count=len(mapa))
+    ordem = np.argsort(chaves, kind='stable')
+    return chaves[ordem], valores[ordem]
+
+def juntar(codigos, chaves, valores, padrao=0.0):
+    """Valor de cada código (na ordem de `codigos`), `padrao` quando ausente."""
+    codigos = np.asarray(codigos, dtype=np.int64)
+    if not len(chaves): return np.full(len(codigos), padrao, dtype=np.float64)
+    pos = np.minimum(np.searchsorted(chaves, codigos), len(chaves) - 1)
+    return np.where(chaves[pos] == codigos, valores[pos], padrao)
+
+def coluna(linhas, i=0, dtype=np.int64):
+    """Extrai a coluna i de um iterável de linhas direto para um array."""
+    return np.fromiter((r[i] for r in linhas), dtype=dtype)
+
+def percentual(parte, base):
+    """parte/base*100, 0 onde base <= 0."""
+    parte, base = np.asarray(parte, dtype=np.float64), np.asarray(base, dtype=np.float64)
+    return np.divide(parte * 100, base, out=np.zeros_like(parte), where=base > 0)
+
+def dias_em_atraso(vencimentos, hoje):
+    """Dias de atraso por vencimento (None/futuro -> 0)."""
+    venc = np.array([(v.date() if isinstance(v, datetime) else v) if v else None for v in vencimentos], dtype='datetime64[D]')
+    dias = (np.datetime64(hoje, 'D') - venc).astype(np.int64)
+    return np.where(np.isnat(venc) | (dias < 0), 0, dias)
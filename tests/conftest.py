@@ -0,0 +1,30 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('AQUECIMENTO', '0')  # sem agendador consultando o pool durante os testes
+os.environ.setdefault('SECRET_KEY', 'chave-so-para-testes')
+
+from erp_falso import PoolGravador
+
+@pytest.fixture
+def cliente(monkeypatch):
+    """Test client logado, com o pool trocado por um gravador das consultas executadas."""
+    pytest.importorskip('flask')
+    pytest.importorskip('pyodbc', exc_type=ImportError)  # app.py carrega o driver ODBC ao importar
+    from flask.sessions import SecureCookieSessionInterface
+    from database.cache import TTLCache
+    import app as bi
+    gravador = PoolGravador()
+    monkeypatch.setattr(bi, 'pool', gravador)
+    monkeypatch.setattr(bi.app, 'session_interface', SecureCookieSessionInterface())
+    bi.ref.invalidar(); bi._kpis.invalidate()
+    monkeypatch.setattr(bi, 'indice_clientes', type(bi.indice_clientes)())
+    monkeypatch.setattr(bi.historico, 'cache', TTLCache(max_entradas=10_000))
+    if bi.respostas is not None: bi.respostas.invalidate()
+    monkeypatch.setitem(bi._marca, 'lida_em', float('-inf'))
+    c = bi.app.test_client()
+    with c.session_transaction() as s: s['user'] = 'admin'
+    return c, gravador
@@ -0,0 +1,49 @@
+from contextlib import contextmanager
+
+# ============================================
+# ERP FALSO DOS TESTES DE ROTA
+# ============================================
+# Pool que grava cada consulta (sql, params) e devolve linhas mínimas no
+# formato que cada rota espera. Consultas que contêm um trecho de `falhas`
+# levantam erro, para simular timeout/queda de uma consulta específica.
+
+VENDEDOR, CLIENTE, BUSCA = 987654, 876543, 'zqxwv'
+
+def linhas(sql):
+    """Linhas mínimas no formato que cada rota espera."""
+    if sql.startswith('SELECT (SELECT MAX(Num_Nota)'): return [(1, None, 0, 0)]  # marca d'água do cache de respostas
+    if sql.startswith('SELECT Codigo, Razao_Social FROM clien'): return [(CLIENTE, f'DROGARIA {BUSCA.upper()} SÃO JOÃO')]  # base do índice de busca
+    if 'FROM vende' in sql: return [(VENDEDOR, 'VENDEDOR TESTE')]
+    if sql.startswith('SELECT DISTINCT Cod_Vendedor, Cod_Client'): return [(VENDEDOR, CLIENTE)]  # todas as carteiras (pré-aquecimento)
+    if sql.startswith('SELECT COUNT(*), ISNULL(SUM(ISNULL(cl.Limite'): return [(0, 0, 0, 0, 0)]
+    if 'FROM clien WHERE Codigo' in sql: return [(CLIENTE, 'CLIENTE TESTE', 0, 0, 0)]
+    if sql.startswith(('SELECT ISNULL(SUM', 'SELECT COUNT(DISTINCT')): return [(0,)]
+    if 'cl.Codigo' in sql or 'FROM CTREC' in sql or 'GROUP BY' in sql: return []
+    return [(0,)]
+
+class _Cursor:
+    def __init__(self, pool): self.pool, self.res = pool, []
+    def execute(self, sql, params=None):
+        self.pool.log.append((sql, list(params or [])))
+        if any(f in sql for f in self.pool.falhas): raise RuntimeError('timeout')
+        self.res = linhas(sql)
+    def fetchall(self):
+        res, self.res = self.res, []
+        return res
+    def fetchmany(self, n):
+        res, self.res = self.res[:n], self.res[n:]
+        return res
+    def close(self): pass
+
+class _Conexao:
+    timeout = 0
+    def __init__(self, pool): self.pool = pool
+    def cursor(self): return _Cursor(self.pool)
+
+class PoolGravador:
+    def __init__(self):
+        self.log = []     # [(sql, params)] na ordem de execução
+        self.falhas = []  # trechos de SQL que devem falhar
+    @contextmanager
+    def connection(self): yield _Conexao(self)
+    def status(self): return dict.fromkeys(('tamanho', 'em_uso', 'ociosas', 'max', 'criadas', 'reusadas', 'descartadas', 'esperas'), 0)
@@ -0,0 +1,42 @@
+from datetime import date, datetime, timedelta
+
+from database.agregados import AgregadosVendas
+
+class _ERP:
+    """Executor falso: guarda o início pedido na carga de NFSCB; sem vendas."""
+    def __init__(self): self.inicios = []
+    def __call__(self, sql, params=None):
+        if sql.startswith('SELECT MAX(Num_Nota)'): return [(100, datetime.combine(date.today(), datetime.min.time()))]
+        if 'GROUP BY CAST(Dat_Emissao' in sql: self.inicios.append(params[0])
+        return []
+
+def test_so_um_processo_atualiza(tmp_path):
+    path = str(tmp_path / 'agregados.sqlite3')
+    a, b = AgregadosVendas(path, _ERP()), AgregadosVendas(path, _ERP(), arrendamento_s=60)
+    assert a.arrendar() and not b.arrendar() and a.arrendar()  # o líder renova; o outro worker só lê
+    a.arrendamento.duracao_s = -1
+    assert a.arrendar() and b.arrendar() and not a.arrendar()  # arrendamento vencido: outro assume
+
+def test_ressincroniza_o_mes_fechado(tmp_path):
+    erp = _ERP()
+    agg = AgregadosVendas(str(tmp_path / 'agregados.sqlite3'), erp, retroativo_dias=3)
+    assert agg.atualizar()
+    assert agg.atualizar(forcar=True)
+    hoje = date.today()
+    assert erp.inicios[-1].date() == hoje - timedelta(days=3)  # incremental: só a janela retroativa
+    with agg._conectar() as conn: conn.execute("UPDATE controle SET valor = '2000-01-01T00:00:00' WHERE chave = 'ressinc_em'")
+    assert agg.atualizar()  # mesma marca d'água, mas a ressincronização venceu
+    ano, mes = divmod(hoje.year * 12 + hoje.month - 2, 12)
+    assert erp.inicios[-1].date() == min(date(ano, mes + 1, 1), hoje - timedelta(days=3))
+
+def test_janela_e_disponibilidade_sem_abrir_o_sqlite(tmp_path, monkeypatch):
+    agg = AgregadosVendas(str(tmp_path / 'agregados.sqlite3'), _ERP(), meses=48)
+    assert not agg.disponivel() and not agg.cobre((datetime(2026, 1, 1), datetime(2026, 2, 1)))
+    assert agg.atualizar()
+    hoje = date.today()
+    ano, mes = divmod(hoje.year * 12 + hoje.month - 1 - 48, 12)
+    inicio = date(ano, mes + 1, 1)
+    monkeypatch.setattr(agg, '_conectar', None)  # daqui em diante nada de SQLite
+    assert agg.disponivel() and agg.inicio() == inicio
+    assert agg.cobre((datetime.combine(inicio, datetime.min.time()), datetime.now()))
+    assert not agg.cobre((datetime.combine(inicio - timedelta(days=1), datetime.min.time()), datetime.now()))  # antes da janela: ERP
@@ -0,0 +1,67 @@
+import threading
+import time
+from datetime import datetime, time as hora
+
+from erp_falso import VENDEDOR, CLIENTE
+from database.aquecimento import Aquecimento, ler_horarios, proximo_horario
+from database.cache import TTLCache
+
+def test_faltas_simultaneas_carregam_uma_vez():
+    cache, chamadas = TTLCache(), []
+    def carregar():
+        chamadas.append(1); time.sleep(0.05)
+        return ['vendedores']
+    res = []
+    threads = [threading.Thread(target=lambda: res.append(cache.get_or_load(('vende',), carregar))) for _ in range(8)]
+    for t in threads: t.start()
+    for t in threads: t.join()
+    assert len(chamadas) == 1 and res == [['vendedores']] * 8 and cache.stats()['compartilhadas'] == 7
+
+def test_horarios_e_proxima_execucao():
+    horarios = ler_horarios('12:50, 07:50, 25:99')
+    assert horarios == [hora(7, 50), hora(12, 50)]
+    assert proximo_horario(horarios, datetime(2026, 3, 2, 8, 0)) == datetime(2026, 3, 2, 12, 50)
+    assert proximo_horario(horarios, datetime(2026, 3, 2, 13, 0)) == datetime(2026, 3, 3, 7, 50)
+    assert proximo_horario([], datetime(2026, 3, 2)) is None
+
+def test_status_registra_tempos_e_falhas():
+    def falha(): raise RuntimeError('ERP fora')
+    aq = Aquecimento([('ok', lambda: 3), ('falha', falha)])
+    assert aq.rodar()
+    st = aq.status()
+    assert st['execucoes'] == 1 and st['concluidas'] == st['total'] == 2 and not st['rodando']
+    assert st['tarefas']['ok']['itens'] == 3 and st['tarefas']['ok']['ok'] and st['tarefas']['falha']['erro'] == 'ERP fora'
+
+def test_tarefas_pesadas_so_no_worker_com_arrendamento(tmp_path):
+    from database.arrendamento import Arrendamento
+    path, feitas = str(tmp_path / 'aquecimento.sqlite3'), []
+    tarefas = [('local', lambda: feitas.append('local')), ('erp', lambda: feitas.append('erp'))]
+    a = Aquecimento(tarefas, arrendamento=Arrendamento(path, 'aquecimento', 60), so_lider=('erp',))
+    b = Aquecimento(tarefas, arrendamento=Arrendamento(path, 'aquecimento', 60), so_lider=('erp',))
+    assert a.rodar() and b.rodar()
+    assert feitas == ['local', 'erp', 'local']  # o segundo worker não foi ao ERP
+    st = b.status()['tarefas']
+    assert st['erp']['ok'] and st['erp']['pulada'] and st['local']['pulada'] is None
+
+def test_aquecimento_preenche_os_caches(cliente):
+    import app as bi
+    c, gravador = cliente
+    assert bi.aquecimento.rodar()
+    st = c.get('/api/aquecimento').get_json()
+    assert all(t['ok'] for t in st['tarefas'].values()) and st['tarefas']['carteiras']['itens'] == 1
+    n = len(gravador.log)
+    assert bi.ref.carteira(VENDEDOR) == (CLIENTE,) and bi.ref.vendedores()
+    c.get('/api/widgets/empresa'); c.get('/api/widgets/ranking')
+    assert [sql for sql, _ in gravador.log[n:] if 'NFSCB' in sql and 'MAX(Num_Nota)' not in sql] == []  # KPIs já estavam quentes
+
+def test_kpi_com_falha_nao_fica_em_cache(cliente):
+    """Meta que falhou (padrão 1) não pode ficar no cache de KPIs; o aquecimento reporta a tarefa como falha."""
+    import app as bi
+    c, gravador = cliente
+    gravador.falhas.append('VEOBJ')
+    assert bi.aquecimento.rodar()
+    kpis = bi.aquecimento.status()['tarefas']['kpis']
+    assert not kpis['ok'] and 'empresa_meta' in kpis['erro']
+    assert bi._kpis.stats()['entradas'] == 0
+    gravador.falhas.clear()
+    assert bi.aquecimento.rodar() and bi.aquecimento.status()['tarefas']['kpis']['ok'] and bi._kpis.stats()['entradas'] == 2
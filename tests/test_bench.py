@@ -0,0 +1,146 @@
+import pytest
+
+pytest.importorskip('flask')
+pytest.importorskip('pyodbc', exc_type=ImportError)  # app.py carrega o driver ODBC ao importar
+
+from bench.erp_sintetico import traduzir
+from bench.rodar import medir_escala
+
+def test_traducao_tsql():
+    sql, top = traduzir("SELECT TOP (?) ISNULL(x, 0) FROM NFSCB WITH (NOLOCK) WHERE YEAR(Dat_Emissao) = ? ORDER BY 1")
+    assert top and sql.endswith(' LIMIT ?') and 'NOLOCK' not in sql and 'IFNULL(' in sql and "strftime('%Y', Dat_Emissao)" in sql
+
+def test_cenarios_rodam_no_erp_sintetico(tmp_path, monkeypatch):
+    """Executa o SQL real de todas as páginas contra o SQLite sintético (escala mínima)."""
+    import app as bi
+    for nome in ('pool', 'objetivos', 'agregados', 'historico'): monkeypatch.setattr(bi, nome, getattr(bi, nome))
+    monkeypatch.setattr(bi.app, 'session_interface', bi.app.session_interface)
+    res = medir_escala(300, iteracoes=1, aquecimento=0, dados_dir=str(tmp_path))
+    assert set(res['cenarios']) == {'dashboard', 'dashboard_vendedor', 'dashboard_busca', 'analise_cliente', 'ranking', 'mapa_vendas'}
+    assert all(c['consultas'] > 0 for c in res['cenarios'].values())
+
+def test_rollup_regional_confere_com_agrupamento_simples(tmp_path, monkeypatch):
+    """A consulta única do /mapa (GROUPING SETS) e os agregados locais batem com as somas feitas à mão."""
+    import sqlite3
+    from datetime import date
+    import app as bi
+    from bench.erp_sintetico import gerar, PoolSQLite
+    from database.agregados import AgregadosVendas
+    from database.periodos import periodo_datas
+    path = str(tmp_path / 'erp.sqlite3')
+    gerar(path, 2000)
+    monkeypatch.setattr(bi, 'pool', PoolSQLite(path))
+    monkeypatch.setattr(bi, 'agregados', None)
+    periodo = periodo_datas('2000-01-01', date.today().isoformat())
+    conn = sqlite3.connect(path)
+    vendedor = conn.execute("SELECT Cod_Vendedor FROM NFSCB GROUP BY 1 ORDER BY COUNT(*) DESC LIMIT 1").fetchone()[0]
+    filtro = "Cod_Estabe = 0 AND Status = 'F' AND Cod_Vendedor = ?"
+    total, ml = conn.execute(f"SELECT SUM(Vlr_TotalNota), SUM(CASE WHEN Cod_OrigemNfs = 'ML' THEN Vlr_TotalNota END) FROM NFSCB WHERE {filtro}", [vendedor]).fetchone()
+    clientes = conn.execute(f"SELECT COUNT(DISTINCT Cod_Cliente) FROM NFSCB WHERE {filtro}", [vendedor]).fetchone()[0]
+    top = conn.execute(f"""SELECT IFNULL(Cidade, 'NAO INF.') || '-' || Bairro, SUM(Vlr_TotalNota) FROM NFSCB WHERE {filtro} AND Cod_OrigemNfs = 'ML'
+                           GROUP BY 1 ORDER BY 2 DESC LIMIT 10""", [vendedor]).fetchall()
+
+    res = bi.widget_regional(vendedor, periodo)
+    st = res['stats']
+    assert st['total_vlr'] == pytest.approx(total) and st['movel_vlr'] == pytest.approx(ml) and st['clientes_atendidos'] == clientes
+    assert sum(o['qtd'] for o in st['operadores']) == st['total_qtd']
+    assert sum(b['total'] for r in res['regioes'] for b in r['bairros']) == pytest.approx(total)
+    assert [(c['label'], round(c['valor'], 2)) for c in res['chart_ml']] == [(l, round(v, 2)) for l, v in top]
+
+    agregados = AgregadosVendas(str(tmp_path / 'agregados.sqlite3'), bi.run_query, meses=12 * (date.today().year - 1999))
+    assert agregados.atualizar(forcar=True) and agregados.cobre(periodo)
+    monkeypatch.setattr(bi, 'agregados', agregados)
+    local = bi.widget_regional(vendedor, periodo)
+    assert {k: v for k, v in local['stats'].items() if k != 'operadores'} == pytest.approx({k: v for k, v in st.items() if k != 'operadores'})
+    assert local['stats']['operadores'] == st['operadores']
+    assert [(r['cidade'], [b['bairro'] for b in r['bairros']]) for r in local['regioes']] == [(r['cidade'], [b['bairro'] for b in r['bairros']]) for r in res['regioes']]
+    assert [c['label'] for c in local['chart_ml']] == [c['label'] for c in res['chart_ml']]
+
+def test_ranking_confere_com_o_card_do_vendedor(tmp_path, monkeypatch):
+    """Cada linha do ranking (consultas agrupadas) bate com o widget de um vendedor só."""
+    import app as bi
+    from bench.erp_sintetico import gerar, PoolSQLite
+    path = str(tmp_path / 'erp.sqlite3')
+    gerar(path, 3000)
+    monkeypatch.setattr(bi, 'pool', PoolSQLite(path))
+    monkeypatch.setattr(bi, 'agregados', None)
+    bi.ref.invalidar(); bi._kpis.invalidate()
+    ranking = bi.widget_ranking('realizado')
+    assert [l['realizado'] for l in ranking] == sorted((l['realizado'] for l in ranking), reverse=True)
+    for linha in ranking[:3]:
+        card = bi.widget_vendedor(linha['codigo'])
+        assert linha['realizado'] == pytest.approx(card['sel']['realizado']) and linha['atendidos'] == card['stats']['atendidos']
+        assert linha['total_carteira'] == card['stats']['total_carteira'] and linha['meta'] == pytest.approx(card['sel']['meta'])
+    bi.ref.invalidar(); bi._kpis.invalidate()
+
+def test_exportacoes_no_erp_sintetico(tmp_path, monkeypatch):
+    """Exportações completas batem com a contagem no banco (carteira, títulos do vendedor, regional)."""
+    import sqlite3
+    import app as bi
+    from bench.erp_sintetico import gerar, PoolSQLite
+    path = str(tmp_path / 'erp.sqlite3')
+    gerar(path, 3000)
+    monkeypatch.setattr(bi, 'pool', PoolSQLite(path))
+    monkeypatch.setattr(bi, 'agregados', None)
+    conn = sqlite3.connect(path)
+    vendedor = conn.execute("SELECT Cod_Vendedor FROM enxes GROUP BY 1 ORDER BY COUNT(*) DESC LIMIT 1").fetchone()[0]
+    c = bi.app.test_client()
+    with c.session_transaction() as s: s['user'] = 'admin'
+    def linhas(url): return c.get(url).data.decode('utf-8-sig').strip().split('\r\n')[1:]
+    carteira = conn.execute("""SELECT COUNT(*) FROM clien cl WHERE cl.Bloqueado = 0 AND EXISTS
+        (SELECT 1 FROM enxes en WHERE en.Cod_Client = cl.Codigo AND en.Cod_Estabe = 0 AND en.Cod_Vendedor = ?)""", [vendedor]).fetchone()[0]
+    assert len(linhas(f'/exportar/carteira.csv?tipo=vendedor&valor={vendedor}')) == carteira
+    titulos = conn.execute("""SELECT COUNT(*) FROM CTREC t WHERE t.Vlr_Saldo > 0 AND EXISTS
+        (SELECT 1 FROM enxes en WHERE en.Cod_Client = t.Cod_Cliente AND en.Cod_Estabe = 0 AND en.Cod_Vendedor = ?)""", [vendedor]).fetchone()[0]
+    assert len(linhas(f'/exportar/titulos.csv?vendedor={vendedor}')) == titulos
+    regional = linhas(f'/exportar/regional.csv?vendedor={vendedor}&inicio=2000-01-01&fim=2100-01-01')
+    notas = conn.execute("SELECT COUNT(*) FROM NFSCB WHERE Cod_Estabe = 0 AND Status = 'F' AND Cod_Vendedor = ?", [vendedor]).fetchone()[0]
+    assert sum(int(l.split(';')[4]) for l in regional) == notas
+    assert c.get(f'/exportar/titulos.xlsx?vendedor={vendedor}').data[:2] == b'PK'
+
+def test_dias_em_atraso_confere_com_consulta_por_cliente(tmp_path, monkeypatch):
+    """A coluna de atraso da consulta da carteira (CTREC agrupado) bate com o antigo MIN(Dat_Vencimento) cliente a cliente."""
+    from datetime import datetime
+    import app as bi
+    from bench.erp_sintetico import gerar, PoolSQLite
+    path = str(tmp_path / 'erp.sqlite3')
+    gerar(path, 2000)
+    monkeypatch.setattr(bi, 'pool', PoolSQLite(path))
+    monkeypatch.setattr(bi, 'agregados', None)
+    hoje, periodo = bi._periodo_atual()
+    linhas, ha_mais = bi.pagina_carteira(None, None, periodo, limite=100_000)
+    carteira = bi.tabela_carteira(linhas, hoje)
+    assert carteira and not ha_mais
+
+    def atraso_antigo(codigo):  # laço removido do /dashboard: uma ida ao CTREC por cliente
+        res_at = bi.execute_query("SELECT MIN(Dat_Vencimento) FROM CTREC WHERE Cod_Cliente = ? AND Vlr_Saldo > 0 AND Status IN ('A', 'P')", [codigo])
+        if res_at and res_at[0][0]:
+            venc = res_at[0][0].date() if isinstance(res_at[0][0], datetime) else res_at[0][0]
+            if venc < hoje: return (hoje - venc).days
+        return 0
+    esperado = {c['codigo']: atraso_antigo(c['codigo']) for c in carteira}
+    assert {c['codigo']: c['atraso'] for c in carteira} == esperado
+    assert any(esperado.values()) and not all(esperado.values())  # há clientes com e sem títulos vencidos
+    assert bi.totais_carteira(None, None, periodo, hoje)['atraso'] == sum(1 for d in esperado.values() if d)
+
+def test_paginacao_por_nome_atravessa_nomes_nulos(tmp_path, monkeypatch):
+    """Clientes sem razão social não interrompem a paginação por nome (keyset)."""
+    import sqlite3
+    import app as bi
+    from bench.erp_sintetico import gerar, PoolSQLite
+    path = str(tmp_path / 'erp.sqlite3')
+    gerar(path, 1000)
+    conn = sqlite3.connect(path)
+    with conn: conn.execute("UPDATE clien SET Razao_Social = NULL WHERE Codigo % 3 = 0")
+    esperado = [r[0] for r in conn.execute("""SELECT Codigo FROM clien cl WHERE Bloqueado = 0 AND EXISTS
+        (SELECT 1 FROM enxes en WHERE en.Cod_Client = cl.Codigo AND en.Cod_Estabe = 0) ORDER BY IFNULL(Razao_Social, ''), Codigo""")]
+    monkeypatch.setattr(bi, 'pool', PoolSQLite(path))
+    monkeypatch.setattr(bi, 'agregados', None)
+    c = bi.app.test_client()
+    with c.session_transaction() as s: s['user'] = 'admin'
+    vistos, apos = [], ''
+    while True:
+        pagina = c.get(f'/api/clientes?ordem=nome&limite=5&apos={apos}').get_json()
+        vistos += [i['codigo'] for i in pagina['itens']]
+        if not (apos := pagina['proximo']): break
+    assert vistos == esperado and sum(1 for cod in esperado if cod % 3 == 0) > 7
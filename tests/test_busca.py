@@ -0,0 +1,37 @@
+from database.busca import IndiceClientes, dobrar
+
+CADASTRO = [(101, 'FARMÁCIA SÃO JOÃO'), (202, 'Drogaria Popular'), (303, 'DROGA VIDA JOÃO PESSOA'), (1010, 'BOTICA CENTRAL')]
+
+def _indice(linhas=CADASTRO):
+    i = IndiceClientes(); i.sincronizar(linhas); return i
+
+def test_dobrar_remove_acentos_e_caixa():
+    assert dobrar('  Farmácia São-João ') == 'farmacia sao joao'
+
+def test_prefixo_trigrama_e_codigo():
+    i = _indice()
+    assert i.codigos('joao') == {101, 303}            # sem acento casa com acento
+    assert i.codigos('SAO JOÃO') == {101}             # todos os termos
+    assert i.codigos('dr') == {202, 303}              # prefixo curto
+    assert i.codigos('pular') == {202}                # trecho no meio da palavra, como o LIKE '%x%'
+    assert i.codigos('101') == {101, 1010} and i.codigos('xyz') == set()
+
+def test_ranking_codigo_exato_e_inicio_do_nome():
+    i = _indice()
+    assert i.buscar('101')[0] == (101, 'FARMÁCIA SÃO JOÃO')
+    assert [c for c, _ in i.buscar('drog')] == [202, 303]  # ambos começam com o termo: o nome mais curto vem antes
+    assert [c for c, _ in i.buscar('jo')] == [101, 303]    # início de palavra, depois nome mais curto
+
+def test_sincronizar_so_reindexa_o_que_mudou():
+    i = _indice()
+    novo = [(101, 'FARMÁCIA SÃO JOÃO'), (202, 'Drogaria Bem Estar'), (1010, 'BOTICA CENTRAL'), (404, 'Farma Nova')]
+    assert i.sincronizar(novo) == 3                   # 303 removido, 202 renomeado, 404 novo
+    assert i.codigos('popular') == set() and i.codigos('estar') == {202} and i.codigos('nova') == {404} and i.codigos('pessoa') == set()
+    assert i.sincronizar(novo) == 0 and len(i) == 4
+
+def test_endpoint_busca(cliente):
+    from erp_falso import CLIENTE, BUSCA
+    c, gravador = cliente
+    assert c.get('/api/clientes/busca?q=sao joao').get_json() == [{'codigo': CLIENTE, 'nome': f'DROGARIA {BUSCA.upper()} SÃO JOÃO'}]
+    assert c.get(f'/api/clientes/busca?q={BUSCA}-nada').get_json() == []
+    assert sum('FROM clien' in sql for sql, _ in gravador.log) == 1  # cadastro lido uma vez, buscas só no índice
@@ -0,0 +1,60 @@
+from erp_falso import VENDEDOR
+
+ROTA = f'/api/widgets/vendedor?valor={VENDEDOR}'
+
+def _consultas_de_vendas(gravador):
+    return [sql for sql, _ in gravador.log if 'VEOBJ' in sql or 'Cod_Vendedor = ?' in sql]
+
+def test_repeticao_vem_do_cache_com_etag(cliente):
+    c, gravador = cliente
+    r1 = c.get(ROTA)
+    assert r1.status_code == 200 and r1.headers['ETag']
+    n = len(_consultas_de_vendas(gravador))
+    assert n > 0
+    r2 = c.get(ROTA)
+    assert r2.get_data() == r1.get_data() and r2.headers['ETag'] == r1.headers['ETag']
+    assert len(_consultas_de_vendas(gravador)) == n  # não voltou ao ERP
+
+def test_etag_igual_responde_304(cliente):
+    c, _ = cliente
+    etag = c.get(ROTA).headers['ETag']
+    r = c.get(ROTA, headers={'If-None-Match': etag})
+    assert r.status_code == 304 and not r.get_data()
+
+def test_marca_nova_invalida(cliente, monkeypatch):
+    import app as bi
+    c, gravador = cliente
+    monkeypatch.setattr(bi, 'marca_dados', lambda: 'marca-1')
+    c.get(ROTA)
+    n = len(_consultas_de_vendas(gravador))
+    monkeypatch.setattr(bi, 'marca_dados', lambda: 'marca-2')  # chegou nota nova
+    c.get(ROTA)
+    assert len(_consultas_de_vendas(gravador)) > n
+
+def test_backend_sqlite_compartilhado(tmp_path):
+    from database.cache import SQLiteCache
+    a, b = SQLiteCache(str(tmp_path / 'r.sqlite3')), SQLiteCache(str(tmp_path / 'r.sqlite3'))
+    a.set(('resposta', 'x'), (b'{}', 'application/json', 'e1'))
+    assert b.get(('resposta', 'x')) == (b'{}', 'application/json', 'e1')
+    b.invalidate('resposta')
+    assert a.get(('resposta', 'x')) is None
+
+def test_resposta_degradada_nao_vai_para_o_cache(cliente, monkeypatch):
+    """Meta que falhou vira 1 no widget: essa resposta não pode ser guardada nem servida aos outros usuários."""
+    import app as bi
+    c, gravador = cliente
+    gravador.falhas.append('VEOBJ')
+    monkeypatch.setattr(bi, 'marca_dados', lambda: 'marca-1')
+    r = c.get(ROTA)
+    assert r.status_code == 200 and r.headers['X-Dados-Parciais'] == '1' and 'ETag' not in r.headers
+    n = len(_consultas_de_vendas(gravador))
+    c.get(ROTA)
+    assert len(_consultas_de_vendas(gravador)) > n  # foi ao ERP de novo
+
+    gravador.falhas.clear()
+    integra = c.get(ROTA)
+    assert integra.headers['ETag']
+    gravador.falhas.append('VEOBJ')
+    monkeypatch.setattr(bi, 'marca_dados', lambda: 'marca-2')
+    r = c.get(ROTA)  # nova falha: sai a última versão íntegra, marcada como obsoleta
+    assert r.get_data() == integra.get_data() and r.headers['X-Dados-Obsoletos'] == '1'
@@ -0,0 +1,37 @@
+import sys
+
+import pytest
+
+pytest.importorskip('pyodbc', exc_type=ImportError)
+
+from database.db_connection import DatabaseConnection, lotes, tipo_linha
+
+class _Cursor:
+    description = (('Codigo', int), ('Razao_Social', str))
+    def __init__(self, n): self.linhas, self.lidos = [(i, f'CLIENTE {i}') for i in range(n)], []
+    def execute(self, sql, params=None): pass
+    def fetchmany(self, n):
+        lote, self.linhas = self.linhas[:n], self.linhas[n:]
+        self.lidos.append(len(lote))
+        return lote
+    def close(self): pass
+
+class _Pool:
+    def __init__(self, cursor): self.cur = cursor
+    def connection(self):
+        from contextlib import nullcontext
+        return nullcontext(type('Conn', (), {'cursor': lambda s: self.cur})())
+
+def test_lotes_respeita_arraysize():
+    cur = _Cursor(25)
+    assert [len(l) for l in lotes(cur, 10)] == [10, 10, 5] and cur.arraysize == 10
+
+def test_linha_compacta_com_acesso_por_nome():
+    db = DatabaseConnection.__new__(DatabaseConnection)
+    db.pool = _Pool(_Cursor(3))
+    linhas = db.execute_query('SELECT Codigo, Razao_Social FROM clien', arraysize=2)
+    assert [l['Codigo'] for l in linhas] == [0, 1, 2] and linhas[1].Razao_Social == 'CLIENTE 1'
+    assert linhas[2]['razao_social'] == 'CLIENTE 2' and linhas[0][1] == 'CLIENTE 0' and linhas[0].as_dict() == {'Codigo': 0, 'Razao_Social': 'CLIENTE 0'}
+    assert type(linhas[0]) is type(linhas[2]) is tipo_linha(('Codigo', 'Razao_Social'))  # esquema compartilhado
+    assert sys.getsizeof(linhas[0]) < sys.getsizeof(linhas[0].as_dict())
+    with pytest.raises(AttributeError): linhas[0].Inexistente
@@ -0,0 +1,56 @@
+import json
+import time
+
+import pytest
+
+from erp_falso import VENDEDOR
+from database.disjuntor import Disjuntor, CircuitoAberto, FECHADO, ABERTO
+
+def _esperar(cond, limite=2.0):
+    fim = time.monotonic() + limite
+    while not cond() and time.monotonic() < fim: time.sleep(0.01)
+    return cond()
+
+def test_abre_apos_falhas_seguidas_e_fecha_pela_sondagem():
+    sonda = {'ok': False, 'chamadas': 0}
+    def sondar():
+        sonda['chamadas'] += 1
+        if not sonda['ok']: raise OSError('sem rota para o servidor')
+    d = Disjuntor(sondar, limite=3, espera=0)
+    d.falha(OSError('x')); d.falha(OSError('x')); d.sucesso(); d.falha(OSError('x')); d.falha(OSError('x'))
+    assert d.estado == FECHADO  # sucesso no meio zera a contagem
+    d.falha(OSError('x'))
+    assert d.estado == ABERTO
+    with pytest.raises(CircuitoAberto): d.permitir()  # dispara a sondagem (falha) em segundo plano
+    assert _esperar(lambda: sonda['chamadas'] == 1 and d.estado == ABERTO)
+    sonda['ok'] = True
+    with pytest.raises(CircuitoAberto): d.permitir()  # quem chega enquanto sonda continua falhando na hora
+    assert _esperar(lambda: d.estado == FECHADO)
+    d.permitir()
+
+def test_pool_falha_na_hora_com_o_erp_fora(tmp_path, monkeypatch):
+    pyodbc = pytest.importorskip('pyodbc', exc_type=ImportError)
+    from database import db_connection
+    cfg = tmp_path / 'config.json'
+    cfg.write_text(json.dumps({'server': 's', 'database': 'd', 'username': 'u', 'password': 'p'}))
+    tentativas = []
+    def connect(*a, **k):
+        tentativas.append(1)
+        raise pyodbc.OperationalError('08001', 'timeout de login')
+    monkeypatch.setattr(db_connection.pyodbc, 'connect', connect)
+    p = db_connection.ConnectionPool(str(cfg), limite_falhas=2, espera_disjuntor=60)
+    for _ in range(2):
+        with pytest.raises(pyodbc.OperationalError): p.acquire()
+    with pytest.raises(CircuitoAberto): p.acquire()
+    assert len(tentativas) == 2 and p.status()['em_uso'] == 0
+
+def test_rota_serve_ultima_resposta_com_o_erp_fora(cliente):
+    c, gravador = cliente
+    rota = f'/api/widgets/vendedor?valor={VENDEDOR}'
+    ok = c.get(rota)
+    gravador.disjuntor = Disjuntor(lambda: None, limite=1, espera=60)
+    gravador.disjuntor.falha(OSError('ERP fora'))
+    n = len(gravador.log)
+    r = c.get(rota)
+    assert r.status_code == 200 and r.get_data() == ok.get_data() and r.headers['X-Dados-Obsoletos'] == '1'
+    assert len(gravador.log) == n
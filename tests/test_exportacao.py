@@ -0,0 +1,60 @@
+import io
+import tracemalloc
+from datetime import datetime
+
+import pytest
+
+from database.exportacao import csv_stream, xlsx_stream
+
+def _linhas(n):
+    for i in range(n): yield (i, f'DROGARIA <{i}> & CIA', 1234.5 + i, datetime(2026, 1, 1 + i % 28), None)
+
+def test_csv_excel_ptbr():
+    assert b''.join(csv_stream(['a', 'b'], [(1, 2.5), (None, datetime(2026, 3, 9))])) == '\ufeffa;b\r\n1;2,50\r\n;09/03/2026\r\n'.encode('utf-8')
+
+def test_xlsx_abre_no_openpyxl():
+    openpyxl = pytest.importorskip('openpyxl')
+    wb = openpyxl.load_workbook(io.BytesIO(b''.join(xlsx_stream(['Cod', 'Nome', 'Valor', 'Data', 'Vazio'], _linhas(1200)))))
+    ws = wb.active
+    assert ws.max_row == 1201 and [c.value for c in ws[1]] == ['Cod', 'Nome', 'Valor', 'Data', 'Vazio']
+    assert [c.value for c in ws[2]] == [0, 'DROGARIA <0> & CIA', 1234.5, datetime(2026, 1, 1), None]
+
+@pytest.mark.parametrize('gerar', [csv_stream, xlsx_stream])
+def test_memoria_nao_cresce_com_o_tamanho(gerar):
+    picos = []
+    for n in (1_000, 20_000):
+        tracemalloc.start()
+        for _ in gerar(['a', 'b', 'c', 'd', 'e'], _linhas(n)): pass
+        picos.append(tracemalloc.get_traced_memory()[1]); tracemalloc.stop()
+    assert picos[1] < picos[0] * 1.5
+
+def test_primeiros_bytes_antes_da_consulta(cliente):
+    from erp_falso import CLIENTE
+    c, gravador = cliente
+    resp = c.get(f'/exportar/titulos.csv?cliente={CLIENTE}', buffered=False)
+    assert resp.status_code == 200 and 'attachment' in resp.headers['Content-Disposition']
+    primeiro = next(iter(resp.response))
+    assert primeiro.startswith('\ufeffCódigo;Cliente'.encode('utf-8'))
+    assert not [sql for sql, _ in gravador.log if 'CTREC' in sql]  # o cabeçalho saiu antes de o banco ser consultado
+    resp.close()
+
+def test_formato_e_parametros_invalidos(cliente):
+    c, _ = cliente
+    assert c.get('/exportar/carteira.pdf').status_code == 404
+    assert c.get('/exportar/titulos.csv').status_code == 400
+    assert c.get('/exportar/regional.xlsx?vendedor=1&inicio=x&fim=y').status_code == 400
+
+def test_exportacoes_simultaneas_limitadas(cliente, monkeypatch):
+    import threading
+    import app as bi
+    from erp_falso import CLIENTE
+    c, gravador = cliente
+    monkeypatch.setattr(bi, '_vagas_exportacao', threading.BoundedSemaphore(1))
+    monkeypatch.setattr(bi._vagas_exportacao, 'acquire', lambda timeout=None, _a=bi._vagas_exportacao.acquire: _a(timeout=0))
+    aberta = c.get(f'/exportar/titulos.csv?cliente={CLIENTE}', buffered=False)
+    next(iter(aberta.response))
+    recusada = c.get(f'/exportar/titulos.csv?cliente={CLIENTE}')
+    assert recusada.status_code == 503 and recusada.headers['Retry-After'] and not [sql for sql, _ in gravador.log if 'CTREC' in sql]
+    aberta.close()  # download encerrado devolve a vaga
+    assert c.get(f'/exportar/titulos.csv?cliente={CLIENTE}').status_code == 200
+    assert c.get(f'/exportar/titulos.csv?cliente={CLIENTE}').status_code == 200
@@ -0,0 +1,75 @@
+from datetime import date, datetime
+
+import pytest
+
+from database.cache import TTLCache
+from database.historico import HistoricoMensal
+from database.periodos import periodo_ultimos_meses
+
+class _ERP:
+    """Executor falso: cada chamada devolve uma venda de 10 por cliente/mês do período pedido."""
+    def __init__(self): self.chamadas = []
+    def __call__(self, sql, params, nome=None):
+        *clientes, inicio, fim = params
+        clientes = list(dict.fromkeys(clientes))  # a lista IN vem completada com repetições (filtro_in)
+        self.chamadas.append((nome, clientes, inicio, fim))
+        meses, d = [], inicio
+        while d < fim:
+            meses.append((d.year, d.month)); d = datetime(d.year + d.month // 12, d.month % 12 + 1, 1)
+        return [(c, a, m, 10) for c in clientes for a, m in meses]
+
+def test_janela_movel():
+    assert periodo_ultimos_meses(24, date(2026, 3, 9)) == (datetime(2024, 4, 1), datetime(2026, 4, 1))
+
+def test_meses_fechados_ficam_no_cache():
+    erp = _ERP(); h = HistoricoMensal(erp, TTLCache())
+    hist = h.mensal(7, 12, date(2026, 3, 9))
+    assert len(hist) == 12 and hist[0][:2] == (2025, 4) and hist[-1][:2] == (2026, 3)
+    assert [n for n, *_ in erp.chamadas] == ['cliente_historico_fechados', 'cliente_historico_mes']
+    erp.chamadas.clear()
+    assert h.mensal(7, 12, date(2026, 3, 20)) == hist
+    assert [n for n, *_ in erp.chamadas] == ['cliente_historico_mes']  # só o mês corrente vai ao banco
+
+def test_virada_do_mes_busca_so_o_mes_que_fechou():
+    erp = _ERP(); h = HistoricoMensal(erp, TTLCache())
+    h.mensal(7, 12, date(2026, 3, 9)); erp.chamadas.clear()
+    hist = h.mensal(7, 12, date(2026, 4, 2))
+    assert erp.chamadas[0] == ('cliente_historico_fechados', [7], datetime(2026, 3, 1), datetime(2026, 4, 1))
+    assert hist[0][:2] == (2025, 5) and hist[-1][:2] == (2026, 4) and len(hist) == 12
+
+def test_prefetch_da_carteira_em_uma_consulta():
+    erp = _ERP(); h = HistoricoMensal(erp, TTLCache())
+    assert h.prefetch([3, 1, 2, 2], 24, date(2026, 3, 9)) == 3
+    assert len(erp.chamadas) == 1 and erp.chamadas[0][1] == [1, 2, 3]
+    assert h.prefetch([1, 2, 3], 24, date(2026, 3, 9)) == 0 and len(erp.chamadas) == 1
+    erp.chamadas.clear()
+    h.mensal(2, 24, date(2026, 3, 9))
+    assert [n for n, *_ in erp.chamadas] == ['cliente_historico_mes']
+
+def test_prefetch_no_sqlite_usa_uma_conexao_por_lote(tmp_path, monkeypatch):
+    from database.cache import SQLiteCache
+    cache = SQLiteCache(str(tmp_path / 'h.sqlite3'))
+    conexoes = []
+    conectar = cache._conectar
+    monkeypatch.setattr(cache, '_conectar', lambda: conexoes.append(1) or conectar())
+    erp = _ERP(); h = HistoricoMensal(erp, cache)
+    clientes = list(range(1, 1201))
+    assert h.prefetch(clientes, 12, date(2026, 3, 9)) == 1200 and len(conexoes) == 2  # get_many + set_many
+    conexoes.clear()
+    assert h.prefetch(clientes, 12, date(2026, 3, 9)) == 0 and len(conexoes) == 1
+    assert h.fechados([1200], datetime(2025, 3, 1), datetime(2026, 3, 1))[1200][(2026, 2)] == 10
+
+def test_falha_nao_vai_para_o_cache():
+    cache = TTLCache()
+    def erro(*a, **k): raise RuntimeError('timeout')
+    with pytest.raises(RuntimeError): HistoricoMensal(erro, cache).mensal(7, 12, date(2026, 3, 9))
+    assert cache.get(('historico', 7)) is None
+
+def test_rota_prefetch(cliente):
+    from erp_falso import VENDEDOR
+    c, gravador = cliente
+    assert c.post('/api/historico/prefetch', data={'vendedor': VENDEDOR}).get_json() == {'clientes': 1, 'consultados': 1}
+    gravador.log.clear()
+    assert c.post('/api/historico/prefetch', data={'vendedor': VENDEDOR}).get_json()['consultados'] == 0
+    assert not gravador.log  # já feito hoje: nem a carteira nem o cache por cliente são consultados
+    assert c.post('/api/historico/prefetch').status_code == 400
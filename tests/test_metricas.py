@@ -0,0 +1,51 @@
+import logging
+import re
+
+from erp_falso import VENDEDOR
+from database import metricas
+
+def test_histograma_acumula_buckets():
+    h = metricas.Histograma('t_segundos', 'teste', ('rota',), buckets=(0.1, 1.0))
+    for v in (0.05, 0.5, 5.0): h.observar(v, rota='x')
+    linhas = h.amostras()
+    assert 't_segundos_bucket{rota="x",le="0.1"} 1' in linhas
+    assert 't_segundos_bucket{rota="x",le="1.0"} 2' in linhas
+    assert 't_segundos_bucket{rota="x",le="+Inf"} 3' in linhas
+    assert 't_segundos_count{rota="x"} 3' in linhas
+
+def test_consultas_rotuladas_pela_rota(cliente, monkeypatch):
+    import app as bi
+    c, _ = cliente
+    monkeypatch.setitem(bi.app.config, 'METRICS_PERMITIDOS', '127.0.0.1')
+    c.get(f'/api/widgets/vendedor?valor={VENDEDOR}')  # consultas rodam em threads do pool paralelo
+    texto = c.get('/metrics').get_data(as_text=True)
+    assert 'bi_consulta_segundos_count{rota="api_widget_vendedor",consulta="vendedor_meta"}' in texto
+    assert 'bi_rota_respostas_total{rota="api_widget_vendedor",status="200"}' in texto
+    assert 'bi_pool_conexoes{estado="em_uso"}' in texto
+
+def test_metrics_exige_token_ou_ip_permitido(cliente, monkeypatch):
+    import app as bi
+    c, _ = cliente
+    assert c.get('/metrics').status_code == 403  # loopback não é confiável por padrão
+    monkeypatch.setitem(bi.app.config, 'METRICS_PERMITIDOS', '10.1.0.0/16, 192.168.0.9')
+    assert c.get('/metrics', environ_base={'REMOTE_ADDR': '10.1.2.3'}).status_code == 200
+    assert c.get('/metrics', environ_base={'REMOTE_ADDR': '10.2.2.3'}).status_code == 403
+    monkeypatch.setitem(bi.app.config, 'METRICS_TOKEN', 's3gredo')  # com token, a lista de IPs não basta
+    assert c.get('/metrics', environ_base={'REMOTE_ADDR': '10.1.2.3'}).status_code == 403
+    assert c.get('/metrics', headers={'Authorization': 'Bearer s3gredo'}).status_code == 200
+
+def test_consulta_lenta_vai_para_o_log(monkeypatch, caplog):
+    monkeypatch.setattr(metricas, 'SQL_LENTA_S', 0)
+    with caplog.at_level(logging.WARNING, logger='sql_lenta'):
+        with metricas.medir_consulta('teste_lenta', 'SELECT 1 FROM x') as m: m['linhas'] = 1
+    assert 'teste_lenta' in caplog.text
+
+def test_paralelo_sinaliza_tarefas_com_padrao():
+    import time
+    from database.paralelo import executar_em_paralelo, registrar_degradacao
+    def falha(): raise RuntimeError('ERP fora')
+    with registrar_degradacao() as degradacao:
+        res = executar_em_paralelo({'ok': lambda: 5, 'erro': falha, 'lenta': lambda: time.sleep(0.5) or 7}, timeout=0.1, padroes={'erro': 1})
+    assert res == {'ok': 5, 'erro': 1, 'lenta': 0} and degradacao == {'erro', 'lenta'}
+    texto = metricas.registro.exportar()
+    assert re.search(r'bi_tarefa_padrao_total{rota="[^"]*",tarefa="erro",motivo="erro"} [1-9]', texto)
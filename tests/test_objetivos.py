@@ -0,0 +1,14 @@
+import os
+
+from database.objetivos import ObjetivosCache
+
+def test_planilha_ilegivel_nao_e_relida_a_cada_get(tmp_path, monkeypatch):
+    path = tmp_path / 'Vlr_ObjetivoClie.xlsx'
+    path.write_bytes(b'isto nao e um xlsx')
+    cache = ObjetivosCache(str(path))
+    leituras = []
+    monkeypatch.setattr(cache, '_ler_excel', lambda: leituras.append(1))
+    assert cache.get() == {} and cache.get() == {} and len(leituras) == 1
+    assert not os.path.exists(cache.sidecar)
+    path.write_bytes(b'ainda quebrado, mas outro arquivo')  # tamanho mudou: tenta de novo
+    assert cache.get() == {} and len(leituras) == 2
@@ -0,0 +1,46 @@
+import os
+import sys
+from datetime import date, datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database.periodos import periodo_mes, periodo_anos, periodo_datas, filtro_emissao
+
+def _instantes(ini, fim):
+    """Instantes de teste ao redor de cada virada de dia entre ini e fim."""
+    d = ini
+    while d <= fim:
+        base = datetime(d.year, d.month, d.day)
+        yield base
+        yield base + timedelta(hours=12)
+        yield base + timedelta(hours=23, minutes=59, seconds=59)
+        d += timedelta(days=1)
+
+def _dentro(periodo, dt):
+    inicio, fim = periodo
+    return inicio <= dt < fim
+
+def test_periodo_mes_equivale_a_month_year():
+    for ano in (2024, 2025, 2026):
+        for mes in range(1, 13):
+            periodo = periodo_mes(ano, mes)
+            for dt in _instantes(date(ano - 1, 12, 1), date(ano + 1, 1, 31)):
+                assert _dentro(periodo, dt) == (dt.month == mes and dt.year == ano), (ano, mes, dt)
+
+def test_periodo_anos_equivale_a_year_in():
+    periodo = periodo_anos(2024, 2026)
+    for dt in _instantes(date(2023, 12, 25), date(2027, 1, 5)):
+        assert _dentro(periodo, dt) == (dt.year in (2024, 2025, 2026)), dt
+    assert periodo_anos(2025) == (datetime(2025, 1, 1), datetime(2026, 1, 1))
+
+def test_periodo_datas_equivale_a_between_fim_do_dia():
+    periodo = periodo_datas('2026-01-01', '2026-01-31')
+    d_ini, d_fim = datetime(2026, 1, 1), datetime(2026, 1, 31, 23, 59, 59)
+    for dt in _instantes(date(2025, 12, 28), date(2026, 2, 3)):
+        assert _dentro(periodo, dt) == (d_ini <= dt <= d_fim), dt
+    assert periodo_datas(date(2026, 2, 28), datetime(2026, 2, 28, 10)) == (datetime(2026, 2, 28), datetime(2026, 3, 1))
+
+def test_filtro_emissao_parametrizado():
+    sql, params = filtro_emissao(periodo_mes(2026, 12), 'nf.Dat_Emissao')
+    assert sql == "nf.Dat_Emissao >= ? AND nf.Dat_Emissao < ?"
+    assert params == [datetime(2026, 12, 1), datetime(2027, 1, 1)]
@@ -0,0 +1,74 @@
+import hashlib
+
+import pytest
+
+flask = pytest.importorskip('flask')
+
+from database.cache import TTLCache
+from database.sessoes import SessaoCookie, SessaoKVInterface, LegadoFilesystem
+
+def _app(interface):
+    app = flask.Flask(__name__)
+    app.secret_key = 'teste'
+    app.session_interface = interface
+    @app.route('/entrar')
+    def entrar():
+        flask.session['user'] = 'admin'; return 'ok'
+    @app.route('/quem')
+    def quem(): return flask.session.get('user', '-')
+    @app.route('/login/<nome>')
+    def login(nome):
+        flask.session.clear(); flask.session['user'] = nome; return 'ok'
+    @app.route('/sair')
+    def sair():
+        flask.session.clear(); return 'ok'
+    return app
+
+@pytest.mark.parametrize('interface', [lambda: SessaoCookie(), lambda: SessaoKVInterface(TTLCache(), limpeza_s=0)], ids=['cookie', 'memoria'])
+def test_login_e_logout(interface):
+    c = _app(interface()).test_client()
+    assert c.get('/quem').text == '-'
+    c.get('/entrar')
+    assert c.get('/quem').text == 'admin'
+    c.get('/sair')
+    assert c.get('/quem').text == '-'
+
+def test_kv_expira_e_limpa():
+    backend = TTLCache()
+    app = _app(SessaoKVInterface(backend, limpeza_s=0))
+    app.permanent_session_lifetime = 0
+    c = app.test_client()
+    c.get('/entrar')
+    assert backend.limpar_expirados() == 1 and c.get('/quem').text == '-'
+
+@pytest.mark.parametrize('interface', [SessaoCookie, lambda legado: SessaoKVInterface(TTLCache(), legado, limpeza_s=0)], ids=['cookie', 'memoria'])
+def test_migra_sessao_do_flask_session(tmp_path, interface):
+    cachelib = pytest.importorskip('cachelib')
+    sid = '0f8b1c2d-3e4f-4a5b-8c6d-7e8f9a0b1c2d'
+    legado = cachelib.FileSystemCache(str(tmp_path), hash_method=hashlib.md5)  # formato dos arquivos em flask_session/
+    legado.set('session:' + sid, {'_permanent': True, 'user': 'antigo'})
+    c = _app(interface(LegadoFilesystem(str(tmp_path)))).test_client()
+    c.set_cookie('session', sid)
+    assert c.get('/quem').text == 'antigo'
+    assert c.get('/quem').text == 'antigo'  # já no backend novo
+    assert legado.get('session:' + sid) is None  # arquivo antigo removido
+
+def test_kv_troca_o_id_no_login():
+    backend = TTLCache()
+    c = _app(SessaoKVInterface(backend, limpeza_s=0)).test_client()
+    c.get('/login/atacante')
+    plantado = c.get_cookie('session').value
+    c.get('/login/vitima')  # mesmo navegador, cookie plantado
+    assert c.get_cookie('session').value != plantado and c.get('/quem').text == 'vitima'
+    assert backend.get(('sessao', plantado)) is None
+
+def test_app_exige_chave_secreta_fora_do_codigo(monkeypatch, tmp_path):
+    pytest.importorskip('pyodbc', exc_type=ImportError)  # app.py carrega o driver ODBC ao importar
+    import app as bi
+    monkeypatch.delenv('SECRET_KEY', raising=False)
+    monkeypatch.delenv('SECRET_KEY_FILE', raising=False)
+    with pytest.raises(RuntimeError): bi.chave_secreta()
+    arquivo = tmp_path / 'chave'
+    arquivo.write_text('segredo-do-servidor\n')
+    monkeypatch.setenv('SECRET_KEY_FILE', str(arquivo))
+    assert bi.chave_secreta() == 'segredo-do-servidor'
@@ -0,0 +1,69 @@
+import os
+import re
+import sys
+from datetime import date, datetime
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+pytest.importorskip('flask')
+pytest.importorskip('pyodbc', exc_type=ImportError)  # app.py carrega o driver ODBC ao importar
+
+from erp_falso import VENDEDOR, CLIENTE, BUSCA
+
+_HOJE = date.today()
+
+ROTAS = [
+    ('/api/widgets/empresa', datetime(_HOJE.year, _HOJE.month, 1)),
+    (f'/api/widgets/vendedor?valor={VENDEDOR}', VENDEDOR),
+    ('/api/widgets/ranking?ordem=realizado', datetime(_HOJE.year, _HOJE.month, 1)),
+    (f'/api/widgets/carteira?tipo=cliente&valor={BUSCA}', CLIENTE),  # resolvido no índice de busca
+    (f'/api/clientes?tipo=vendedor&valor={VENDEDOR}&ordem=nome', VENDEDOR),
+    (f'/api/clientes/totais?tipo=cliente&valor={BUSCA}', CLIENTE),
+    (f'/analise/{CLIENTE}', CLIENTE),
+    (f'/api/widgets/cliente/{CLIENTE}/resumo', CLIENTE),
+    (f'/api/widgets/cliente/{CLIENTE}/historico', CLIENTE),
+    (f'/api/widgets/regional?vendedor={VENDEDOR}&inicio=2031-07-15&fim=2031-08-20', datetime(2031, 7, 15)),
+]
+
+LITERAIS_PROIBIDOS = [
+    re.compile(r'\b(19|20)\d{2}\b'),         # anos/datas
+    re.compile(r"'\d{4}-?\d{2}-?\d{2}"),      # datas entre aspas
+    re.compile(r"LIKE\s+'"),                 # busca textual montada na string
+    re.compile(rf'\b({VENDEDOR}|{CLIENTE})\b'),
+    re.compile(BUSCA),
+]
+
+@pytest.mark.parametrize('rota, esperado', ROTAS)
+def test_rotas_nao_interpolam_valores(cliente, rota, esperado):
+    c, gravador = cliente
+    assert c.get(rota).status_code == 200
+    assert gravador.log, "a rota não executou nenhuma consulta"
+    for sql, params in gravador.log:
+        for padrao in LITERAIS_PROIBIDOS:
+            assert not padrao.search(sql), f"valor literal no SQL de {rota}: {sql}"
+    assert any(esperado in params for _, params in gravador.log), f"{esperado!r} não foi enviado como parâmetro"
+
+@pytest.mark.parametrize('rota', ['/dashboard', f'/dashboard?tipo=vendedor&valor={VENDEDOR}', '/ranking',
+                                  f'/mapa?vendedor={VENDEDOR}&inicio=2031-07-15&fim=2031-08-20'])
+def test_paginas_saem_sem_consultar_vendas(cliente, rota):
+    """O esqueleto das páginas não espera consultas de vendas; os widgets buscam os dados depois."""
+    c, gravador = cliente
+    assert c.get(rota).status_code == 200
+    assert not [sql for sql, _ in gravador.log if 'nfscb' in sql.lower() or 'ctrec' in sql.lower()]
+
+def test_lista_in_em_tamanhos_fixos(monkeypatch):
+    """Buscas com quantidades diferentes de clientes geram o mesmo texto de comando (um plano só no SQL Server)."""
+    import app as bi
+    from database.parametros import filtro_in
+    assert filtro_in('c', [3, 1]) == ('c IN (' + ', '.join('?' * 10) + ')', [3, 1] + [1] * 8)
+    assert filtro_in('c', range(11))[0].count('?') == 50 and filtro_in('c', range(2000))[0].count('?') == 2000
+    periodo = (datetime(2031, 7, 1), datetime(2031, 8, 1))
+    textos = set()
+    for n in (1, 4, 9):
+        monkeypatch.setattr(bi, 'busca_clientes', lambda n=n: type('Indice', (), {'__len__': lambda s: 100, 'codigos': lambda s, v: set(range(n))})())
+        sql, params = bi.sql_carteira('cliente', 'drog', periodo)
+        textos.add(sql)
+        assert set(params[-10:]) == set(range(n))
+    assert len(textos) == 1
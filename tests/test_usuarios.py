@@ -0,0 +1,37 @@
+import json
+import os
+import threading
+
+from database.usuarios import DiretorioUsuarios
+
+def test_cria_admin_e_autentica(tmp_path):
+    d = DiretorioUsuarios(str(tmp_path / 'users.json'))
+    assert d.autenticar('admin', 'admin123456')
+    assert not d.autenticar('admin', 'errada') and not d.autenticar('ninguem', 'admin123456')
+    assert json.loads((tmp_path / 'users.json').read_text(encoding='utf-8'))['admin']['nome'] == 'Administrador'
+
+def test_login_nao_le_o_arquivo(tmp_path, monkeypatch):
+    d = DiretorioUsuarios(str(tmp_path / 'users.json'), verificar_s=60)
+    d.todos()
+    monkeypatch.setattr(d, '_ler_disco', lambda: (_ for _ in ()).throw(AssertionError('leu o disco')))
+    monkeypatch.setattr(os, 'stat', lambda *a, **k: (_ for _ in ()).throw(AssertionError('stat')))
+    assert d.autenticar('admin', 'admin123456')
+
+def test_relê_quando_o_arquivo_muda(tmp_path):
+    path = tmp_path / 'users.json'
+    d = DiretorioUsuarios(str(path), verificar_s=0)
+    d.todos()
+    path.write_text(json.dumps({'ana': {'nome': 'Ana', 'senha': 'x1'}}), encoding='utf-8')
+    assert d.autenticar('ana', 'x1') and not d.autenticar('admin', 'admin123456')
+
+def test_gravacoes_concorrentes_nao_se_perdem(tmp_path):
+    path = str(tmp_path / 'users.json')
+    dirs = [DiretorioUsuarios(path, verificar_s=0) for _ in range(4)]  # um "processo" por instância
+    def criar(d, i):
+        d.atualizar(lambda u: u.setdefault(f'u{i}', {'nome': f'U{i}', 'senha': 's'}))
+    ts = [threading.Thread(target=criar, args=(dirs[i % 4], i)) for i in range(40)]
+    for t in ts: t.start()
+    for t in ts: t.join()
+    assert len(json.loads(open(path, encoding='utf-8').read())) == 41
+    assert all(len(d.todos()) == 41 for d in dirs)
+    assert not [f for f in os.listdir(tmp_path) if f.endswith('.tmp')]
@@ -0,0 +1,24 @@
+from datetime import date, datetime
+
+import numpy as np
+
+from database.vetorial import dias_em_atraso, indexar, juntar, percentual
+
+def test_juntar_codigos_ausentes_e_indice_vazio():
+    chaves, valores = indexar({30: 3.0, 10: 1.0, 20: 2.0})
+    assert chaves.tolist() == [10, 20, 30]
+    assert juntar([20, 5, 30, 99, 10], chaves, valores).tolist() == [2.0, 0.0, 3.0, 0.0, 1.0]
+    assert juntar([20, 99], chaves, valores, padrao=-1).tolist() == [2.0, -1.0]
+    assert juntar([1, 2], *indexar({})).tolist() == [0.0, 0.0]
+    assert juntar([], chaves, valores).tolist() == []
+
+def test_percentual_com_base_zero():
+    assert percentual([50, 10, 7], [200, 0, -1]).tolist() == [25.0, 0.0, 0.0]
+    assert isinstance(percentual([1], [4]), np.ndarray)
+
+def test_dias_em_atraso():
+    hoje = date(2026, 3, 10)
+    vencimentos = [None, date(2026, 3, 1), datetime(2026, 3, 1, 18, 30), date(2026, 3, 10), date(2026, 4, 1), datetime(2025, 3, 10)]
+    assert dias_em_atraso(vencimentos, hoje).tolist() == [0, 9, 9, 0, 0, 365]
+    assert dias_em_atraso([date(2026, 3, 1)], datetime(2026, 3, 10, 23, 59)).tolist() == [9]
+    assert dias_em_atraso([], hoje).tolist() == []